@@ -1,4 +1,7 @@
 from django.contrib import admin
-from .models import Dataset
+from .models import Dataset, RequestProfile, RetentionPolicy, ValidationReport
 
-admin.site.register(Dataset)
\ No newline at end of file
+admin.site.register(Dataset)
+admin.site.register(RetentionPolicy)
+admin.site.register(RequestProfile)
+admin.site.register(ValidationReport)
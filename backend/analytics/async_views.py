@@ -0,0 +1,123 @@
+"""Async versions of the dataset read endpoints for the ASGI stack.
+
+Authentication and the dataset lookup run through sync_to_async; the pandas and
+ReportLab work is awaited on the bounded pool from ``background.run_blocking``,
+so a slow records or PDF request does not hold up the event loop. Responses
+match the DRF actions in ``views.DatasetViewSet`` byte for byte.
+"""
+import os
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+
+from .authentication import CachedBasicAuthentication
+from .background import run_blocking
+from .metrics import TimedJSONRenderer, stage
+from .views import (
+    _not_modified, _set_validators, dataset_validators, pdf_report, records_payload, summary_payload,
+    timeseries_payload, visible_datasets,
+)
+
+
+def _json_response(payload, status_code=status.HTTP_200_OK):
+    return HttpResponse(TimedJSONRenderer().render(payload), status=status_code, content_type='application/json')
+
+
+def _load_dataset(request, pk):
+    """Authenticate like DatasetViewSet and fetch a visible dataset; returns (dataset, error_response)"""
+    authenticator = CachedBasicAuthentication()
+    try:
+        with stage('auth'):
+            result = authenticator.authenticate(request)
+    except AuthenticationFailed as exc:
+        result, detail = None, exc.detail
+    else:
+        detail = NotAuthenticated.default_detail
+    if result is None:
+        response = _json_response({'detail': detail}, status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return None, response
+
+    user, _ = result
+    dataset = visible_datasets(user).filter(pk=pk).first()
+    if dataset is None:
+        return None, _json_response({'detail': 'No Dataset matches the given query.'}, status.HTTP_404_NOT_FOUND)
+    return dataset, None
+
+
+async def _open_dataset(request, pk, variant=None):
+    """Shared prologue: auth, lookup, conditional GET and file check.
+
+    Returns (dataset, validators, early_response); early_response is set when
+    the view should return it as is.
+    """
+    dataset, error = await sync_to_async(_load_dataset)(request, pk)
+    if error is not None:
+        return None, None, error
+
+    validators = None
+    if variant is not None:
+        validators = dataset_validators(dataset, variant, request.GET)
+        not_modified = _not_modified(request, *validators)
+        if not_modified is not None:
+            return None, None, not_modified
+
+    if not os.path.exists(dataset.file.path):
+        return None, None, _json_response({'error': 'File not found.'}, status.HTTP_404_NOT_FOUND)
+    return dataset, validators, None
+
+
+@require_safe
+async def dataset_summary(request, pk):
+    dataset, validators, early = await _open_dataset(request, pk, 'summary')
+    if early is not None:
+        return early
+    try:
+        analysis = await run_blocking(summary_payload, dataset, request.GET)
+    except ValueError as exc:
+        return _json_response({'error': str(exc)}, status.HTTP_400_BAD_REQUEST)
+    return _set_validators(_json_response(analysis), *validators)
+
+
+@require_safe
+async def dataset_records(request, pk):
+    dataset, validators, early = await _open_dataset(request, pk, 'records')
+    if early is not None:
+        return early
+    try:
+        payload = await run_blocking(records_payload, dataset.file.path, request.GET)
+    except ValueError as exc:
+        return _json_response({'error': str(exc)}, status.HTTP_400_BAD_REQUEST)
+    return _set_validators(_json_response(payload), *validators)
+
+
+@require_safe
+async def dataset_timeseries(request, pk):
+    dataset, validators, early = await _open_dataset(request, pk, 'timeseries')
+    if early is not None:
+        return early
+    try:
+        payload = await run_blocking(timeseries_payload, dataset, request.GET)
+    except ValueError as exc:
+        return _json_response({'error': str(exc)}, status.HTTP_400_BAD_REQUEST)
+    return _set_validators(_json_response(payload), *validators)
+
+
+@require_safe
+async def dataset_download_pdf(request, pk):
+    """Download dataset analysis as PDF"""
+    dataset, _, early = await _open_dataset(request, pk)
+    if early is not None:
+        return early
+    try:
+        pdf_buffer = await run_blocking(pdf_report, dataset)
+    except ValueError as exc:
+        return _json_response({'error': str(exc)}, status.HTTP_400_BAD_REQUEST)
+
+    # A plain response: a file-like FileResponse would be iterated synchronously under ASGI
+    response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="dataset_{dataset.id}_report.pdf"'
+    return response
@@ -0,0 +1,62 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+    thread_name_prefix='analytics-background',
+)
+_file_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'FILE_WORKERS', 4),
+    thread_name_prefix='analytics-files',
+)
+_async_csv_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_CSV_WORKERS', 4),
+    thread_name_prefix='analytics-async-csv',
+)
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run func on the shared background pool and return its Future.
+
+    Each task closes the database connections it opened, since worker threads
+    outlive any request cycle that would normally do so.
+    """
+    def task():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return _executor.submit(task)
+
+
+def map_files(func, items):
+    """Run func over items on the bounded file-work pool; results keep item order.
+
+    Meant for CSV/file work that does not touch the database.
+    """
+    return list(_file_executor.map(func, items))
+
+
+async def run_blocking(func, *args):
+    """Await func(*args) on the bounded pool for pandas/ReportLab work from async views.
+
+    The pool size caps how many heavy requests run at once; further ones wait
+    in the pool's queue while the event loop keeps serving cheap requests.
+    """
+    loop = asyncio.get_running_loop()
+    # Carry the request's context (e.g. its stage timings) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_async_csv_executor, context.run, _closing_connections, func, *args)
+
+
+def _closing_connections(func, *args):
+    """Run func, then drop the worker's stale connections as the end of a request cycle would"""
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
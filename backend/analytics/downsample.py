@@ -0,0 +1,51 @@
+"""Point selection for plotting long time series with a bounded number of points.
+
+Both functions take x (increasing) and y as float arrays and return the
+sorted indices of the points to keep.
+
+- lttb: Largest-Triangle-Three-Buckets. It keeps the visual shape with
+  about `threshold` points.
+- min_max: the lowest and highest point of each of threshold // 2 equal
+  buckets. It keeps every spike.
+"""
+import numpy as np
+import pandas as pd
+
+
+def lttb(x, y, threshold):
+    """Indices of the points LTTB keeps; all points when there are no more than threshold"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Buckets between the fixed first and last point; edges[i]:edges[i + 1] is bucket i
+    edges = np.append((np.arange(threshold - 2) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1, n - 1)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        # Twice the triangle area between the previous pick, each candidate and the next bucket's average
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def min_max(x, y, threshold):
+    """Indices of each bucket's minimum and maximum; all points when there are no more than threshold"""
+    n = len(x)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+
+    bucket_ids = np.arange(n) * buckets // n
+    groups = pd.Series(y).groupby(bucket_ids)
+    return np.unique(np.concatenate([groups.idxmin().to_numpy(), groups.idxmax().to_numpy()]))
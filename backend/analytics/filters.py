@@ -0,0 +1,304 @@
+"""Filter expressions for dataset rows, compiled once into fused NumPy masks.
+
+An expression such as ``Flowrate > 10 AND Type IN (Pump, Valve)`` is parsed
+into a tree of conditions. The tree is checked against the dataset's columns
+and compiled into a plan. Evaluating the plan converts each referenced
+column to an array once, computes one boolean array per condition and
+combines them with logical and/or/not. The frame is indexed a single time
+at the end.
+
+Grammar (keywords are case-insensitive)::
+
+    expr       := term (OR term)*
+    term       := factor (AND factor)*
+    factor     := NOT factor | '(' expr ')' | condition
+    condition  := column op value
+                | column [NOT] IN '(' value (',' value)* ')'
+                | column CONTAINS value
+    op         := = | == | != | < | <= | > | >=
+
+A column is a bare name or `backtick quoted` (`Equipment Name`). Names are
+matched exactly first, then case-insensitively. A value is a number, a
+'single' or "double" quoted string, or a bare word. Numeric columns allow
+every comparison; text columns allow =, !=, IN and CONTAINS.
+
+Compiled plans are cached per expression and schema, so a dashboard
+repeating the same filter skips parsing and column resolution altogether.
+"""
+import operator
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from .metrics import record_cache
+from .utils import NUMERIC_COLUMNS
+
+MAX_EXPRESSION_LENGTH = 2000
+PLAN_CACHE_SIZE = 256
+
+KEYWORDS = {"AND", "OR", "NOT", "IN", "CONTAINS"}
+COMPARISONS = {
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![^\s()<>=!,]))
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<column>`[^`]+`)
+  | (?P<op><=|>=|!=|==|=|<|>|\(|\)|,)
+  | (?P<word>[^\s()<>=!,'"`]+)
+)""", re.VERBOSE)
+
+
+def _invalid(message):
+    return ValueError(f"Invalid filter: {message}")
+
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None or match.end() == position:
+            raise _invalid(f"unexpected text at position {position + 1}.")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            text = re.sub(r"\\(.)", r"\1", text[1:-1])
+        elif kind == "column":
+            text = text[1:-1]
+        elif kind == "word" and text.upper() in KEYWORDS:
+            kind, text = "keyword", text.upper()
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing nested tuples"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, text=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (text and token[1] != text):
+            expected = text or kind or "more input"
+            found = token[1] if token[0] else "end of filter"
+            raise _invalid(f"expected {expected}, found {found!r}.")
+        self.position += 1
+        return token
+
+    def at(self, kind, text=None):
+        token = self.peek()
+        return token[0] == kind and (text is None or token[1] == text)
+
+    def parse(self):
+        tree = self.expr()
+        if self.position != len(self.tokens):
+            raise _invalid(f"unexpected {self.peek()[1]!r}.")
+        return tree
+
+    def expr(self):
+        terms = [self.term()]
+        while self.at("keyword", "OR"):
+            self.take()
+            terms.append(self.term())
+        return terms[0] if len(terms) == 1 else ("or", tuple(terms))
+
+    def term(self):
+        factors = [self.factor()]
+        while self.at("keyword", "AND"):
+            self.take()
+            factors.append(self.factor())
+        return factors[0] if len(factors) == 1 else ("and", tuple(factors))
+
+    def factor(self):
+        if self.at("keyword", "NOT"):
+            self.take()
+            return ("not", self.factor())
+        if self.at("op", "("):
+            self.take()
+            tree = self.expr()
+            self.take("op", ")")
+            return tree
+        return self.condition()
+
+    def value(self):
+        kind = self.peek()[0]
+        if kind not in ("number", "string", "word"):
+            return self.take("value")
+        return self.take()
+
+    def condition(self):
+        kind, column = self.peek()
+        if kind not in ("word", "column"):
+            self.take("column")
+        self.take()
+
+        negate = False
+        if self.at("keyword", "NOT"):
+            self.take()
+            negate = True
+            if not self.at("keyword", "IN"):
+                self.take("keyword", "IN")
+        if self.at("keyword", "IN"):
+            self.take()
+            self.take("op", "(")
+            values = [self.value()]
+            while self.at("op", ","):
+                self.take()
+                values.append(self.value())
+            self.take("op", ")")
+            return ("in", column, tuple(values), negate)
+        if self.at("keyword", "CONTAINS"):
+            self.take()
+            return ("contains", column, self.value())
+        kind, op = self.peek()
+        if kind != "op" or op not in COMPARISONS:
+            raise _invalid(f"expected a comparison after {column!r}.")
+        self.take()
+        return ("compare", column, op, self.value())
+
+
+_parse_lock = threading.Lock()
+_plans = OrderedDict()
+
+
+def frame_schema(df):
+    """Hashable (column, kind) pairs; the required numeric columns are always numbers"""
+    return tuple(
+        (col, "number" if col in NUMERIC_COLUMNS or is_numeric_dtype(df[col]) else "text") for col in df.columns
+    )
+
+
+def resolve_column(name, columns):
+    """The column `name` refers to: exact match first, then a unique case-insensitive one"""
+    if name in columns:
+        return name
+    matches = [col for col in columns if str(col).lower() == name.lower()]
+    if len(matches) != 1:
+        raise _invalid(f"unknown column {name!r}.")
+    return matches[0]
+
+
+def parse_filter(expression):
+    """Syntax tree of an expression; raises ValueError with the position of a syntax error"""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise _invalid(f"longer than {MAX_EXPRESSION_LENGTH} characters.")
+    return _Parser(_tokenize(expression)).parse()
+
+
+def referenced_columns(tree):
+    """Column names used by a syntax tree, as written"""
+    if tree[0] in ("and", "or"):
+        return {name for child in tree[1] for name in referenced_columns(child)}
+    if tree[0] == "not":
+        return referenced_columns(tree[1])
+    return {tree[1]}
+
+
+def filter_columns(expression, columns):
+    """The columns of `columns` an expression needs, to read them alongside the usual ones"""
+    return {resolve_column(name, columns) for name in referenced_columns(parse_filter(expression))}
+
+
+class FilterPlan:
+    """A filter bound to one schema: evaluate(df) returns a boolean NumPy array"""
+
+    def __init__(self, tree, schema):
+        self.kinds = dict(schema)
+        self.columns = set()
+        self._evaluate = self._compile(tree)
+
+    def _number(self, column, value):
+        text = value[1]
+        try:
+            return float(text)
+        except ValueError:
+            raise _invalid(f"{column!r} is numeric, {text!r} is not a number.")
+
+    def _compile(self, tree):
+        op = tree[0]
+        if op in ("and", "or"):
+            children = [self._compile(child) for child in tree[1]]
+            combine = np.logical_and if op == "and" else np.logical_or
+            return lambda arrays: combine.reduce([child(arrays) for child in children])
+        if op == "not":
+            child = self._compile(tree[1])
+            return lambda arrays: ~child(arrays)
+
+        column = resolve_column(tree[1], list(self.kinds))
+        self.columns.add(column)
+        numeric = self.kinds[column] == "number"
+        if op == "compare":
+            compare = COMPARISONS[tree[2]]
+            if numeric:
+                bound = self._number(column, tree[3])
+                return lambda arrays: compare(arrays[column], bound)
+            if tree[2] not in ("=", "==", "!="):
+                raise _invalid(f"{column!r} is text; use =, !=, IN or CONTAINS.")
+            text = tree[3][1]
+            matches = lambda arrays: arrays[column].isin([text]).to_numpy()
+            return matches if compare is operator.eq else (lambda arrays: ~matches(arrays))
+        if op == "in":
+            negate = tree[3]
+            if numeric:
+                bounds = [self._number(column, value) for value in tree[2]]
+                matches = lambda arrays: np.isin(arrays[column], bounds)
+            else:
+                texts = [text for _, text in tree[2]]
+                matches = lambda arrays: arrays[column].isin(texts).to_numpy()
+            return (lambda arrays: ~matches(arrays)) if negate else matches
+        # contains
+        if numeric:
+            raise _invalid(f"CONTAINS needs a text column, {column!r} is numeric.")
+        text = tree[2][1]
+        return lambda arrays: (
+            arrays[column].astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+        )
+
+    def evaluate(self, df):
+        """Boolean mask over df's rows; each referenced column is converted once"""
+        arrays = {}
+        for column in self.columns:
+            values = df[column]
+            if self.kinds[column] == "number":
+                if not is_numeric_dtype(values):
+                    values = pd.to_numeric(values, errors="coerce")
+                # NaN never satisfies a comparison except !=
+                values = values.to_numpy(dtype="float64", na_value=np.nan)
+            elif is_numeric_dtype(values):
+                # A text column that parsed as numbers in this chunk still compares as text
+                values = values.astype("string")
+            arrays[column] = values
+        return np.asarray(self._evaluate(arrays), dtype=bool)
+
+
+def compile_filter(expression, schema):
+    """Cached FilterPlan for an expression and a frame_schema; raises ValueError for invalid filters"""
+    key = (expression, schema)
+    with _parse_lock:
+        plan = _plans.get(key)
+        if plan is not None:
+            _plans.move_to_end(key)
+    record_cache("filter_plan", plan is not None)
+    if plan is not None:
+        return plan
+
+    plan = FilterPlan(parse_filter(expression), schema)
+    with _parse_lock:
+        _plans[key] = plan
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
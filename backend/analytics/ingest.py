@@ -0,0 +1,290 @@
+"""Single-pass ingest of an uploaded CSV.
+
+The upload is parsed straight from the request's upload object through a
+reader that hashes every byte as the parser pulls it. That one read yields
+the validation result (every rule in validation.py), the SHA-256 and the
+dataset statistics. Only a valid upload is written to storage and gets a
+Dataset row. A rejected upload leaves nothing but its validation report.
+
+A dataset with a timestamp column is stored sorted by time, so time windows
+can be found by binary search. An upload that is not already in order is
+rewritten sorted before it is stored.
+
+append_upload adds the rows of a further upload to an existing dataset. It
+folds their statistics into the stored ones, so the existing rows are never
+parsed again. The exception is rows that would break the time order, which
+make the whole file be rewritten sorted.
+
+Large uploads already sit in a temporary file (TemporaryFileUploadHandler).
+FileSystemStorage moves that file into place rather than copying it. From
+PARALLEL_INGEST_MIN_BYTES such a file is parsed by the byte-range workers of
+parallel_csv instead. Their partials only clear an upload; one they cannot
+clear is parsed again serially, which writes the full validation report.
+"""
+import hashlib
+import io
+import os
+import shutil
+
+import pandas as pd
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import stage
+from .models import Dataset
+from .utils import (
+    apply_float32, find_timestamp_column, frame_stats, merge_stats, merged_stats, parallel_stats, parallel_summary,
+    parse_timestamps, read_equipment_csv, summary_from_stats, use_parallel_ingest, validate_csv,
+)
+from .validation import check_frame, summary_within_rules
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class _HashingReader(io.RawIOBase):
+    """Seekable raw reader over an upload that hashes each byte exactly once.
+
+    The parser reads the header, rewinds and reads again. Only the bytes past
+    the furthest position read so far go into the digest.
+    """
+
+    def __init__(self, upload):
+        self._upload = upload
+        self._position = 0
+        self._hashed = 0
+        self.digest = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._upload.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        end = self._position + size
+        if end > self._hashed:
+            self.digest.update(memoryview(data)[self._hashed - self._position:])
+            self._hashed = end
+        self._position = end
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._upload.seek(offset, whence)
+        self._position = self._upload.tell()
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def finish(self):
+        """Hash whatever the parser left unread; returns (hex digest, size in bytes)"""
+        self.seek(self._hashed)
+        while self.read(READ_BUFFER_SIZE):
+            pass
+        return self.digest.hexdigest(), self._hashed
+
+
+def _inspect_in_parallel(upload):
+    """inspect_upload's result from the byte-range workers, or None to inspect serially.
+
+    None also covers every upload the partials cannot clear: a rule
+    violation, a value that is not a timestamp or a quoted field.
+    """
+    path = upload.temporary_file_path()
+    merged = parallel_summary(path)
+    if merged is None or merged['rows'] == 0:
+        return None
+    time_column = find_timestamp_column(_header_columns(upload))
+    times = None
+    if time_column:
+        with stage('parse'):
+            times = parse_timestamps(pd.read_csv(path, usecols=[time_column])[time_column])
+    with stage('validate'):
+        if not summary_within_rules(merged) or (times is not None and times.isna().any()):
+            return None
+    with stage('aggregate'):
+        stats = merged_stats(merged, times)
+    with open(path, 'rb') as source:
+        content_hash = hashlib.file_digest(source, 'sha256').hexdigest()
+    return {
+        'content_hash': content_hash,
+        'file_size': os.path.getsize(path),
+        'stats': stats,
+        'time_column': time_column or '',
+        'time_sorted': times is None or times.is_monotonic_increasing,
+    }
+
+
+def inspect_upload(upload):
+    """Validate and summarize an upload in one read; raises ValueError for bad files.
+
+    Rule violations raise validation.ValidationFailed carrying every issue.
+    Returns a dict with the content hash, byte size, frame_stats, the
+    timestamp column ('' without one) and whether the rows are in time order.
+    """
+    if hasattr(upload, 'temporary_file_path') and use_parallel_ingest(upload.size):
+        result = _inspect_in_parallel(upload)
+        if result is not None:
+            return result
+
+    reader = _HashingReader(upload)
+    with stage('parse'):
+        df = read_equipment_csv(io.BufferedReader(reader, READ_BUFFER_SIZE))
+    if df.empty or len(df.columns) == 0:
+        raise ValueError("Empty file.")
+    time_column = find_timestamp_column(df.columns)
+    times = parse_timestamps(df[time_column]) if time_column else None
+    with stage('validate'):
+        check_frame(df, times=times)
+    df = apply_float32(df)
+    with stage('aggregate'):
+        stats = frame_stats(df, times)
+    content_hash, size = reader.finish()
+    return {
+        'content_hash': content_hash,
+        'file_size': size,
+        'stats': stats,
+        'time_column': time_column or '',
+        'time_sorted': times is None or times.is_monotonic_increasing,
+    }
+
+
+def file_stats(path, time_column=''):
+    """frame_stats of a stored dataset file; raises ValueError for bad files"""
+    if use_parallel_ingest(os.path.getsize(path)):
+        stats = parallel_stats(path, time_column)
+        if stats is not None:
+            return stats
+    df = validate_csv(path)
+    times = parse_timestamps(df[time_column]) if time_column else None
+    return frame_stats(df, times)
+
+
+def _header_columns(source):
+    """Column names from the first line of a binary file"""
+    source.seek(0)
+    return list(pd.read_csv(io.BytesIO(source.readline()), nrows=0).columns)
+
+
+def _time_sorted_csv(sources, columns, time_column):
+    """CSV bytes of the rows of every source in `columns` order, stably sorted by time"""
+    frames = []
+    for source in sources:
+        source.seek(0)
+        frames.append(pd.read_csv(source, dtype=str, keep_default_na=False)[columns])
+    rows = pd.concat(frames, ignore_index=True)
+    order = parse_timestamps(rows[time_column]).argsort(kind='stable')
+    return rows.iloc[order].to_csv(index=False).encode('utf-8')
+
+
+def ingest_upload(user, upload):
+    """Create a Dataset from a valid upload; raises ValueError and stores nothing otherwise.
+
+    Returns (dataset, summary). The summary is the analyze_csv payload.
+    """
+    result = inspect_upload(upload)
+    time_sorted = result.pop('time_sorted')
+
+    dataset = Dataset(user=user, **result)
+    with stage('store'):
+        content = upload
+        if not time_sorted:
+            content = ContentFile(_time_sorted_csv([upload], _header_columns(upload), dataset.time_column))
+            dataset.file_size = content.size
+        upload.seek(0)
+        dataset.file.save(upload.name, content, save=False)
+        try:
+            dataset.save()
+        except Exception:
+            dataset.file.delete(save=False)
+            raise
+    return dataset, summary_from_stats(result['stats'])
+
+
+def _append_rows(path, upload, columns):
+    """Append the upload's data rows to the CSV at path in its column order; returns bytes written"""
+    upload_columns = _header_columns(upload)
+    with open(path, 'rb+') as target:
+        target.seek(0, os.SEEK_END)
+        start = target.tell()
+        if start:
+            target.seek(-1, os.SEEK_END)
+            if target.read(1) != b'\n':
+                target.write(b'\n')
+        if upload_columns == columns:
+            # Same layout: copy the bytes after the header as they are
+            shutil.copyfileobj(upload, target, READ_BUFFER_SIZE)
+        else:
+            upload.seek(0)
+            rows = pd.read_csv(upload, dtype=str, keep_default_na=False)
+            target.write(rows[columns].to_csv(index=False, header=False).encode('utf-8'))
+        return target.tell() - start
+
+
+def append_upload(dataset, upload):
+    """Validate an upload's rows and append them to the dataset; returns (dataset, summary).
+
+    The upload needs the dataset's columns, in any order. Raises ValueError
+    (ValidationFailed for rule violations) and leaves the dataset untouched
+    otherwise. The stored content hash is cleared, because it no longer
+    describes the file.
+    """
+    result = inspect_upload(upload)
+
+    with transaction.atomic():
+        # Serializes appends to one dataset, so file and stats stay in step
+        dataset = Dataset.objects.select_for_update().get(pk=dataset.pk)
+        path = dataset.file.path
+        with open(path, 'rb') as existing:
+            columns = _header_columns(existing)
+        if sorted(_header_columns(upload)) != sorted(columns):
+            raise ValueError(f"Appended rows must have the dataset's columns: {', '.join(columns)}.")
+
+        # Datasets stored before stats were recorded are summarized once here
+        stats = dataset.stats if dataset.stats is not None else file_stats(path, dataset.time_column)
+        dataset.stats = merge_stats(stats, result['stats'])
+        dataset.content_hash = ''
+        dataset.updated_at = timezone.now()
+        update_fields = ['stats', 'file_size', 'content_hash', 'updated_at']
+
+        with stage('store'):
+            if _keeps_time_order(dataset.time_column, stats, result):
+                size = os.path.getsize(path)
+                try:
+                    dataset.file_size = size + _append_rows(path, upload, columns)
+                    dataset.save(update_fields=update_fields)
+                except Exception:
+                    os.truncate(path, size)
+                    raise
+            else:
+                with open(path, 'rb') as existing:
+                    content = _time_sorted_csv([existing, upload], columns, dataset.time_column)
+                staged = f'{path}.appending'
+                try:
+                    with open(staged, 'wb') as target:
+                        target.write(content)
+                    dataset.file_size = len(content)
+                    dataset.save(update_fields=update_fields)
+                    os.replace(staged, path)
+                except Exception:
+                    if os.path.exists(staged):
+                        os.remove(staged)
+                    raise
+    return dataset, summary_from_stats(dataset.stats)
+
+
+def _keeps_time_order(time_column, stats, result):
+    """Whether appending the upload's rows as they are keeps a time-sorted dataset sorted"""
+    if not time_column or 'time' not in stats:
+        return True
+    if not result['time_sorted']:
+        return False
+    try:
+        return pd.Timestamp(result['stats']['time'][0]) >= pd.Timestamp(stats['time'][1])
+    except TypeError:
+        # Naive and offset-aware timestamps do not compare; let the sort decide
+        return False
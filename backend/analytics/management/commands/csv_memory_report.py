@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import Dataset
+from analytics.utils import memory_report
+
+
+class Command(BaseCommand):
+    help = "Show each dataset's in-memory DataFrame size with the default and the typed CSV readers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help="dataset ids (default: all)")
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.order_by('id')
+        if options['ids']:
+            datasets = datasets.filter(id__in=options['ids'])
+
+        self.stdout.write(f"{'dataset':>8} {'file MB':>9} {'default MB':>11} {'typed MB':>9} {'float32 MB':>11}")
+        for dataset in datasets.iterator():
+            try:
+                report = memory_report(dataset.file.path)
+            except (OSError, ValueError) as exc:
+                self.stdout.write(f"{dataset.id:>8} skipped: {exc}")
+                continue
+            self.stdout.write(
+                f"{dataset.id:>8} {dataset.file_size / 2**20:9.2f} {report['default_bytes'] / 2**20:11.2f} "
+                f"{report['typed_bytes'] / 2**20:9.2f} {report['typed_float32_bytes'] / 2**20:11.2f}"
+            )
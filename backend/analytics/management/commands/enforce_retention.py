@@ -0,0 +1,15 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from analytics.retention import enforce_retention, sweep_pending_files
+
+
+class Command(BaseCommand):
+    help = "Apply dataset retention policies to every user and delete queued files."
+
+    def handle(self, *args, **options):
+        removed = 0
+        for user in User.objects.filter(dataset__isnull=False).distinct().iterator():
+            removed += enforce_retention(user)
+        swept = sweep_pending_files()
+        self.stdout.write(f"Removed {removed} dataset(s), deleted {swept} file(s).")
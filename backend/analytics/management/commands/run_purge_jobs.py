@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import PurgeJob
+from analytics.purge import run_purge_job
+
+
+class Command(BaseCommand):
+    help = "Run user purge jobs left pending or interrupted, e.g. by a server restart, and retry failed ones."
+
+    def handle(self, *args, **options):
+        job_ids = list(
+            PurgeJob.objects.filter(status__in=PurgeJob.RETRY_STATUSES).order_by('id').values_list('id', flat=True)
+        )
+        for job_id in job_ids:
+            run_purge_job(job_id)
+        self.stdout.write(f"Ran {len(job_ids)} purge job(s).")
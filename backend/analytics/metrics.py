@@ -0,0 +1,231 @@
+"""Request stage timing and in-process metrics in Prometheus text format.
+
+Code marks its stages with ``with stage('parse'):``. While a request is being
+served by RequestMetricsMiddleware, those durations are reported to the client
+as a ``Server-Timing`` header and added to the latency histograms exposed at
+``/api/metrics/``. Outside a request (management commands, benchmarks) stages
+cost a context-variable lookup and nothing else.
+
+Metrics live in process memory, so each worker process exposes its own series.
+"""
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+
+from .authentication import CachedBasicAuthentication
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_stage_timings = contextvars.ContextVar('analytics_stage_timings', default=None)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as a named stage of the current request"""
+    timings = _stage_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms keyed by label tuples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self._in_flight = 0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def add_in_flight(self, delta):
+        with self._lock:
+            self._in_flight += delta
+
+    def render(self):
+        """Prometheus text exposition format 0.0.4"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            in_flight = self._in_flight
+
+        lines = [
+            '# HELP chemviz_http_requests_in_flight Requests currently being served.',
+            '# TYPE chemviz_http_requests_in_flight gauge',
+            f'chemviz_http_requests_in_flight {in_flight}',
+        ]
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {histogram.total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels) + '}'
+
+
+registry = MetricsRegistry()
+
+
+def record_cache(cache, hit):
+    """Count a lookup against a named cache; hit ratios are derived in Prometheus"""
+    registry.inc('chemviz_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its work as the 'render' stage"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with stage('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+@contextmanager
+def _request_timings():
+    """Collect the stages of the enclosed request into the yielded dict and count it in flight"""
+    timings = {}
+    token = _stage_timings.set(timings)
+    registry.add_in_flight(1)
+    try:
+        yield timings
+    finally:
+        registry.add_in_flight(-1)
+        _stage_timings.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """Collect stage timings per request, emit Server-Timing and update the registry"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with _request_timings() as timings:
+            response = self.get_response(request)
+        return self._record(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        # The context variable set here is copied into sync_to_async and run_blocking threads
+        with _request_timings() as timings:
+            response = await self.get_response(request)
+        return self._record(request, response, timings, time.perf_counter() - start)
+
+    def _record(self, request, response, timings, total):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match and match.view_name else 'unmatched'
+        registry.inc(
+            'chemviz_http_requests_total',
+            {'endpoint': endpoint, 'method': request.method, 'status': response.status_code},
+        )
+        registry.observe('chemviz_http_request_duration_seconds', {'endpoint': endpoint}, total)
+        for name, duration in timings.items():
+            registry.observe('chemviz_stage_duration_seconds', {'endpoint': endpoint, 'stage': name}, duration)
+        if not response.streaming:
+            registry.observe(
+                'chemviz_http_response_size_bytes', {'endpoint': endpoint}, len(response.content), SIZE_BUCKETS
+            )
+
+        entries = [f'{name};dur={duration * 1000:.1f}' for name, duration in timings.items()]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(entries)
+        response['Timing-Allow-Origin'] = '*'
+        return response
+
+
+def _scrape_authorized(request):
+    """True for Bearer METRICS_TOKEN (once one is configured) or a staff user's Basic credentials"""
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() == 'bearer':
+        token = settings.METRICS_TOKEN
+        return bool(token) and hmac.compare_digest(credentials.strip().encode(), token.encode())
+    try:
+        result = CachedBasicAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint: METRICS_ALLOWED_IPS only, and a bearer token or staff credentials"""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    if not _scrape_authorized(request):
+        response = HttpResponse('Unauthorized', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
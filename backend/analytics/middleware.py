@@ -0,0 +1,289 @@
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.wsgi import LimitedStream
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from .metrics import stage
+
+# Content types worth compressing; PDFs and images are already compressed
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "application/x-ndjson", "text/")
+MIN_COMPRESS_SIZE = 200
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+class DecompressionError(Exception):
+    """A gzip request body that is corrupt (400) or inflates past GZIP_REQUEST_MAX_BYTES (413)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _response_encoders():
+    """Available (encoding, compress_bytes) pairs in server preference order"""
+    encoders = []
+    try:
+        import zstandard
+        encoders.append(("zstd", zstandard.ZstdCompressor(level=3).compress))
+    except ImportError:
+        pass
+    try:
+        import brotli
+        encoders.append(("br", lambda data: brotli.compress(data, quality=5)))
+    except ImportError:
+        pass
+    encoders.append(("gzip", compress_string))
+    return encoders
+
+
+RESPONSE_ENCODERS = _response_encoders()
+
+
+def _accepted_encodings(header):
+    """Parse Accept-Encoding into the set of codings with a non-zero q-value"""
+    accepted = set()
+    for item in header.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        coding = parts[0].lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            match = re.fullmatch(r"q=([0-9.]+)", param)
+            if match:
+                try:
+                    quality = float(match.group(1))
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+class ResponseCompressionMiddleware:
+    """Compress JSON/text responses with the best coding the client accepts.
+
+    zstd and brotli are used when the optional ``zstandard``/``brotli`` packages
+    are installed; gzip is always available. Streaming responses use gzip.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def _compress(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        accepted = _accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if response.streaming:
+            if "gzip" not in accepted or response.is_async:
+                return response
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+            encoding = "gzip"
+        else:
+            if len(response.content) < MIN_COMPRESS_SIZE:
+                return response
+            choice = next(
+                ((coding, compress) for coding, compress in RESPONSE_ENCODERS if coding in accepted),
+                None,
+            )
+            if choice is None:
+                return response
+            encoding, compress = choice
+            with stage("compress"):
+                compressed = compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(response.content))
+
+        # The representation changed, so a strong ETag no longer matches it byte for byte
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class GzipDecompressingStream:
+    """File-like wrapper that inflates a gzip request body as it is read.
+
+    Output is produced in bounded chunks, so an upload is never held in memory
+    in full and a small compressed body cannot expand into one huge buffer.
+    Inflating past max_bytes raises DecompressionError (413) mid-read.
+    """
+
+    def __init__(self, stream, chunk_size=DECOMPRESS_CHUNK_SIZE, max_bytes=None):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._max_bytes = max_bytes
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._buffer = b""
+        self._inflated = 0
+        self._eof = False
+
+    def _fill(self):
+        try:
+            if self._decompressor.unconsumed_tail:
+                data = self._decompressor.unconsumed_tail
+            else:
+                data = self._stream.read(self._chunk_size)
+                if not data:
+                    self._buffer += self._decompressor.flush()
+                    self._eof = True
+                    return
+            inflated = self._decompressor.decompress(data, self._chunk_size)
+        except zlib.error:
+            raise DecompressionError("Invalid gzip request body.")
+        self._inflated += len(inflated)
+        if self._max_bytes is not None and self._inflated > self._max_bytes:
+            raise DecompressionError("Request body is too large once decompressed.", status=413)
+        self._buffer += inflated
+        if self._decompressor.eof:
+            self._eof = True
+
+    def inflated_size(self, limit):
+        """The whole inflated size when it is at most limit bytes, else None.
+
+        Reads ahead into the buffer, which later reads return as usual.
+        """
+        while not self._eof and len(self._buffer) <= limit:
+            self._fill()
+        return len(self._buffer) if self._eof and len(self._buffer) <= limit else None
+
+    def read(self, size=-1):
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size is None or size < 0:
+            result, self._buffer = self._buffer, b""
+        else:
+            result, self._buffer = self._buffer[:size], self._buffer[size:]
+        return result
+
+    def readline(self, size=-1):
+        while not self._eof and b"\n" not in self._buffer and (size is None or size < 0 or len(self._buffer) < size):
+            self._fill()
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        result, self._buffer = self._buffer[:end], self._buffer[end:]
+        return result
+
+
+def _decompressing_stream(stream):
+    """(inflating stream, CONTENT_LENGTH to parse it with) for a gzip request body.
+
+    A body that inflates to what the upload and body size settings keep in
+    memory anyway is read ahead, so its exact length is known. A larger one
+    is streamed to the parsers as it inflates, with GZIP_REQUEST_MAX_BYTES
+    as its length: uploads then go straight to TemporaryFileUploadHandler,
+    as a large plain upload would, and the stream stops at that cap.
+    """
+    inflating = GzipDecompressingStream(stream, max_bytes=settings.GZIP_REQUEST_MAX_BYTES)
+    in_memory = max(settings.FILE_UPLOAD_MAX_MEMORY_SIZE, settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0)
+    size = inflating.inflated_size(in_memory)
+    return inflating, settings.GZIP_REQUEST_MAX_BYTES if size is None else size
+
+
+def _request_coding(request):
+    """The request body's content coding, or None for a plain body"""
+    encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+    return encoding if encoding and encoding != "identity" else None
+
+
+def _unsupported_coding(encoding):
+    response = HttpResponse(f"Unsupported Content-Encoding '{encoding}'.", status=415, content_type="text/plain")
+    response.headers["Accept-Encoding"] = "gzip"
+    return response
+
+
+def _use_inflated_body(request, body, size):
+    request._stream = LimitedStream(body, size)
+    request.META["CONTENT_LENGTH"] = str(size)
+    del request.META["HTTP_CONTENT_ENCODING"]
+
+
+def _decompression_failed(exc):
+    response = HttpResponse(str(exc), status=exc.status, content_type="text/plain")
+    response.headers["Accept-Encoding"] = "gzip"
+    return response
+
+
+class RequestDecompressionMiddleware:
+    """Accept ``Content-Encoding: gzip`` request bodies and advertise support.
+
+    The body is inflated as the parsers read it (see _decompressing_stream),
+    so a compressed upload is not written out once more before the view
+    sees it. The request then looks like a plain upload: Content-Encoding is
+    gone and CONTENT_LENGTH is the inflated size, or the size cap for bodies
+    too large to read ahead. Errors found while the view reads the body
+    (corrupt data, inflating past the cap) become 400/413 responses in
+    process_exception. Under ASGI the read-ahead runs in a worker thread,
+    off the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        encoding = _request_coding(request)
+        if encoding is not None:
+            if encoding != "gzip":
+                return _unsupported_coding(encoding)
+            try:
+                _use_inflated_body(request, *_decompressing_stream(request._stream))
+            except DecompressionError as exc:
+                return _decompression_failed(exc)
+        return self._finish(self.get_response(request))
+
+    async def __acall__(self, request):
+        encoding = _request_coding(request)
+        if encoding is not None:
+            if encoding != "gzip":
+                return _unsupported_coding(encoding)
+            try:
+                body = await sync_to_async(_decompressing_stream, thread_sensitive=False)(request._stream)
+            except DecompressionError as exc:
+                return _decompression_failed(exc)
+            _use_inflated_body(request, *body)
+        return self._finish(await self.get_response(request))
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DecompressionError):
+            return _decompression_failed(exception)
+        return None
+
+    def _finish(self, response):
+        # RFC 7694: tell clients which content codings request bodies may use
+        response.headers.setdefault("Accept-Encoding", "gzip")
+        return response
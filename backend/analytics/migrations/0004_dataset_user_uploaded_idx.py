@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-18 23:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_dataset_content_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['user', 'uploaded_at'], name='dataset_user_uploaded_idx'),
+        ),
+    ]
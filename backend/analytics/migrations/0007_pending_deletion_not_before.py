@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_purge_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingfiledeletion',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
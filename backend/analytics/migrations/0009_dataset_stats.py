@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_request_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='stats',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_dataset_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='time_column',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
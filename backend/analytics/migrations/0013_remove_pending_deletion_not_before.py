@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-19 01:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0012_dataset_time_column'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='pendingfiledeletion',
+            name='not_before',
+        ),
+    ]
@@ -1,3 +1,7 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -5,9 +9,143 @@ class Dataset(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     file = models.FileField(upload_to='uploads/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    file_size = models.BigIntegerField(default=0)
+    # utils.frame_stats of the file, recorded at ingest; null for older uploads
+    stats = models.JSONField(null=True, blank=True)
+    # Set when rows are appended; uploaded_at keeps the original upload time
+    updated_at = models.DateTimeField(null=True, blank=True)
+    # Timestamp column found at ingest; the stored file is sorted by it
+    time_column = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
         return f"Dataset {self.id} - {self.uploaded_at}"
     
     class Meta:
-        ordering = ['-uploaded_at']
\ No newline at end of file
+        ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['user', 'uploaded_at'], name='dataset_user_uploaded_idx'),
+        ]
+
+
+class RetentionPolicy(models.Model):
+    """Dataset retention limits; a policy without a user is the global default"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, null=True, blank=True, related_name='retention_policy'
+    )
+    max_datasets = models.PositiveIntegerField(null=True, blank=True)
+    max_total_bytes = models.BigIntegerField(null=True, blank=True)
+    max_age_days = models.PositiveIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        scope = self.user.username if self.user else 'global'
+        return f"Retention policy ({scope})"
+
+    class Meta:
+        verbose_name_plural = 'retention policies'
+
+
+class PendingFileDeletion(models.Model):
+    """Storage path of a deleted dataset's file, waiting for the background sweeper"""
+    name = models.CharField(max_length=255)
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PurgeJob(models.Model):
+    """Background removal of a deleted user's datasets, files and account"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+    # Jobs run_purge_jobs picks up: unfinished ones and failed ones to retry
+    RETRY_STATUSES = ACTIVE_STATUSES + [STATUS_FAILED]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='purge_jobs')
+    username = models.CharField(max_length=150)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='requested_purge_jobs'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    datasets_total = models.PositiveIntegerField(default=0)
+    datasets_deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Purge {self.username} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class ProfileStorage(FileSystemStorage):
+    """File storage rooted at settings.PROFILE_ROOT, read on every access"""
+
+    @property
+    def base_location(self):
+        return settings.PROFILE_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def profile_storage():
+    """Profiles live outside MEDIA_ROOT so they are never served as public media"""
+    return ProfileStorage()
+
+
+class RequestProfile(models.Model):
+    """Stored profiler output for one API request, captured on an admin's request"""
+    PROFILER_CPROFILE = 'cprofile'
+    PROFILER_SAMPLING = 'sampling'
+    PROFILER_CHOICES = [
+        (PROFILER_CPROFILE, 'cProfile'),
+        (PROFILER_SAMPLING, 'Sampling (pyinstrument)'),
+    ]
+
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    profiler = models.CharField(max_length=10, choices=PROFILER_CHOICES, default=PROFILER_CPROFILE)
+    artifact = models.FileField(storage=profile_storage, upload_to='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+
+
+class ValidationReport(models.Model):
+    """Every rule violation found in one rejected upload, stored as a CSV of issues"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='validation_reports')
+    file_name = models.CharField(max_length=255)
+    message = models.TextField()
+    error_count = models.PositiveIntegerField()
+    # Issues per rule, e.g. {"non_numeric": 12, "out_of_range": 3}
+    counts = models.JSONField(default=dict)
+    report = models.FileField(upload_to='validation_reports/')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Validation report {self.id} - {self.file_name}"
+
+    class Meta:
+        ordering = ['-created_at', '-id']
@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class DatasetCursorPagination(CursorPagination):
+    """Newest-first cursor pagination; id breaks ties between equal upload times"""
+    ordering = ('-uploaded_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ValidationIssuePagination(PageNumberPagination):
+    """Pages of a validation report's issue rows"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,183 @@
+"""Parallel summary of one large CSV by newline-aligned byte ranges.
+
+The file is cut into ranges that start at line boundaries, and each range is
+parsed in a worker process into mergeable partials: row count, per-column sums
+and bounds, invalid-row positions (local to the range) and Type counts. The parent merges
+them, offsetting local positions by the rows of the preceding ranges, so
+error messages name the same rows a serial parse would.
+
+Byte ranges cannot tell whether a newline sits inside a quoted field, so a
+file containing any double quote is handed back to the serial parser, as are
+ranges the parser rejects. Workers only import pandas, so the spawned
+processes do not load Django.
+"""
+import io
+import math
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+# Rows parsed at a time inside a worker, bounding its memory per range
+CHUNK_ROWS = 500_000
+# Invalid positions kept per range and column; one more than a message shows
+INVALID_SAMPLE = 6
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class _ByteRange(io.RawIOBase):
+    """Raw reader over [start, end) of a file that notes whether it saw a quote"""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+        self.saw_quote = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        data = self._file.read(min(len(buffer), self._remaining))
+        if b'"' in data:
+            self.saw_quote = True
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def split_byte_ranges(path, parts):
+    """Split the data lines after the header into at most `parts` line-aligned (start, end) ranges"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        bounds = [f.tell()]
+        for i in range(1, parts):
+            target = bounds[0] + (size - bounds[0]) * i // parts
+            if target <= bounds[-1]:
+                continue
+            # Seeking one byte back keeps a range that already starts on a line boundary
+            f.seek(target - 1)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def summarize_range(path, start, end, columns, usecols, numeric_columns):
+    """Worker: mergeable partial summary of one byte range"""
+    raw = _ByteRange(path, start, end)
+    partial = {
+        'rows': 0,
+        'sums': {col: 0.0 for col in numeric_columns},
+        'mins': {col: math.inf for col in numeric_columns},
+        'maxs': {col: -math.inf for col in numeric_columns},
+        'invalid': {col: [] for col in numeric_columns},
+        'invalid_counts': {col: 0 for col in numeric_columns},
+        'types': Counter(),
+        'quoted': False,
+        'failed': False,
+    }
+    try:
+        chunks = pd.read_csv(
+            io.BufferedReader(raw, buffer_size=1 << 20), header=None, names=columns,
+            usecols=usecols, dtype={'Type': 'category'}, chunksize=CHUNK_ROWS,
+        )
+        for chunk in chunks:
+            for col in numeric_columns:
+                values = chunk[col] if is_numeric_dtype(chunk[col]) else pd.to_numeric(chunk[col], errors='coerce')
+                invalid_mask = values.isna()
+                if invalid_mask.any():
+                    positions = chunk.index[invalid_mask]
+                    kept = partial['invalid'][col]
+                    kept.extend(positions[:INVALID_SAMPLE - len(kept)].tolist())
+                    partial['invalid_counts'][col] += len(positions)
+                partial['sums'][col] += float(values.sum())
+                # An all-NaN chunk has a NaN min/max; as the second argument it never wins
+                partial['mins'][col] = min(partial['mins'][col], float(values.min()))
+                partial['maxs'][col] = max(partial['maxs'][col], float(values.max()))
+            counts = chunk['Type'].value_counts()
+            partial['types'].update({key: int(count) for key, count in counts.items() if count})
+            partial['rows'] += len(chunk)
+    except pd.errors.EmptyDataError:
+        pass
+    except Exception:
+        partial['failed'] = True
+    finally:
+        partial['quoted'] = raw.saw_quote
+        raw.close()
+    return partial
+
+
+def _get_pool(processes):
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn, not fork: the server process has threads and open DB connections
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drop a pool whose worker died so the next call starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize_parallel(path, columns, usecols, numeric_columns, processes):
+    """Merged partials for the whole file, or None when the serial parser must decide"""
+    ranges = split_byte_ranges(path, processes)
+    if len(ranges) < 2:
+        return None
+    pool = _get_pool(processes)
+    try:
+        futures = [
+            pool.submit(summarize_range, path, start, end, columns, usecols, numeric_columns)
+            for start, end in ranges
+        ]
+        partials = [future.result() for future in futures]
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return None
+    if any(partial['quoted'] or partial['failed'] for partial in partials):
+        return None
+
+    merged = {
+        'rows': 0, 'invalid': {}, 'invalid_counts': {}, 'sums': {}, 'mins': {}, 'maxs': {}, 'types': Counter(),
+    }
+    for col in numeric_columns:
+        offset, positions = 0, []
+        for partial in partials:
+            positions.extend(offset + position for position in partial['invalid'][col])
+            offset += partial['rows']
+        merged['invalid'][col] = positions
+        merged['invalid_counts'][col] = sum(partial['invalid_counts'][col] for partial in partials)
+        merged['sums'][col] = math.fsum(partial['sums'][col] for partial in partials)
+        merged['mins'][col] = min(partial['mins'][col] for partial in partials)
+        merged['maxs'][col] = max(partial['maxs'][col] for partial in partials)
+    for partial in partials:
+        merged['rows'] += partial['rows']
+        merged['types'].update(partial['types'])
+    return merged
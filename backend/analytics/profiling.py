@@ -0,0 +1,166 @@
+"""On-demand profiling of single API requests for staff users.
+
+A request sent with ``X-Profile: cprofile`` (or ``sampling``), or with a
+``profile=`` query parameter, is run under that profiler when its Basic
+credentials belong to a staff user. The artifact is stored as a
+RequestProfile and the response carries ``X-Profile-Id``. Admins list and
+download profiles at /api/admin/profiles/.
+
+Requests without the flag only pay a header lookup and a substring check.
+Flagged requests check their credentials here, and the view reuses that
+check (CachedBasicAuthentication), so they cost no extra hashing. Under ASGI only the event loop
+thread is profiled, not work handed to the offload pool; cProfile then also
+sees whatever other requests the loop runs meanwhile.
+"""
+import cProfile
+import marshal
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedBasicAuthentication
+from .models import RequestProfile
+
+
+def _requested_profiler(request):
+    """Profiler named by the request's flag, or None when profiling was not asked for"""
+    mode = request.META.get('HTTP_X_PROFILE')
+    if mode is None:
+        if 'profile=' not in request.META.get('QUERY_STRING', ''):
+            return None
+        mode = request.GET.get('profile')
+    mode = (mode or '').strip().lower()
+    if mode in ('', '0', 'false'):
+        return None
+    return RequestProfile.PROFILER_SAMPLING if mode == 'sampling' else RequestProfile.PROFILER_CPROFILE
+
+
+def _staff_user(request):
+    try:
+        result = CachedBasicAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if result is None or not result[0].is_staff:
+        return None
+    return result[0]
+
+
+class _CProfileSession:
+    profiler = RequestProfile.PROFILER_CPROFILE
+    extension = 'prof'
+
+    def __init__(self):
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop(self):
+        self._profiler.disable()
+        self._profiler.create_stats()
+        # Same format as Profile.dump_stats, readable with pstats / snakeviz
+        return marshal.dumps(self._profiler.stats)
+
+
+class _SamplingSession:
+    profiler = RequestProfile.PROFILER_SAMPLING
+    extension = 'html'
+
+    def __init__(self):
+        from pyinstrument import Profiler
+
+        self._profiler = Profiler()
+        self._profiler.start()
+
+    def stop(self):
+        self._profiler.stop()
+        return self._profiler.output_html().encode('utf-8')
+
+
+def _sampling_available():
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def prune_profiles(keep=None):
+    """Delete all but the newest `keep` profiles and their artifacts"""
+    keep = settings.PROFILE_RETENTION if keep is None else keep
+    stale = list(RequestProfile.objects.all()[keep:])
+    for profile in stale:
+        profile.artifact.delete(save=False)
+    RequestProfile.objects.filter(id__in=[profile.id for profile in stale]).delete()
+
+
+class RequestProfilingMiddleware:
+    """Profile flagged staff requests and store the result"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = _requested_profiler(request)
+        user = _staff_user(request) if profiler is not None else None
+        if user is None:
+            return self.get_response(request)
+
+        session = _start_session(profiler)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            artifact = session.stop()
+        return _store_profile(request, response, user, session, artifact, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        profiler = _requested_profiler(request)
+        user = await sync_to_async(_staff_user)(request) if profiler is not None else None
+        if user is None:
+            return await self.get_response(request)
+
+        session = _start_session(profiler)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            artifact = session.stop()
+        return await sync_to_async(_store_profile)(
+            request, response, user, session, artifact, time.perf_counter() - start
+        )
+
+
+def _start_session(profiler):
+    # pyinstrument is optional; fall back to cProfile without it
+    if profiler == RequestProfile.PROFILER_SAMPLING and _sampling_available():
+        return _SamplingSession()
+    return _CProfileSession()
+
+
+def _store_profile(request, response, user, session, artifact, duration):
+    """Save the artifact as a RequestProfile and point the response at it"""
+    profile = RequestProfile(
+        requested_by=user,
+        method=request.method,
+        path=request.get_full_path()[:2048],
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        profiler=session.profiler,
+    )
+    profile.artifact.save(f"request_{int(time.time() * 1000)}.{session.extension}", ContentFile(artifact), save=False)
+    profile.save()
+    prune_profiles()
+
+    response['X-Profile-Id'] = str(profile.id)
+    response['X-Profile-Url'] = request.build_absolute_uri(reverse('admin-profiles-download', args=[profile.id]))
+    return response
@@ -0,0 +1,71 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .background import run_in_background
+from .models import Dataset, PurgeJob, ValidationReport
+from .retention import delete_datasets, delete_validation_reports
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 200
+
+
+def start_user_purge(user, requested_by):
+    """Deactivate the user now and queue a background purge; returns the job.
+
+    A user who already has a pending or running job gets that job back; a
+    failed one is queued again instead of starting over.
+    """
+    with transaction.atomic():
+        job = PurgeJob.objects.filter(user=user, status__in=PurgeJob.RETRY_STATUSES).first()
+        if job is not None:
+            if job.status == PurgeJob.STATUS_FAILED:
+                job.status = PurgeJob.STATUS_PENDING
+                job.save(update_fields=['status'])
+                transaction.on_commit(lambda: run_in_background(run_purge_job, job.pk))
+            return job
+        # Inactive users fail authentication, so access ends before the purge runs
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        job = PurgeJob.objects.create(
+            user=user,
+            username=user.username,
+            requested_by=requested_by,
+            datasets_total=Dataset.objects.filter(user=user).count(),
+        )
+        transaction.on_commit(lambda: run_in_background(run_purge_job, job.pk))
+    return job
+
+
+def run_purge_job(job_id, batch_size=PURGE_BATCH_SIZE):
+    """Delete the job's user's datasets in batched transactions, then the user.
+
+    Every step can run again, so a failed job is retried by running it anew;
+    the user stays inactive meanwhile.
+    """
+    job = PurgeJob.objects.get(pk=job_id)
+    PurgeJob.objects.filter(pk=job_id).update(status=PurgeJob.STATUS_RUNNING, error='', finished_at=None)
+    try:
+        if job.user_id is not None:
+            while True:
+                batch = list(
+                    Dataset.objects.filter(user_id=job.user_id)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not batch:
+                    break
+                deleted = delete_datasets(Dataset.objects.filter(id__in=batch))
+                PurgeJob.objects.filter(pk=job_id).update(datasets_deleted=F('datasets_deleted') + deleted)
+            delete_validation_reports(ValidationReport.objects.filter(user_id=job.user_id))
+            User.objects.filter(pk=job.user_id).delete()
+    except Exception as exc:
+        logger.exception("Purge job %s failed", job_id)
+        PurgeJob.objects.filter(pk=job_id).update(
+            status=PurgeJob.STATUS_FAILED, error=str(exc), finished_at=timezone.now()
+        )
+        return
+    PurgeJob.objects.filter(pk=job_id).update(status=PurgeJob.STATUS_DONE, finished_at=timezone.now())
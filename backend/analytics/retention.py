@@ -0,0 +1,135 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .background import run_in_background
+from .models import Dataset, PendingFileDeletion, RetentionPolicy, ValidationReport
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+_sweep_lock = threading.Lock()
+
+
+def get_policy(user):
+    """Return the user's policy, else the global policy, else settings.DATASET_RETENTION"""
+    policy = (
+        RetentionPolicy.objects.filter(Q(user=user) | Q(user__isnull=True))
+        .order_by(F('user').asc(nulls_last=True), 'id')
+        .first()
+    )
+    if policy is None:
+        policy = RetentionPolicy(**settings.DATASET_RETENTION)
+    return policy
+
+
+def expired_dataset_ids(user, policy, now=None):
+    """Ids of the user's datasets that fall outside the policy.
+
+    Datasets are ranked newest first; one is expired once it is past the count
+    limit, once the running byte total exceeds the size limit, or once it is
+    older than the age limit. The newest dataset is always kept.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=policy.max_age_days) if policy.max_age_days is not None else None
+    rows = (
+        Dataset.objects.filter(user=user)
+        .order_by('-uploaded_at', '-id')
+        .values_list('id', 'file_size', 'uploaded_at')
+    )
+
+    expired = []
+    total_bytes = 0
+    for position, (dataset_id, file_size, uploaded_at) in enumerate(rows):
+        total_bytes += file_size
+        if position == 0:
+            continue
+        if (
+            (policy.max_datasets is not None and position >= policy.max_datasets)
+            or (policy.max_total_bytes is not None and total_bytes > policy.max_total_bytes)
+            or (cutoff is not None and uploaded_at < cutoff)
+        ):
+            expired.append(dataset_id)
+    return expired
+
+
+def _delete_with_files(queryset, field):
+    """Delete the rows in one query and queue the files in `field` for the sweeper"""
+    with transaction.atomic():
+        names = [name for name in queryset.values_list(field, flat=True) if name]
+        PendingFileDeletion.objects.bulk_create([PendingFileDeletion(name=name) for name in names])
+        deleted, _ = queryset.delete()
+        if names:
+            transaction.on_commit(schedule_sweep)
+    return deleted
+
+
+def delete_datasets(queryset):
+    """Delete the datasets in one query and queue their files for the sweeper"""
+    return _delete_with_files(queryset, 'file')
+
+
+def delete_validation_reports(queryset):
+    """Delete the validation reports in one query and queue their CSVs for the sweeper"""
+    return _delete_with_files(queryset, 'report')
+
+
+def enforce_retention(user):
+    """Apply the user's retention policy; returns the number of datasets removed"""
+    expired = expired_dataset_ids(user, get_policy(user))
+    if not expired:
+        return 0
+    return delete_datasets(Dataset.objects.filter(id__in=expired))
+
+
+def _referenced_names(names):
+    """Those of names a live dataset or validation report points at again"""
+    return set(Dataset.objects.filter(file__in=names).values_list('file', flat=True)) | set(
+        ValidationReport.objects.filter(report__in=names).values_list('report', flat=True)
+    )
+
+
+def sweep_pending_files(batch_size=SWEEP_BATCH_SIZE):
+    """Delete queued files from storage in batches; returns how many were removed.
+
+    A name that a new upload has since been saved under is dropped from the
+    queue without touching the file, which now belongs to the new row.
+    """
+    if not _sweep_lock.acquire(blocking=False):
+        return 0
+    storage = Dataset._meta.get_field('file').storage
+    removed = 0
+    try:
+        while True:
+            batch = list(PendingFileDeletion.objects.order_by('id')[:batch_size])
+            if not batch:
+                break
+            done, reused = [], 0
+            referenced = _referenced_names([pending.name for pending in batch])
+            for pending in batch:
+                if pending.name in referenced:
+                    done.append(pending.id)
+                    reused += 1
+                    continue
+                try:
+                    storage.delete(pending.name)
+                    done.append(pending.id)
+                except OSError as exc:
+                    logger.warning("Could not delete %s: %s", pending.name, exc)
+            PendingFileDeletion.objects.filter(id__in=done).delete()
+            removed += len(done) - reused
+            if len(done) < len(batch):
+                # Leave failures for the next sweep instead of retrying them in a loop
+                break
+    finally:
+        _sweep_lock.release()
+    return removed
+
+
+def schedule_sweep():
+    run_in_background(sweep_pending_files)
@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from .models import Dataset
+from .models import Dataset, PurgeJob, RequestProfile, ValidationReport
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,8 +13,8 @@ class DatasetSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Dataset
-        fields = ['id', 'file', 'uploaded_at', 'owner']
-        read_only_fields = ['id', 'uploaded_at', 'owner']
+        fields = ['id', 'file', 'uploaded_at', 'updated_at', 'owner', 'content_hash']
+        read_only_fields = ['id', 'uploaded_at', 'updated_at', 'owner', 'content_hash']
 
     def get_owner(self, obj):
         if not obj.user:
@@ -24,3 +24,40 @@ class DatasetSerializer(serializers.ModelSerializer):
             'username': obj.user.username,
             'email': obj.user.email,
         }
+
+
+class PurgeJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PurgeJob
+        fields = [
+            'id', 'user', 'username', 'requested_by', 'status',
+            'datasets_total', 'datasets_deleted', 'error', 'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    requested_by = serializers.SlugRelatedField(slug_field='username', read_only=True)
+
+    class Meta:
+        model = RequestProfile
+        fields = ['id', 'requested_by', 'method', 'path', 'status_code', 'duration_ms', 'profiler', 'created_at']
+        read_only_fields = fields
+
+
+class ValidationReportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ValidationReport
+        fields = ['id', 'file_name', 'message', 'error_count', 'counts', 'created_at']
+        read_only_fields = fields
+
+
+class AppendRowsSerializer(serializers.Serializer):
+    file = serializers.FileField()
+
+
+class BulkDatasetActionSerializer(serializers.Serializer):
+    ACTIONS = ['delete', 'reanalyze', 'export']
+
+    action = serializers.ChoiceField(choices=ACTIONS)
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
@@ -0,0 +1,165 @@
+"""Ordering of filtered records for ``sort=-Pressure,Temperature&limit=100``.
+
+A sort is a comma-separated list of columns, each optionally prefixed with
+``-`` for descending order. Missing values always sort last. Ties keep file
+order, as a stable sort would.
+
+- With a limit smaller than the number of matches, a partial selection
+  (np.partition) finds the k-th value of the first key. Only the rows up to
+  it (ties included) are then fully ordered, so "hottest 100 units" is linear in
+  the number of matches.
+- Without a limit, each key column's sort index is used: its dense ranks
+  and its stable order. A single key walks the cached order and keeps the
+  matching rows. Several keys fold their integer ranks and the row position
+  into one int64 and argsort that, instead of comparing floats or strings
+  again key by key.
+
+Sort indexes are built on first use for a file and kept in a small LRU
+cache, keyed by the file's path, size and modification time.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from .filters import resolve_column
+from .metrics import record_cache
+
+SORT_INDEX_CACHE_SIZE = 32
+
+_index_lock = threading.Lock()
+_indexes = OrderedDict()
+
+
+def parse_sort(raw, columns):
+    """[(column, descending)] for a sort parameter; raises ValueError for unknown columns"""
+    keys = []
+    for part in raw.split(','):
+        part = part.strip()
+        descending = part.startswith('-')
+        name = part.lstrip('+-').strip()
+        if not name:
+            raise ValueError("Invalid sort value.")
+        try:
+            column = resolve_column(name, list(columns))
+        except ValueError:
+            raise ValueError(f"Unknown sort column '{name}'.")
+        if column not in (key for key, _ in keys):
+            keys.append((column, descending))
+    return keys
+
+
+def parse_limit(raw):
+    """Positive int from a limit parameter, or None when absent"""
+    if not raw:
+        return None
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("Invalid limit value.")
+    if limit < 1:
+        raise ValueError("Invalid limit value.")
+    return limit
+
+
+def file_identity(file_path):
+    """Cache key that changes whenever the file is rewritten or appended to"""
+    stat = os.stat(file_path)
+    return file_path, stat.st_size, stat.st_mtime_ns
+
+
+class SortIndex:
+    """Dense ranks of one column (missing values rank last) and its stable orders"""
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values, sort=True)
+        self.distinct = len(uniques)
+        self.ranks = np.where(codes < 0, self.distinct, codes)
+        self._orders = {}
+
+    def key(self, descending):
+        """Ranks to sort ascending by; reversed for descending, missing values still last"""
+        if not descending:
+            return self.ranks
+        return np.where(self.ranks == self.distinct, self.distinct, self.distinct - 1 - self.ranks)
+
+    def order(self, descending):
+        if descending not in self._orders:
+            self._orders[descending] = np.argsort(self.key(descending), kind='stable')
+        return self._orders[descending]
+
+
+def sort_index(df, column, identity=None):
+    """SortIndex of df[column], cached per file identity when one is given"""
+    if identity is None:
+        return SortIndex(df[column])
+    key = (identity, column, str(df[column].dtype), len(df))
+    with _index_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+    record_cache('sort_index', index is not None)
+    if index is None:
+        index = SortIndex(df[column])
+        with _index_lock:
+            _indexes[key] = index
+            while len(_indexes) > SORT_INDEX_CACHE_SIZE:
+                _indexes.popitem(last=False)
+    return index
+
+
+def _value_key(df, column, positions, descending, identity):
+    """Sort key of the rows at positions: the values themselves for numbers, ranks otherwise"""
+    values = df[column]
+    if is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+        # Float keys: NaN stays NaN under negation and argsort/lexsort put it last
+        key = values.to_numpy(dtype='float64', na_value=np.nan)[positions]
+        return -key if descending else key
+    return sort_index(df, column, identity).key(descending)[positions]
+
+
+def _first_candidates(key, k):
+    """Indices of the keys that can be among the k smallest: up to the k-th value, ties included"""
+    filled = np.where(np.isnan(key), np.inf, key) if key.dtype.kind == 'f' else key
+    kth = np.partition(filled, k - 1)[k - 1]
+    if key.dtype.kind == 'f' and np.isinf(kth):
+        # Fewer than k finite values: missing values and infinities all stay candidates
+        return np.arange(len(key))
+    return np.flatnonzero(filled <= kth)
+
+
+def order_positions(df, positions, keys, limit=None, identity=None):
+    """positions (row positions of df, increasing) reordered by keys, cut to limit"""
+    if not keys or not len(positions):
+        return positions[:limit]
+
+    if limit is not None and limit < len(positions):
+        column, descending = keys[0]
+        candidates = _first_candidates(_value_key(df, column, positions, descending, identity), limit)
+        positions = positions[candidates]
+        sort_keys = [_value_key(df, column, positions, descending, identity) for column, descending in keys]
+        return positions[np.lexsort(sort_keys[::-1])][:limit]
+
+    if len(keys) == 1:
+        column, descending = keys[0]
+        order = sort_index(df, column, identity).order(descending)
+        selected = np.zeros(len(df), dtype=bool)
+        selected[positions] = True
+        return order[selected[order]]
+
+    indexes = [(sort_index(df, column, identity), descending) for column, descending in keys]
+    combinations = math.prod(index.distinct + 1 for index, _ in indexes)
+    if combinations < 2 ** 63:
+        composite = np.zeros(len(positions), dtype=np.int64)
+        for index, descending in indexes:
+            composite = composite * (index.distinct + 1) + index.key(descending)[positions]
+        if combinations * len(df) < 2 ** 63:
+            # With the row position folded in every key is distinct, so the faster unstable sort is exact
+            return positions[np.argsort(composite * len(df) + positions)]
+        return positions[np.argsort(composite, kind='stable')]
+    ranks = [index.key(descending)[positions] for index, descending in indexes]
+    return positions[np.lexsort(ranks[::-1])]
@@ -1,3 +1,1258 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.http import HttpResponse, QueryDict
+from django.test import (
+    AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.utils import timezone
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.test import APIClient
+
+from . import async_views
+from .background import map_files
+from .ingest import file_stats
+from .metrics import RequestMetricsMiddleware, registry, stage
+from .middleware import RequestDecompressionMiddleware, ResponseCompressionMiddleware
+from .models import Dataset, PendingFileDeletion, PurgeJob, RequestProfile, RetentionPolicy
+from .parallel_csv import split_byte_ranges
+from .profiling import RequestProfilingMiddleware
+from .purge import run_purge_job
+from .retention import delete_datasets, expired_dataset_ids, get_policy, sweep_pending_files
+from .utils import analyze_csv, frame_memory_bytes, memory_report, parallel_stats, validate_csv
+from .views import records_payload
+
+
+def basic_auth(username, password='pass'):
+    """Request headers authenticating as username with HTTP Basic auth"""
+    token = base64.b64encode(f'{username}:{password}'.encode()).decode()
+    return {'HTTP_AUTHORIZATION': f'Basic {token}'}
+
+
+class UploadedDatasetTestCase(TestCase):
+    """A temporary MEDIA_ROOT and an APIClient logged in as `username`.
+
+    When CSV is set it is uploaded in setUp and its dataset id kept as
+    self.dataset_id. SETTINGS holds further overrides for the whole test.
+    """
+
+    username = 'tester'
+    CSV = None
+    SETTINGS = {}
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = self.settings(MEDIA_ROOT=self.media_root, **self.SETTINGS)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user(self.username, password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        if self.CSV is not None:
+            self.dataset_id = self.upload(self.CSV).data['id']
+
+    def upload(self, content, name='plant.csv'):
+        return self.client.post('/api/datasets/', {'file': SimpleUploadedFile(name, content)})
+
+
+class DatasetListQueryCountTests(TestCase):
+    """The dataset list must not issue per-row queries (e.g. for owners)"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _create_datasets(self, users, per_user):
+        for user in users:
+            for i in range(per_user):
+                Dataset.objects.create(user=user, file=f'uploads/{user.username}_{i}.csv')
+
+    def test_admin_list_query_count_is_constant(self):
+        users = [User.objects.create_user(f'user{i}', password='pass') for i in range(3)]
+        self._create_datasets(users[:1], 2)
+        with self.assertNumQueries(3):
+            small = self.client.get('/api/datasets/')
+
+        self._create_datasets(users, 8)
+        with self.assertNumQueries(3):
+            large = self.client.get('/api/datasets/')
+
+        self.assertEqual(len(small.data['results']), 2)
+        self.assertEqual(len(large.data['results']), 20)
+        self.assertIsNotNone(large.data['next'])
+        self.assertIn('owner', large.data['results'][0])
+
+    def test_cursor_pages_cover_every_dataset_once(self):
+        user = User.objects.create_user('owner', password='pass')
+        self._create_datasets([user], 25)
+
+        seen = []
+        url = '/api/datasets/?page_size=10'
+        while url:
+            page = self.client.get(url).data
+            seen.extend(item['id'] for item in page['results'])
+            url = page['next']
+        self.assertEqual(sorted(seen), sorted(Dataset.objects.values_list('id', flat=True)))
+
+
+class SQLiteConcurrencyStressTests(TransactionTestCase):
+    """Parallel uploads, reads and deletes must not fail with "database is locked"."""
+
+    USERS = 4
+    ADMIN_READERS = 2
+    ROUNDS = 6
+    CSV = b"Equipment Name,Type,Flowrate,Pressure,Temperature\n" + b"".join(
+        f"Unit {i},Pump,{i}.5,{i * 2},{i * 3}\n".encode() for i in range(200)
+    )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(
+            MEDIA_ROOT=media_root,
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.users = [User.objects.create_user(f'stress{i}', password='pass') for i in range(self.USERS)]
+        self.admin = User.objects.create_superuser('stress-admin', 'admin@example.com', 'pass')
+        self.errors = []
+
+    def _check(self, response, *expected):
+        if response.status_code not in expected:
+            self.errors.append(f'{response.request["PATH_INFO"]}: {response.status_code}')
+
+    def _run(self, target, user):
+        try:
+            target(Client(), basic_auth(user.username))
+        except Exception as exc:
+            self.errors.append(repr(exc))
+        finally:
+            connections.close_all()
+
+    def _uploader(self, client, headers):
+        for round_number in range(self.ROUNDS):
+            upload = SimpleUploadedFile(f'round{round_number}.csv', self.CSV, content_type='text/csv')
+            self._check(client.post('/api/datasets/', {'file': upload}, **headers), 201)
+
+            listing = client.get('/api/datasets/', **headers)
+            self._check(listing, 200)
+            ids = [item['id'] for item in listing.json()['results']]
+            self._check(client.get(f'/api/datasets/{ids[0]}/summary/', **headers), 200)
+            self._check(client.get(f'/api/datasets/{ids[0]}/records/?type=Pump', **headers), 200)
+            if round_number % 2 and len(ids) > 1:
+                self._check(client.delete(f'/api/datasets/{ids[-1]}/', **headers), 204)
+
+    def _admin_reader(self, client, headers):
+        for _ in range(self.ROUNDS * 2):
+            listing = client.get('/api/datasets/', **headers)
+            self._check(listing, 200)
+            for item in listing.json()['results'][:3]:
+                # Owners may delete the dataset between the list and this read
+                self._check(client.get(f'/api/datasets/{item["id"]}/summary/', **headers), 200, 404)
+
+    def test_parallel_uploads_reads_and_deletes(self):
+        threads = [threading.Thread(target=self._run, args=(self._uploader, user)) for user in self.users]
+        threads += [
+            threading.Thread(target=self._run, args=(self._admin_reader, self.admin))
+            for _ in range(self.ADMIN_READERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.errors, [])
+        for user in self.users:
+            remaining = Dataset.objects.filter(user=user).count()
+            self.assertGreaterEqual(remaining, 1)
+            self.assertLessEqual(remaining, 5)
+
+
+class AsyncReadViewTests(UploadedDatasetTestCase):
+    """The async read views must answer exactly like the DRF actions they replace under ASGI"""
+
+    username = 'reader'
+    CSV = (
+        b"Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+        b"Pump A,Pump,10.5,4.2,80\nPump B,Pump,12.0,5.1,85\nValve C,Valve,3.3,1.2,40\n"
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.headers = basic_auth(self.username)
+        self.factory = RequestFactory()
+
+    def _call_async(self, view, path, **extra):
+        request = self.factory.get(path, **{**self.headers, **extra})
+        return async_to_sync(view)(request, pk=self.dataset_id)
+
+    def test_summary_and_records_match_sync_views(self):
+        for view, suffix in [
+            (async_views.dataset_summary, 'summary/'),
+            (async_views.dataset_records, 'records/?type=Pump&pressure_min=4.5'),
+        ]:
+            path = f'/api/datasets/{self.dataset_id}/{suffix}'
+            expected = self.client.get(path, **self.headers)
+            response = self._call_async(view, path)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, expected.content)
+            self.assertEqual(response['ETag'], expected['ETag'])
+
+            revalidated = self._call_async(view, path, HTTP_IF_NONE_MATCH=expected['ETag'])
+            self.assertEqual(revalidated.status_code, 304)
+
+    def test_errors_match_sync_views(self):
+        path = f'/api/datasets/{self.dataset_id}/records/?pressure_min=abc'
+        response = self._call_async(async_views.dataset_records, path)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, self.client.get(path, **self.headers).content)
+
+        User.objects.create_user('other', password='pass')
+        self.assertEqual(self._call_async(async_views.dataset_summary, path, **basic_auth('other')).status_code, 404)
+        self.assertEqual(self._call_async(async_views.dataset_summary, path, HTTP_AUTHORIZATION='').status_code, 401)
+
+        pdf = self._call_async(async_views.dataset_download_pdf, f'/api/datasets/{self.dataset_id}/download_pdf/')
+        self.assertEqual(pdf['Content-Type'], 'application/pdf')
+        self.assertTrue(pdf.content.startswith(b'%PDF'))
+
+
+class RequestMetricsTests(UploadedDatasetTestCase):
+    """Stage timings reach the Server-Timing header and the Prometheus endpoint"""
+
+    username = 'metrics'
+    CSV = AsyncReadViewTests.CSV
+    SETTINGS = {'METRICS_TOKEN': 'scrape-token'}
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        # Real Basic auth, so the authentication stage is timed
+        self.client.force_authenticate(None)
+        self.headers = basic_auth(self.username)
+
+    def test_records_reports_stages_and_metrics(self):
+        path = f'/api/datasets/{self.dataset_id}/records/?type=Pump'
+        response = self.client.get(path, **self.headers)
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        for expected in ['auth', 'parse', 'validate', 'filter', 'serialize', 'render', 'total']:
+            self.assertIn(expected, stages)
+
+        self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'], **self.headers)
+        metrics = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(metrics.status_code, 200)
+        body = metrics.content.decode()
+        self.assertIn('chemviz_http_requests_total{endpoint="dataset-records",method="GET",status="200"} 1', body)
+        self.assertIn('chemviz_http_requests_total{endpoint="dataset-records",method="GET",status="304"} 1', body)
+        self.assertIn('chemviz_cache_requests_total{cache="conditional_get",result="hit"} 1', body)
+        self.assertIn('chemviz_stage_duration_seconds_count{endpoint="dataset-records",stage="parse"} 1', body)
+        self.assertIn('chemviz_http_response_size_bytes_bucket{endpoint="dataset-records",le="+Inf"} 2', body)
+
+    def test_metrics_need_local_address_and_credentials(self):
+        token = {'HTTP_AUTHORIZATION': 'Bearer scrape-token'}
+        self.assertEqual(self.client.get('/api/metrics/', REMOTE_ADDR='203.0.113.9', **token).status_code, 403)
+        # Behind a proxy every request is local, so the address alone does not grant access
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/api/metrics/', **self.headers).status_code, 401)
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 401)
+
+        User.objects.filter(username=self.username).update(is_staff=True)
+        self.assertEqual(self.client.get('/api/metrics/', **self.headers).status_code, 200)
+
+
+class RequestProfilingTests(TestCase):
+    """Staff can profile a request on demand; everyone else is unaffected"""
+
+    def setUp(self):
+        profile_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_root, ignore_errors=True)
+        overrides = self.settings(PROFILE_ROOT=profile_root, PROFILE_RETENTION=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        User.objects.create_superuser('profiler', 'admin@example.com', 'pass')
+        User.objects.create_user('regular', password='pass')
+        self.admin_headers = basic_auth('profiler')
+        self.user_headers = basic_auth('regular')
+
+    def test_staff_request_is_profiled_and_downloadable(self):
+        response = self.client.get('/api/datasets/', HTTP_X_PROFILE='cprofile', **self.admin_headers)
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        listing = self.client.get('/api/admin/profiles/', **self.admin_headers).json()
+        self.assertEqual([item['id'] for item in listing], [int(profile_id)])
+        self.assertEqual(listing[0]['path'], '/api/datasets/')
+
+        download = self.client.get(f'/api/admin/profiles/{profile_id}/download/', **self.admin_headers)
+        with tempfile.NamedTemporaryFile(suffix='.prof') as artifact:
+            artifact.write(b''.join(download.streaming_content))
+            artifact.flush()
+            self.assertTrue(pstats.Stats(artifact.name).total_calls > 0)
+
+        stats = self.client.get(f'/api/admin/profiles/{profile_id}/stats/', **self.admin_headers)
+        self.assertIn('cumulative', stats.content.decode())
+
+    def test_non_staff_and_unflagged_requests_are_not_profiled(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/datasets/?profile=1', **self.user_headers))
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/datasets/', **self.admin_headers))
+        self.assertEqual(RequestProfile.objects.count(), 0)
+        self.assertEqual(self.client.get('/api/admin/profiles/', **self.user_headers).status_code, 403)
+
+    def test_flagged_requests_check_credentials_once(self):
+        check = BasicAuthentication.authenticate_credentials
+        for headers, profiled in [(self.user_headers, False), (self.admin_headers, True)]:
+            with self.subTest(profiled=profiled):
+                with mock.patch.object(
+                    BasicAuthentication, 'authenticate_credentials', autospec=True, side_effect=check
+                ) as checking:
+                    response = self.client.get('/api/datasets/', HTTP_X_PROFILE='cprofile', **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual('X-Profile-Id' in response, profiled)
+                self.assertEqual(checking.call_count, 1)
+
+        bad = basic_auth('regular', password='wrong')
+        self.assertEqual(self.client.get('/api/datasets/', HTTP_X_PROFILE='cprofile', **bad).status_code, 401)
+
+    def test_retention_keeps_newest_profiles(self):
+        ids = [
+            self.client.get('/api/datasets/', HTTP_X_PROFILE='1', **self.admin_headers)['X-Profile-Id']
+            for _ in range(3)
+        ]
+        remaining = list(RequestProfile.objects.values_list('id', flat=True))
+        self.assertEqual(sorted(remaining), sorted(int(profile_id) for profile_id in ids[1:]))
+        self.assertEqual(len(os.listdir(settings.PROFILE_ROOT)), 2)
+
+
+class TypedCsvReaderTests(TestCase):
+    """The typed reader projects and types columns without changing any result"""
+
+    CSV = (
+        "Notes,Equipment Name,Type,Flowrate,Pressure,Temperature,Vendor\n"
+        "a,Pump A,Pump,10.5,4.2,80,x\n"
+        "b,Pump B,Pump,12.1,5.1,85,y\n"
+        "c,Valve C,Valve,3.3,1.2,40,z\n"
+    )
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, self.path)
+        with os.fdopen(handle, 'w') as f:
+            f.write(self.CSV)
+
+    def test_reads_only_used_columns_with_categorical_type(self):
+        df = validate_csv(self.path)
+        self.assertEqual(
+            sorted(df.columns), ['Equipment Name', 'Flowrate', 'Pressure', 'Temperature', 'Type']
+        )
+        self.assertEqual(str(df['Type'].dtype), 'category')
+        self.assertLess(frame_memory_bytes(df), memory_report(self.path)['default_bytes'])
+
+    def test_float32_storage_keeps_results(self):
+        query = QueryDict('type=Pump&pressure_min=4.2')
+        expected = (analyze_csv(self.path), records_payload(self.path, query))
+        with self.settings(CSV_FLOAT32=True):
+            self.assertEqual(str(validate_csv(self.path)['Flowrate'].dtype), 'float32')
+            self.assertEqual((analyze_csv(self.path), records_payload(self.path, query)), expected)
+        self.assertEqual(expected[1]['records'][0]['pressure'], 4.2)
+
+    def test_invalid_values_are_reported_by_row(self):
+        with open(self.path, 'a') as f:
+            f.write("d,Pump D,Pump,fast,1.0,50,w\n")
+        with self.assertRaisesMessage(ValueError, "Invalid value in column 'Flowrate' at row(s): 5."):
+            validate_csv(self.path)
+
+
+class ParallelAnalyzeTests(TestCase):
+    """Byte-range parsing across processes must agree with the serial parser"""
+
+    def _write(self, lines):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as f:
+            f.write("Equipment Name,Type,Flowrate,Pressure,Temperature\n")
+            f.writelines(lines)
+        return path
+
+    def _rows(self, count, bad_rows=()):
+        types = ['Pump', 'Valve', 'Reactor']
+        return [
+            f"Unit {i},{types[i % 3]},{'bad' if i in bad_rows else i * 1.5},{i % 17},{20 + i % 50}\n"
+            for i in range(count)
+        ]
+
+    def test_split_ranges_start_on_line_boundaries(self):
+        path = self._write(self._rows(1000))
+        ranges = split_byte_ranges(path, 4)
+        self.assertEqual(len(ranges), 4)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(ranges[-1][1], len(data))
+        for start, _ in ranges:
+            self.assertEqual(data[start - 1:start], b'\n')
+
+    def test_summary_matches_serial(self):
+        path = self._write(self._rows(3000))
+        serial = analyze_csv(path, parallel=False)
+        with self.settings(INGEST_PROCESSES=3):
+            parallel = analyze_csv(path, parallel=True)
+        self.assertEqual(parallel, serial)
+
+    def test_invalid_rows_keep_exact_numbers(self):
+        # Bad values spread over several ranges, plus a blank line the parser skips
+        lines = self._rows(3000, bad_rows={10, 1500, 1501, 2990, 2991, 2992})
+        lines.insert(1200, "\n")
+        path = self._write(lines)
+        with self.assertRaises(ValueError) as serial:
+            analyze_csv(path, parallel=False)
+        with self.settings(INGEST_PROCESSES=3), self.assertRaises(ValueError) as parallel:
+            analyze_csv(path, parallel=True)
+        self.assertEqual(str(parallel.exception), str(serial.exception))
+        self.assertIn("12, 1502, 1503, 2992, 2993, ...", str(serial.exception))
+
+
+class SinglePassIngestTests(UploadedDatasetTestCase):
+    """Uploads are validated from the stream; only valid files reach storage"""
+
+    ROWS = (
+        b"Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+        b"Pump A,Pump,10.5,4.2,80\nPump B,Pump,12.0,5.1,85\nValve C,Valve,3.3,1.2,40\n"
+    )
+
+    def test_valid_upload_stores_file_hash_and_summary(self):
+        response = self.upload(self.ROWS)
+        self.assertEqual(response.status_code, 201)
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertEqual(dataset.content_hash, hashlib.sha256(self.ROWS).hexdigest())
+        self.assertEqual(dataset.file_size, len(self.ROWS))
+        with dataset.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.ROWS)
+
+        expected = analyze_csv(dataset.file.path)
+        self.assertEqual(response.data['summary'], expected)
+        self.assertEqual(self.client.get(f'/api/datasets/{dataset.id}/summary/').json(), expected)
+
+    def test_invalid_upload_writes_nothing(self):
+        bad = self.ROWS.replace(b"12.0", b"twelve")
+        response = self.upload(bad)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], "Invalid value in column 'Flowrate' at row(s): 3.")
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'uploads')))
+
+    def test_large_upload_hash_covers_every_byte(self):
+        # Bigger than the reader's buffer, so the parser re-reads the header and reads in pieces
+        rows = b"".join(f"Unit {i},Pump,{i}.5,{i % 9},{i % 70}\n".encode() for i in range(120_000))
+        content = self.ROWS + rows
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertEqual(dataset.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(response.data['summary']['total_equipment'], 120_003)
+
+
+class ParallelIngestTests(UploadedDatasetTestCase):
+    """Uploads from PARALLEL_INGEST_MIN_BYTES are summarized by the byte-range workers"""
+
+    SETTINGS = {'INGEST_PROCESSES': 2, 'PARALLEL_INGEST_MIN_BYTES': 1, 'FILE_UPLOAD_MAX_MEMORY_SIZE': 0}
+
+    def _csv(self, count, pressure=lambda i: i % 17):
+        types = ['Pump', 'Valve', 'Reactor']
+        lines = ["Timestamp,Equipment Name,Type,Flowrate,Pressure,Temperature"] + [
+            f"2024-03-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d},Unit {i},{types[i % 3]},"
+            f"{i * 1.5},{pressure(i)},{20 + i % 50}"
+            for i in range(count)
+        ]
+        return ("\n".join(lines) + "\n").encode()
+
+    def test_upload_is_summarized_in_parallel(self):
+        content = self._csv(3000)
+        with mock.patch('analytics.ingest.read_equipment_csv', side_effect=AssertionError('parsed serially')):
+            response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertEqual(dataset.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(dataset.file_size, len(content))
+        self.assertEqual(file_stats(dataset.file.path, 'Timestamp'), dataset.stats)
+        with self.settings(INGEST_PROCESSES=1):
+            self.assertEqual(file_stats(dataset.file.path, 'Timestamp'), dataset.stats)
+
+    def test_rule_violation_gets_the_serial_report(self):
+        content = self._csv(3000, pressure=lambda i: 900 if i == 2500 else i % 17)
+        with self.settings(VALIDATION_RANGES={'Pressure': (0, 400)}):
+            response = self.upload(content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['validation_report']['error_count'], 1)
+        issues = self.client.get(f"/api/validation-reports/{response.data['validation_report']['id']}/issues/")
+        self.assertEqual(issues.json()['results'][0]['row'], 2502)
+
+    def test_append_summarizes_legacy_dataset_in_parallel(self):
+        dataset_id = self.upload(self._csv(3000)).data['id']
+        Dataset.objects.filter(pk=dataset_id).update(stats=None)
+        extra = b"Timestamp,Equipment Name,Type,Flowrate,Pressure,Temperature\n2024-03-01T01:00:00,Late,Pump,1,2,3\n"
+        with mock.patch('analytics.ingest.parallel_stats', wraps=parallel_stats) as stats:
+            response = self.client.post(
+                f'/api/datasets/{dataset_id}/append/', {'file': SimpleUploadedFile('late.csv', extra)}
+            )
+        self.assertEqual(response.status_code, 200)
+        stats.assert_called_once()
+        dataset = Dataset.objects.get(pk=dataset_id)
+        self.assertEqual(response.data['summary'], analyze_csv(dataset.file.path, parallel=False))
+        self.assertEqual(dataset.stats['time'][1], '2024-03-01T01:00:00')
+
+
+class ValidationReportTests(UploadedDatasetTestCase):
+    """Rejected uploads get a report with every issue, paged and downloadable"""
+
+    INVALID = (
+        b"Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+        b"Pump A,Pump,10.5,4.2,80\n"
+        b"Pump B,Pump,abc,,85\n"
+        b"Valve C,Valve,3.3,900,-300\n"
+        b"Mixer D,Mixer,,1.2,xyz\n"
+    )
+    SETTINGS = {
+        'VALIDATION_RANGES': {'Pressure': (0, 400), 'Temperature': (-273.15, None)},
+        'VALIDATION_ALLOWED_TYPES': ['Pump', 'Valve'],
+    }
+
+    def _reject(self):
+        response = self.upload(self.INVALID)
+        self.assertEqual(response.status_code, 400)
+        return response
+
+    def test_every_rule_is_reported_in_one_attempt(self):
+        response = self._reject()
+        self.assertEqual(response.data['error'], "Invalid value in column 'Flowrate' at row(s): 3, 5.")
+        report = response.data['validation_report']
+        self.assertEqual(report['error_count'], 7)
+        self.assertEqual(report['counts'], {
+            'missing_value': 2, 'non_numeric': 2, 'out_of_range': 2, 'unknown_type': 1,
+        })
+
+        issues = self.client.get(f"/api/validation-reports/{report['id']}/issues/?page_size=3").json()
+        self.assertEqual(issues['count'], 7)
+        self.assertEqual(issues['results'][0], {
+            'row': 3, 'column': 'Flowrate', 'rule': 'non_numeric', 'value': 'abc', 'message': 'Not a number.',
+        })
+        second_page = self.client.get(issues['next']).json()
+        self.assertEqual(
+            [(issue['row'], issue['column']) for issue in second_page['results']],
+            [(4, 'Temperature'), (5, 'Type'), (5, 'Flowrate')],
+        )
+
+        download = self.client.get(f"/api/validation-reports/{report['id']}/download/")
+        lines = b''.join(download.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'row,column,rule,value,message')
+        self.assertEqual(len(lines), 8)
+
+    def test_missing_columns_and_visibility(self):
+        response = self.upload(b"Type,Flowrate\nPump,1\n")
+        self.assertEqual(response.data['error'], "Missing required column(s): Pressure, Temperature.")
+        report_id = response.data['validation_report']['id']
+        issues = self.client.get(f"/api/validation-reports/{report_id}/issues/").json()['results']
+        self.assertEqual(
+            [(issue['row'], issue['column']) for issue in issues], [(None, 'Pressure'), (None, 'Temperature')]
+        )
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('someone', password='pass'))
+        self.assertEqual(other.get(f"/api/validation-reports/{report_id}/").status_code, 404)
+
+
+class AppendRowsTests(UploadedDatasetTestCase):
+    """Appended rows are validated alone and folded into the stored summary"""
+
+    CSV = (
+        b"Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+        b"Pump A,Pump,10.5,4.2,80\nValve C,Valve,3.3,1.2,40"
+    )
+
+    def _append(self, content):
+        return self.client.post(
+            f'/api/datasets/{self.dataset_id}/append/', {'file': SimpleUploadedFile('shift.csv', content)}
+        )
+
+    def test_append_updates_file_and_summary(self):
+        etag = self.client.get(f'/api/datasets/{self.dataset_id}/summary/')['ETag']
+        # Reordered columns are written in the dataset's order
+        response = self._append(b"Type,Equipment Name,Flowrate,Pressure,Temperature\nValve,Valve D,7.2,2.0,55\n")
+        self.assertEqual(response.status_code, 200)
+        response = self._append(b"Equipment Name,Type,Flowrate,Pressure,Temperature\nPump E,Pump,1.0,3.0,60\n")
+        self.assertEqual(response.status_code, 200)
+
+        dataset = Dataset.objects.get(pk=self.dataset_id)
+        with dataset.file.open('rb') as stored:
+            self.assertEqual(
+                stored.read(), self.CSV + b"\nValve D,Valve,7.2,2.0,55\nPump E,Pump,1.0,3.0,60\n"
+            )
+        self.assertEqual(dataset.file_size, os.path.getsize(dataset.file.path))
+
+        expected = analyze_csv(dataset.file.path)
+        self.assertEqual(response.data['summary'], expected)
+        summary = self.client.get(f'/api/datasets/{self.dataset_id}/summary/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(summary.status_code, 200)
+        self.assertEqual(summary.json(), expected)
+
+    def test_invalid_rows_leave_dataset_unchanged(self):
+        before = Dataset.objects.get(pk=self.dataset_id)
+        response = self._append(b"Equipment Name,Type,Flowrate,Pressure,Temperature\nPump F,Pump,x,3.0,60\n")
+        self.assertEqual(response.data['error'], "Invalid value in column 'Flowrate' at row(s): 2.")
+        self.assertIn('validation_report', response.data)
+
+        response = self._append(b"Type,Flowrate,Pressure,Temperature\nPump,1,3.0,60\n")
+        self.assertEqual(response.status_code, 400)
+        after = Dataset.objects.get(pk=self.dataset_id)
+        self.assertEqual((after.stats, after.file_size), (before.stats, before.file_size))
+        with after.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.CSV)
+
+
+class TimeSeriesTests(UploadedDatasetTestCase):
+    """Timestamped uploads are stored in time order and served downsampled"""
+
+    def _csv(self, seconds):
+        lines = ["Timestamp,Equipment Name,Type,Flowrate,Pressure,Temperature"]
+        for second in seconds:
+            stamp = f"2024-03-01T{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+            lines.append(f"{stamp},Unit {second},Pump,{second % 7},{(second * 37) % 101},{20 + second % 13}")
+        return ("\n".join(lines) + "\n").encode()
+
+    def test_unsorted_upload_is_stored_in_time_order(self):
+        response = self.upload(self._csv([5, 1, 3, 2, 4]))
+        self.assertEqual(response.status_code, 201)
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertEqual(dataset.time_column, 'Timestamp')
+        stored = pd.read_csv(dataset.file.path)
+        self.assertEqual(stored['Equipment Name'].tolist(), [f'Unit {i}' for i in range(1, 6)])
+        self.assertEqual(dataset.stats['time'], ['2024-03-01T00:00:01', '2024-03-01T00:00:05'])
+
+        # Older rows appended later are merged into place
+        appended = self.client.post(
+            f'/api/datasets/{dataset.id}/append/', {'file': SimpleUploadedFile('late.csv', self._csv([0, 6]))}
+        )
+        self.assertEqual(appended.status_code, 200)
+        stored = pd.read_csv(dataset.file.path)
+        self.assertEqual(stored['Equipment Name'].tolist(), [f'Unit {i}' for i in range(7)])
+        self.assertEqual(appended.data['summary'], analyze_csv(dataset.file.path))
+
+    def test_downsampled_window(self):
+        dataset_id = self.upload(self._csv(range(5000))).data['id']
+        url = f'/api/datasets/{dataset_id}/timeseries/'
+
+        lttb = self.client.get(url, {'parameter': 'Pressure', 'points': 100}).json()
+        self.assertEqual((lttb['total'], len(lttb['timestamps']), len(lttb['values'])), (5000, 100, 100))
+        self.assertEqual(lttb['timestamps'][0], '2024-03-01T00:00:00')
+        self.assertEqual(lttb['timestamps'][-1], '2024-03-01T01:23:19')
+
+        window = self.client.get(url, {
+            'parameter': 'Pressure', 'method': 'minmax', 'points': 40,
+            'start': '2024-03-01T00:10:00', 'end': '2024-03-01T00:19:59',
+        }).json()
+        self.assertEqual(window['total'], 600)
+        self.assertLessEqual(len(window['values']), 40)
+        # Min/max buckets keep the extremes of the window
+        self.assertEqual((min(window['values']), max(window['values'])), (0.0, 100.0))
+        self.assertTrue(all('2024-03-01T00:10:00' <= stamp <= '2024-03-01T00:19:59' for stamp in window['timestamps']))
+
+        self.assertEqual(self.client.get(url, {'parameter': 'Type'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'parameter': 'Pressure', 'points': 2}).status_code, 400)
+
+    def test_invalid_timestamps_are_reported(self):
+        content = self._csv([1, 2]).replace(b'2024-03-01T00:00:02', b'yesterday')
+        response = self.upload(content)
+        self.assertEqual(response.data['error'], "Invalid timestamp in column 'Timestamp' at row(s): 3.")
+
+
+class StreamingExportTests(UploadedDatasetTestCase):
+    """The export streams exactly the rows the records endpoint returns"""
+
+    CSV = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "".join(
+        f'"Unit {i}, bay {i % 4}",{["Pump", "Valve"][i % 2]},{i * 0.5},{i % 11},{i % 97}\n' for i in range(1200)
+    )).encode()
+
+    def _export(self, query):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/?{query}')
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_and_ndjson_match_records(self):
+        query = 'type=Pump&pressure_min=3&name=bay%202'
+        records = self.client.get(f'/api/datasets/{self.dataset_id}/records/?{query}').json()['records']
+        self.assertGreater(len(records), 0)
+
+        with mock.patch('analytics.views.EXPORT_CHUNK_ROWS', 100):
+            ndjson = self._export(query + '&format=ndjson')
+            exported_csv = self._export(query + '&format=csv')
+        self.assertEqual([json.loads(line) for line in ndjson.splitlines()], records)
+
+        frame = pd.read_csv(io.StringIO(exported_csv))
+        self.assertEqual(list(frame.columns), ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+        self.assertEqual(frame['Equipment Name'].tolist(), [record['name'] for record in records])
+
+    def test_bad_parameters_are_rejected_before_streaming(self):
+        for query in ['format=xml', 'format=csv&pressure_min=abc']:
+            response = self.client.get(f'/api/datasets/{self.dataset_id}/export/?{query}')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response['Content-Type'], 'application/json')
+
+
+class FilterExpressionTests(UploadedDatasetTestCase):
+    """filter= expressions combine with the legacy parameters into one mask"""
+
+    CSV = ("Name,Type,Flowrate,Pressure,Temperature,Site\n" + "".join(
+        f'Unit {i},{["Pump", "Valve", "Tank"][i % 3]},{i},{i % 7},{i % 50},{["north", "south"][i % 2]}\n'
+        for i in range(300)
+    )).encode()
+    frame = pd.read_csv(io.BytesIO(CSV))
+
+    def _names(self, query):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/records/', query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [record['name'] for record in response.json()['records']]
+
+    def test_expression_matches_pandas(self):
+        df = self.frame
+        cases = [
+            ('Flowrate > 250 AND type IN (Pump, Valve)',
+             (df['Flowrate'] > 250) & df['Type'].isin(['Pump', 'Valve'])),
+            ("(Pressure <= 1 OR Temperature >= 48) AND NOT site = 'north'",
+             ((df['Pressure'] <= 1) | (df['Temperature'] >= 48)) & (df['Site'] != 'north')),
+            ('name contains "unit 1" and Type not in (Tank)',
+             df['Name'].str.contains('Unit 1') & (df['Type'] != 'Tank')),
+        ]
+        for expression, mask in cases:
+            with self.subTest(expression=expression):
+                self.assertEqual(self._names({'filter': expression}), df.loc[mask, 'Name'].tolist())
+
+    def test_expression_combines_with_legacy_parameters(self):
+        df = self.frame
+        names = self._names({'type': 'Pump', 'flowrate_min': '100', 'filter': 'Site = south'})
+        mask = (df['Type'] == 'Pump') & (df['Flowrate'] >= 100) & (df['Site'] == 'south')
+        self.assertEqual(names, df.loc[mask, 'Name'].tolist())
+
+        with mock.patch('analytics.views.EXPORT_CHUNK_ROWS', 64):
+            response = self.client.get(
+                f'/api/datasets/{self.dataset_id}/export/',
+                {'format': 'ndjson', 'filter': 'Site = south and Flowrate < 50'},
+            )
+            exported = [json.loads(line)['name'] for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(exported, df.loc[(df['Site'] == 'south') & (df['Flowrate'] < 50), 'Name'].tolist())
+
+    def test_invalid_expressions_are_rejected(self):
+        for expression in ['Flowrate >', 'Altitude > 3', 'Pressure > high', 'Site > north', '(Type = Pump']:
+            with self.subTest(expression=expression):
+                response = self.client.get(f'/api/datasets/{self.dataset_id}/records/', {'filter': expression})
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(response.json()['error'].startswith('Invalid filter:'))
+
+
+class RecordSortingTests(UploadedDatasetTestCase):
+    """sort= and limit= order records as a stable pandas sort would"""
+
+    CSV = ("Name,Type,Flowrate,Pressure,Temperature\n" + "".join(
+        f'Unit {i},{["Pump", "Valve", "Tank"][i % 3]},{i % 13},{(i * 7) % 10},{i % 5}\n' for i in range(400)
+    )).encode()
+    frame = pd.read_csv(io.BytesIO(CSV))
+
+    def _records(self, query):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/records/', query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_sorted_records_match_pandas(self):
+        df = self.frame
+        cases = [
+            ({'sort': '-Pressure', 'limit': '25'}, ['Pressure'], [False], 25),
+            ({'sort': 'temperature,-Flowrate'}, ['Temperature', 'Flowrate'], [True, False], None),
+            ({'sort': '-Type,Pressure,-Name', 'limit': '40'}, ['Type', 'Pressure', 'Name'], [False, True, False], 40),
+            ({'sort': 'Flowrate'}, ['Flowrate'], [True], None),
+        ]
+        for query, columns, ascending, limit in cases:
+            with self.subTest(query=query):
+                expected = df.sort_values(columns, ascending=ascending, kind='stable')['Name'].tolist()[:limit]
+                payload = self._records(query)
+                self.assertEqual([record['name'] for record in payload['records']], expected)
+                self.assertEqual(payload['total'], len(df))
+                # The second request reuses the cached sort indexes
+                self.assertEqual(self._records(query)['records'], payload['records'])
+
+    def test_sort_applies_after_filters(self):
+        df = self.frame
+        payload = self._records({'type': 'Valve', 'sort': '-Temperature', 'limit': '5'})
+        valves = df[df['Type'] == 'Valve']
+        self.assertEqual(payload['total'], len(valves))
+        expected = valves.sort_values('Temperature', ascending=False, kind='stable')['Name'].tolist()[:5]
+        self.assertEqual([record['name'] for record in payload['records']], expected)
+
+    def test_invalid_sort_and_limit(self):
+        for query in [{'sort': 'Altitude'}, {'sort': '-'}, {'limit': '0'}, {'limit': 'ten'}]:
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/datasets/{self.dataset_id}/records/', query)
+                self.assertEqual(response.status_code, 400)
+
+
+class FilteredSummaryTests(UploadedDatasetTestCase):
+    """/summary/ with records filters summarizes exactly the records those filters return"""
+
+    CSV = ("Name,Type,Flowrate,Pressure,Temperature\n" + "".join(
+        f'Unit {i},{["Pump", "Valve", "Tank", "Pump"][i % 4]},{i * 0.25},{i % 9},{(i * 3) % 40}\n'
+        for i in range(500)
+    )).encode()
+
+    def _get(self, endpoint, query):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/{endpoint}/', query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_summary_matches_filtered_records(self):
+        for query in [
+            {'type': 'Pump', 'pressure_min': '4'},
+            {'filter': 'Temperature >= 30 OR Name CONTAINS "unit 4"'},
+            {'name': 'unit 1', 'temperature_max': '20', 'filter': 'Type != Tank'},
+        ]:
+            with self.subTest(query=query):
+                records = pd.DataFrame(self._get('records', query)['records'])
+                summary = self._get('summary', query)
+                self.assertEqual(summary['total_equipment'], len(records))
+                self.assertEqual(summary['average_flowrate'], round(records['flowrate'].mean(), 2))
+                self.assertEqual(summary['average_pressure'], round(records['pressure'].mean(), 2))
+                self.assertEqual(summary['average_temperature'], round(records['temperature'].mean(), 2))
+                self.assertEqual(summary['equipment_type_distribution'], records['type'].value_counts().to_dict())
+
+    def test_equivalent_filters_share_a_cached_summary(self):
+        with mock.patch('analytics.views.record_cache') as record:
+            first = self._get('summary', {'pressure_min': '3', 'filter': 'Type = Pump and Flowrate > 1'})
+            second = self._get('summary', {'filter': ' Type=Pump   AND Flowrate > 1 ', 'pressure_min': '3.0'})
+        self.assertEqual(first, second)
+        self.assertEqual(
+            [call.args for call in record.call_args_list if call.args[0] == 'filtered_summary'],
+            [('filtered_summary', False), ('filtered_summary', True)],
+        )
+
+        empty = self._get('summary', {'pressure_min': '100'})
+        self.assertEqual(empty['total_equipment'], 0)
+        self.assertIsNone(empty['average_pressure'])
+        self.assertEqual(empty['equipment_type_distribution'], {})
+        self.assertEqual(self._get('summary', {})['total_equipment'], 500)
+
+
+class CompressionMiddlewareTests(UploadedDatasetTestCase):
+    """Responses are compressed as negotiated; gzip request bodies are inflated before parsing"""
+
+    CSV = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "".join(
+        f"Unit {i},Pump,{i}.5,{i % 9},{i % 70}\n" for i in range(200)
+    )).encode()
+
+    def test_accept_encoding_negotiation(self):
+        path = f'/api/datasets/{self.dataset_id}/records/'
+        plain = self.client.get(path)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        compressed = self.client.get(path, HTTP_ACCEPT_ENCODING='identity, gzip;q=0.5')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(compressed.content)), plain.json())
+        self.assertEqual(compressed['Content-Length'], str(len(compressed.content)))
+        # Byte-for-byte different, so the strong validator is weakened
+        self.assertEqual(compressed['ETag'], 'W/' + plain['ETag'])
+
+        refused = self.client.get(path, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', refused)
+
+    def test_small_and_binary_responses_are_left_alone(self):
+        small = self.client.get('/api/datasets/exists/', {'sha256': '0' * 64}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertLess(len(small.content), 200)
+        self.assertNotIn('Content-Encoding', small)
+
+        pdf = self.client.get(f'/api/datasets/{self.dataset_id}/download_pdf/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(pdf['Content-Type'].startswith('application/pdf'))
+        self.assertNotIn('Content-Encoding', pdf)
+
+    def _gzip_upload(self, body, corrupt=False, **extra):
+        boundary = 'BoUnDaRy'
+        payload = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="plant.csv"\r\n'
+            f'Content-Type: text/csv\r\n\r\n'
+        ).encode() + body + f'\r\n--{boundary}--\r\n'.encode()
+        compressed = gzip.compress(payload)
+        if corrupt:
+            # Wrong checksum and size in the gzip trailer, only found once the whole body is read
+            compressed = compressed[:-8] + b'\0' * 8
+        return self.client.generic(
+            'POST', '/api/datasets/', compressed,
+            content_type=f'multipart/form-data; boundary={boundary}', HTTP_CONTENT_ENCODING='gzip', **extra
+        ), len(payload)
+
+    def test_gzip_upload_is_parsed_with_its_inflated_length(self):
+        seen = {}
+        original = RequestDecompressionMiddleware.__call__
+
+        def spy(middleware, request):
+            response = original(middleware, request)
+            seen['length'] = request.META['CONTENT_LENGTH']
+            seen['encoding'] = request.META.get('HTTP_CONTENT_ENCODING')
+            return response
+
+        with mock.patch.object(RequestDecompressionMiddleware, '__call__', spy):
+            response, length = self._gzip_upload(self.CSV.replace(b'Unit', b'Pump'))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response['Accept-Encoding'], 'gzip')
+        self.assertEqual(seen, {'length': str(length), 'encoding': None})
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        with dataset.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.CSV.replace(b'Unit', b'Pump'))
+
+    def test_bad_request_encodings(self):
+        unsupported = self.client.generic('POST', '/api/datasets/', b'x', HTTP_CONTENT_ENCODING='br')
+        self.assertEqual(unsupported.status_code, 415)
+        self.assertEqual(unsupported['Accept-Encoding'], 'gzip')
+
+        corrupt = self.client.generic('POST', '/api/datasets/', b'not gzip', HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(corrupt.status_code, 400)
+
+        with self.settings(GZIP_REQUEST_MAX_BYTES=1000):
+            response, _ = self._gzip_upload(self.CSV)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024, DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_gzip_upload_streams_to_the_parser(self):
+        seen = {}
+        original = RequestDecompressionMiddleware.__call__
+
+        def spy(middleware, request):
+            response = original(middleware, request)
+            seen['length'] = request.META['CONTENT_LENGTH']
+            return response
+
+        content = self.CSV.replace(b'Unit', b'Pump')
+        with mock.patch.object(RequestDecompressionMiddleware, '__call__', spy):
+            response, _ = self._gzip_upload(content)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(seen['length'], str(settings.GZIP_REQUEST_MAX_BYTES))
+        with Dataset.objects.get(pk=response.data['id']).file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+
+        # Past the cap, or corrupt, once the view is already reading the body
+        rows = b"".join(f"Unit {i},Pump,{i}.5,{i % 9},{i % 70}\n".encode() for i in range(10_000))
+        with self.settings(GZIP_REQUEST_MAX_BYTES=len(rows) // 2):
+            too_large, _ = self._gzip_upload(self.CSV + rows)
+        self.assertEqual(too_large.status_code, 413)
+        self.assertEqual(too_large['Accept-Encoding'], 'gzip')
+
+        corrupt, _ = self._gzip_upload(self.CSV + rows, corrupt=True)
+        self.assertEqual(corrupt.status_code, 400)
+        self.assertEqual(corrupt.content, b'Invalid gzip request body.')
+        self.assertEqual(Dataset.objects.count(), 2)
+
+
+class ConditionalGetTests(UploadedDatasetTestCase):
+    """List, summary and records answer 304 until what they show changes"""
+
+    CSV = AsyncReadViewTests.CSV
+
+    def test_dataset_validators(self):
+        for suffix in ['summary/', 'records/?type=Pump']:
+            with self.subTest(suffix=suffix):
+                path = f'/api/datasets/{self.dataset_id}/{suffix}'
+                first = self.client.get(path)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+                self.assertEqual(
+                    self.client.get(path, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304
+                )
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+        summary = f'/api/datasets/{self.dataset_id}/summary/'
+        etag = self.client.get(summary)['ETag']
+        self.assertNotEqual(self.client.get(summary, {'type': 'Pump'})['ETag'], etag)
+        with mock.patch('analytics.views.ETAG_VERSION', 2):
+            self.assertEqual(self.client.get(summary, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        appended = self.client.post(
+            f'/api/datasets/{self.dataset_id}/append/',
+            {'file': SimpleUploadedFile('more.csv', self.CSV)},
+        )
+        self.assertEqual(appended.status_code, 200)
+        self.assertEqual(self.client.get(summary, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_changes_with_uploads_and_owner_details(self):
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_superuser('boss', 'boss@example.com', 'pass'))
+        first = admin.get('/api/datasets/')
+        self.assertEqual(admin.get('/api/datasets/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        User.objects.filter(pk=self.user.pk).update(username='renamed')
+        renamed = admin.get('/api/datasets/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.data['results'][0]['owner']['username'], 'renamed')
+
+        self.upload(self.CSV.replace(b'Pump A', b'Pump Z'))
+        self.assertEqual(admin.get('/api/datasets/', HTTP_IF_NONE_MATCH=renamed['ETag']).status_code, 200)
+
+
+class RetentionTests(UploadedDatasetTestCase):
+    """Retention policies pick which datasets go; the sweeper removes their files later"""
+    SETTINGS = {'DATASET_RETENTION': {'max_datasets': 2, 'max_total_bytes': None, 'max_age_days': None}}
+
+    def upload_units(self, *names):
+        ids = []
+        for name in names:
+            content = AsyncReadViewTests.CSV.replace(b'Pump A', name.encode())
+            ids.append(self.upload(content, name=f'{name}.csv').data['id'])
+        return ids
+
+    def test_count_limit_from_settings_queues_oldest_file(self):
+        oldest, *kept = self.upload_units('Unit 1', 'Unit 2', 'Unit 3')
+        self.assertEqual(sorted(Dataset.objects.values_list('id', flat=True)), kept)
+        self.assertEqual(PendingFileDeletion.objects.count(), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, PendingFileDeletion.objects.get().name)))
+
+    def test_byte_and_age_limits(self):
+        newest_first = self.upload_units('Unit 1', 'Unit 2')[::-1]
+        size = Dataset.objects.get(pk=newest_first[0]).file_size
+        by_bytes = RetentionPolicy(max_total_bytes=size + 1)
+        self.assertEqual(expired_dataset_ids(self.user, by_bytes), newest_first[1:])
+
+        Dataset.objects.filter(pk__in=newest_first).update(uploaded_at=timezone.now() - timedelta(days=10))
+        by_age = RetentionPolicy(max_age_days=7)
+        # The newest dataset stays however old it is
+        self.assertEqual(expired_dataset_ids(self.user, by_age), newest_first[1:])
+        self.assertEqual(expired_dataset_ids(self.user, RetentionPolicy(max_age_days=30)), [])
+
+    def test_user_policy_beats_global_beats_settings(self):
+        self.assertEqual(get_policy(self.user).max_datasets, 2)
+        RetentionPolicy.objects.create(max_datasets=4)
+        self.assertEqual(get_policy(self.user).max_datasets, 4)
+        RetentionPolicy.objects.create(user=self.user, max_datasets=1)
+        self.assertEqual(get_policy(self.user).max_datasets, 1)
+
+        other = User.objects.create_user('other', password='pass')
+        self.assertEqual(get_policy(other).max_datasets, 4)
+
+    def test_sweep_deletes_queued_files_but_not_reused_names(self):
+        RetentionPolicy.objects.create(user=self.user, max_datasets=1)
+        _, second = self.upload_units('Unit 1', 'Unit 2')
+        gone = PendingFileDeletion.objects.get().name
+        path = os.path.join(self.media_root, gone)
+
+        reused = Dataset.objects.get(pk=second)
+        PendingFileDeletion.objects.create(name=reused.file.name)
+        self.assertEqual(sweep_pending_files(), 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(reused.file.path))
+        self.assertFalse(PendingFileDeletion.objects.exists())
+
+
+class UserPurgeTests(TestCase):
+    """Deleting a user answers 202 and purges their data in batches, retrying failures"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('boss', 'boss@example.com', 'pass')
+        self.user = User.objects.create_user('leaving', password='pass')
+        for index in range(5):
+            Dataset.objects.create(user=self.user, file=f'uploads/leaving-{index}.csv')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def purge(self):
+        with mock.patch('analytics.purge.run_in_background') as background:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(f'/api/admin/users/{self.user.pk}/')
+        return response, background
+
+    def test_delete_deactivates_and_queues_job(self):
+        response, background = self.purge()
+        self.assertEqual(response.status_code, 202)
+        job = PurgeJob.objects.get()
+        self.assertEqual((response.data['id'], response.data['datasets_total']), (job.pk, 5))
+        background.assert_called_once_with(run_purge_job, job.pk)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        # A user being purged is no longer listed, so a second delete finds nothing
+        self.assertEqual(self.client.delete(f'/api/admin/users/{self.user.pk}/').status_code, 404)
+
+    def test_job_deletes_in_batches_then_the_user(self):
+        self.purge()
+        job = PurgeJob.objects.get()
+        with mock.patch('analytics.purge.delete_datasets', wraps=delete_datasets) as deleting:
+            run_purge_job(job.pk, batch_size=2)
+        self.assertEqual(deleting.call_count, 3)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.datasets_deleted), (PurgeJob.STATUS_DONE, 5))
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(User.objects.filter(username='leaving').exists())
+        self.assertEqual(PendingFileDeletion.objects.count(), 5)
+
+    def test_failed_job_keeps_user_inactive_and_is_retried(self):
+        self.purge()
+        job = PurgeJob.objects.get()
+        with mock.patch('analytics.purge.delete_validation_reports', side_effect=OSError('disk gone')):
+            with self.assertLogs('analytics.purge', 'ERROR'):
+                run_purge_job(job.pk, batch_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (PurgeJob.STATUS_FAILED, 'disk gone'))
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+
+        # Deleting again queues the same job rather than a second one
+        response, background = self.purge()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['id'], job.pk)
+        background.assert_called_once_with(run_purge_job, job.pk)
+
+        call_command('run_purge_jobs', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (PurgeJob.STATUS_DONE, ''))
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+
+class BulkDatasetActionTests(UploadedDatasetTestCase):
+    """One request acts on many datasets, only on those the user can see"""
+    CSV = AsyncReadViewTests.CSV
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user('other', password='pass')
+        self.foreign_id = Dataset.objects.create(user=other, file='uploads/foreign.csv').id
+
+    def bulk(self, action, ids):
+        return self.client.post('/api/datasets/bulk/', {'action': action, 'ids': ids}, format='json')
+
+    def test_delete_reports_foreign_and_unknown_ids_as_not_found(self):
+        response = self.bulk('delete', [self.dataset_id, self.foreign_id, 999, self.dataset_id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'id': self.dataset_id, 'status': 'deleted'},
+            {'id': self.foreign_id, 'status': 'not_found'},
+            {'id': 999, 'status': 'not_found'},
+        ])
+        self.assertEqual(list(Dataset.objects.values_list('id', flat=True)), [self.foreign_id])
+        self.assertEqual(PendingFileDeletion.objects.count(), 1)
+
+    def test_reanalyze_stores_recomputed_stats(self):
+        broken_id = self.upload(self.CSV.replace(b'Pump A', b'Pump Z'), name='gone.csv').data['id']
+        os.remove(Dataset.objects.get(pk=broken_id).file.path)
+        Dataset.objects.update(stats=None)
+
+        response = self.bulk('reanalyze', [self.dataset_id, broken_id, self.foreign_id])
+        self.assertEqual(response.status_code, 200)
+        ok, broken, foreign = response.data['results']
+        dataset = Dataset.objects.get(pk=self.dataset_id)
+        self.assertEqual(ok['summary'], analyze_csv(dataset.file.path))
+        self.assertEqual(dataset.stats, file_stats(dataset.file.path))
+        self.assertEqual(broken, {'id': broken_id, 'status': 'error', 'error': 'File not found.'})
+        self.assertEqual(foreign['status'], 'not_found')
+        self.assertIsNone(Dataset.objects.get(pk=self.foreign_id).stats)
+
+    def test_reanalyze_keeps_stats_of_rows_appended_meanwhile(self):
+        def append_during_read(func, items):
+            outcomes = map_files(func, items)
+            Dataset.objects.filter(pk=self.dataset_id).update(stats={'rows': 99}, updated_at=timezone.now())
+            return outcomes
+
+        with mock.patch('analytics.views.map_files', side_effect=append_during_read):
+            response = self.bulk('reanalyze', [self.dataset_id])
+        self.assertEqual(response.data['results'][0]['status'], 'ok')
+        self.assertEqual(Dataset.objects.get(pk=self.dataset_id).stats, {'rows': 99})
+
+    def test_export_streams_zip_with_results(self):
+        response = self.bulk('export', [self.dataset_id, self.foreign_id])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.read(f'dataset_{self.dataset_id}.csv'), self.CSV)
+        self.assertEqual(json.loads(archive.read('results.json'))['results'], [
+            {'id': self.dataset_id, 'status': 'exported', 'name': f'dataset_{self.dataset_id}.csv'},
+            {'id': self.foreign_id, 'status': 'not_found'},
+        ])
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'exports')))
+
+    def test_id_limit_and_unknown_action(self):
+        self.assertEqual(self.bulk('delete', list(range(1, 502))).status_code, 400)
+        self.assertEqual(self.bulk('archive', [self.dataset_id]).status_code, 400)
+        self.assertEqual(self.bulk('delete', []).status_code, 400)
+        self.assertTrue(Dataset.objects.filter(pk=self.dataset_id).exists())
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+    """Under ASGI the project middleware stays async, so requests overlap on the event loop"""
+
+    MIDDLEWARE = [
+        RequestMetricsMiddleware, RequestProfilingMiddleware, ResponseCompressionMiddleware,
+        RequestDecompressionMiddleware,
+    ]
+
+    def build(self, view):
+        handler = view
+        for middleware in reversed(self.MIDDLEWARE):
+            handler = middleware(handler)
+        return handler
+
+    def test_concurrent_requests_overlap(self):
+        in_view = []
+        both_in = asyncio.Event()
+
+        async def view(request):
+            in_view.append(request.path)
+            if len(in_view) == 2:
+                both_in.set()
+            # Both requests have to be in the view at once; a blocking middleware would time out here
+            await asyncio.wait_for(both_in.wait(), timeout=5)
+            with stage('wait'):
+                await asyncio.sleep(0)
+            return HttpResponse(json.dumps({'path': request.path}) * 20, content_type='application/json')
+
+        handler = self.build(view)
+        self.assertTrue(iscoroutinefunction(handler))
+        factory = AsyncRequestFactory()
+
+        async def run():
+            return await asyncio.gather(*(
+                handler(factory.get(path, headers={'Accept-Encoding': 'gzip'})) for path in ('/first/', '/second/')
+            ))
+
+        responses = async_to_sync(run)()
+        self.assertEqual(sorted(in_view), ['/first/', '/second/'])
+        for response in responses:
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('wait;dur=', response['Server-Timing'])
+            self.assertEqual(response['Accept-Encoding'], 'gzip')
+
+    def test_gzip_body_is_inflated_off_the_event_loop(self):
+        async def view(request):
+            return HttpResponse(request.body, content_type='text/plain')
+
+        body = b'Equipment Name,Type\n' * 100
+        request = AsyncRequestFactory().post(
+            '/upload/', gzip.compress(body), content_type='text/csv', headers={'Content-Encoding': 'gzip'}
+        )
+        response = async_to_sync(self.build(view))(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, body)
+        self.assertEqual(request.META['CONTENT_LENGTH'], str(len(body)))
@@ -1,12 +1,33 @@
 from rest_framework.routers import DefaultRouter
+from django.conf import settings
 from django.urls import path
-from .views import DatasetViewSet, AdminUserViewSet, login_view, register_view
+from . import async_views
+from .metrics import metrics_view
+from .views import (
+    DatasetViewSet, AdminUserViewSet, PurgeJobViewSet, RequestProfileViewSet, ValidationReportViewSet, login_view,
+    register_view,
+)
 
 router = DefaultRouter()
 router.register(r'datasets', DatasetViewSet, basename='dataset')
+router.register(r'validation-reports', ValidationReportViewSet, basename='validation-report')
 router.register(r'admin/users', AdminUserViewSet, basename='admin-users')
+router.register(r'admin/purge-jobs', PurgeJobViewSet, basename='admin-purge-jobs')
+router.register(r'admin/profiles', RequestProfileViewSet, basename='admin-profiles')
+
+# Async replacements for the heavy read actions, served ahead of the router under ASGI
+async_read_urlpatterns = [
+    path('datasets/<int:pk>/summary/', async_views.dataset_summary, name='dataset-summary'),
+    path('datasets/<int:pk>/records/', async_views.dataset_records, name='dataset-records'),
+    path('datasets/<int:pk>/timeseries/', async_views.dataset_timeseries, name='dataset-timeseries'),
+    path('datasets/<int:pk>/download_pdf/', async_views.dataset_download_pdf, name='dataset-download-pdf'),
+]
 
 urlpatterns = [
     path('auth/login/', login_view, name='login'),
     path('auth/register/', register_view, name='register'),
-] + router.urls
+    path('metrics/', metrics_view, name='metrics'),
+]
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns += async_read_urlpatterns
+urlpatterns += router.urls
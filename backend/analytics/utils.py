@@ -1,4 +1,13 @@
+import importlib.util
+import math
+import os
+from collections import Counter
+import numpy as np
 import pandas as pd
+from django.conf import settings
+from pandas.api.types import is_numeric_dtype
+from .metrics import stage
+from .parallel_csv import summarize_parallel
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -9,6 +18,10 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 
 REQUIRED_COLUMNS = ["Flowrate", "Pressure", "Temperature", "Type"]
+NUMERIC_COLUMNS = ["Flowrate", "Pressure", "Temperature"]
+NAME_COLUMNS = ["Equipment", "Equipment Name", "Name"]
+TIMESTAMP_COLUMNS = ["Timestamp", "DateTime", "Datetime"]
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
 
 def _format_invalid_rows(indices, max_items=5):
     if not indices:
@@ -18,12 +31,90 @@ def _format_invalid_rows(indices, max_items=5):
         return f"{', '.join(map(str, shown))}, ..."
     return ", ".join(map(str, shown))
 
-def validate_csv(file_path):
+def find_name_column(columns):
+    """First of NAME_COLUMNS present in columns, or None"""
+    for candidate in NAME_COLUMNS:
+        if candidate in columns:
+            return candidate
+    return None
+
+
+def find_timestamp_column(columns):
+    """First of TIMESTAMP_COLUMNS present in columns, or None"""
+    for candidate in TIMESTAMP_COLUMNS:
+        if candidate in columns:
+            return candidate
+    return None
+
+
+def parse_timestamps(series):
+    """Series parsed as datetimes, NaT where a value is not a timestamp.
+
+    Values with mixed UTC offsets cannot share one naive or fixed-offset
+    dtype, so they are converted to UTC.
+    """
     try:
-        df = pd.read_csv(file_path)
+        return pd.to_datetime(series, errors="coerce")
+    except (TypeError, ValueError):
+        return pd.to_datetime(series, errors="coerce", utc=True)
+
+
+def _rewind(source):
+    """Seek a file-like source back to its start; paths need nothing"""
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _read_columns(source, usecols=None, engine=None):
+    _rewind(source)
+    dtype = {"Type": "category"} if usecols else None
+    kwargs = {"engine": engine} if engine else {}
+    return pd.read_csv(source, usecols=usecols, dtype=dtype, **kwargs)
+
+
+def read_equipment_csv(source, extra_columns=()):
+    """Parse only the columns the app uses, with Type as a categorical.
+
+    source is a path or a seekable binary file. When every required column
+    is present, the read is projected to them plus the name and timestamp
+    columns and any extra_columns (such as those a filter refers to);
+    otherwise the whole file is read so validation can report what is
+    missing. Uses the pyarrow parser when installed and falls back to the C
+    parser for anything it rejects.
+    """
+    try:
+        _rewind(source)
+        columns = pd.read_csv(source, nrows=0).columns
     except Exception:
         raise ValueError("Invalid CSV file.")
 
+    usecols = None
+    if all(col in columns for col in REQUIRED_COLUMNS):
+        optional = [find_name_column(columns), find_timestamp_column(columns), *extra_columns]
+        usecols = list(dict.fromkeys(REQUIRED_COLUMNS + [col for col in optional if col in columns]))
+
+    if PYARROW_AVAILABLE:
+        try:
+            return _read_columns(source, usecols, engine="pyarrow")
+        except Exception:
+            pass
+    try:
+        return _read_columns(source, usecols)
+    except Exception:
+        raise ValueError("Invalid CSV file.")
+
+
+def validate_csv(file_path, float32=None, extra_columns=()):
+    """Read and validate an equipment CSV (path or seekable binary file); raises ValueError with a user-facing message.
+
+    Numeric columns keep the dtype the parser inferred. Only a column that
+    did not parse as numbers is coerced to find the offending rows. With
+    float32 (default: settings.CSV_FLOAT32), float columns are stored as
+    float32 to halve their memory.
+    """
+    with stage('parse'):
+        df = read_equipment_csv(file_path, extra_columns)
+
     if df is None or df.empty or len(df.columns) == 0:
         raise ValueError("Empty file.")
 
@@ -31,30 +122,240 @@ def validate_csv(file_path):
     if missing:
         raise ValueError(f"Missing required column(s): {', '.join(missing)}.")
 
-    for col in ["Flowrate", "Pressure", "Temperature"]:
-        series = pd.to_numeric(df[col], errors="coerce")
-        invalid_mask = series.isna()
-        if invalid_mask.any():
-            invalid_rows = (df.index[invalid_mask] + 2).tolist()
-            rows_text = _format_invalid_rows(invalid_rows)
-            raise ValueError(f"Invalid value in column '{col}' at row(s): {rows_text}.")
+    with stage('validate'):
+        for col in NUMERIC_COLUMNS:
+            if is_numeric_dtype(df[col]):
+                invalid_mask = df[col].isna()
+            else:
+                invalid_mask = pd.to_numeric(df[col], errors="coerce").isna()
+            if invalid_mask.any():
+                invalid_rows = (df.index[invalid_mask] + 2).tolist()
+                rows_text = _format_invalid_rows(invalid_rows)
+                raise ValueError(f"Invalid value in column '{col}' at row(s): {rows_text}.")
+
+    return apply_float32(df, float32)
+
 
+def apply_float32(df, float32=None):
+    """Store float64 numeric columns as float32 when float32 (default: settings.CSV_FLOAT32) is set"""
+    if settings.CSV_FLOAT32 if float32 is None else float32:
+        df = df.astype({col: "float32" for col in NUMERIC_COLUMNS if df[col].dtype == "float64"})
     return df
 
-def analyze_csv(file_path):
-    df = validate_csv(file_path)
 
-    summary = {
-        "total_equipment": len(df),
-        "average_flowrate": round(df["Flowrate"].mean(), 2),
-        "average_pressure": round(df["Pressure"].mean(), 2),
-        "average_temperature": round(df["Temperature"].mean(), 2),
-        "equipment_type_distribution": df["Type"].value_counts().to_dict()
+def read_time_series(file_path, parameter, time_column=None):
+    """(times, values) of one numeric column in time order; raises ValueError when there is no such series.
+
+    Only the timestamp column and the parameter are parsed. Rows without a
+    timestamp or a number are skipped. Files not stored in time order (those
+    uploaded before timestamps were detected) are sorted here.
+    """
+    try:
+        columns = pd.read_csv(file_path, nrows=0).columns
+    except Exception:
+        raise ValueError("Invalid CSV file.")
+    time_column = time_column or find_timestamp_column(columns)
+    if not time_column:
+        raise ValueError("Dataset has no timestamp column.")
+    if parameter not in columns or parameter in [time_column, "Type"] + NAME_COLUMNS:
+        raise ValueError(f"Unknown parameter '{parameter}'.")
+
+    with stage('parse'):
+        df = pd.read_csv(file_path, usecols=[time_column, parameter])
+    times = parse_timestamps(df[time_column])
+    values = df[parameter] if is_numeric_dtype(df[parameter]) else pd.to_numeric(df[parameter], errors="coerce")
+    if len(values) and values.isna().all():
+        raise ValueError(f"Parameter '{parameter}' is not numeric.")
+
+    keep = times.notna() & values.notna()
+    times, values = times[keep], values[keep]
+    if not times.is_monotonic_increasing:
+        order = times.argsort(kind="stable")
+        times, values = times.iloc[order], values.iloc[order]
+    return times.reset_index(drop=True), values.to_numpy(dtype="float64")
+
+
+def column_mean(series):
+    """Mean accumulated in float64, also for float32 storage"""
+    if series.dtype == "float32":
+        series = series.astype("float64")
+    return series.mean()
+
+
+def display_floats(series):
+    """float32 values as the short decimals they were parsed from (4.2, not 4.199999809)"""
+    if series.dtype == "float32":
+        return series.astype(str).astype("float64")
+    return series
+
+
+def display_float(value):
+    """A scalar from a float32 column as the short decimal it was parsed from"""
+    if isinstance(value, np.float32):
+        return float(str(value))
+    return float(value)
+
+
+def frame_memory_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(file_path):
+    """Bytes held by the dataset's DataFrame with the default reader and the typed ones"""
+    return {
+        "default_bytes": frame_memory_bytes(pd.read_csv(file_path)),
+        "typed_bytes": frame_memory_bytes(validate_csv(file_path, float32=False)),
+        "typed_float32_bytes": frame_memory_bytes(validate_csv(file_path, float32=True)),
+    }
+
+
+def frame_stats(df, times=None):
+    """Mergeable statistics of a validated frame: row count, column sums and Type counts.
+
+    Stored with each dataset so summaries need no re-read, and so appended
+    rows can be folded in without touching the existing ones. With parsed
+    times, the first and last timestamp are kept as "time".
+    """
+    stats = {
+        "rows": len(df),
+        "sums": {col: float(df[col].to_numpy(dtype="float64").sum()) for col in NUMERIC_COLUMNS},
+        # Pairs, not a dict: JSON object key order is not kept by every database
+        "types": [[str(key), int(count)] for key, count in df["Type"].value_counts().items() if count],
+    }
+    if times is not None:
+        stats["time"] = [times.min().isoformat(), times.max().isoformat()]
+    return stats
+
+
+def masked_stats(df, mask):
+    """frame_stats of the rows where mask is set, reduced in place instead of selecting the rows"""
+    types = df["Type"]
+    if not isinstance(types.dtype, pd.CategoricalDtype):
+        types = types.astype("category")
+    codes = types.cat.codes.to_numpy()
+    counts = np.bincount(codes[mask & (codes >= 0)], minlength=len(types.cat.categories))
+    # Most frequent first, ties in category order, as value_counts orders them
+    order = np.argsort(-counts, kind="stable")
+    return {
+        "rows": int(np.count_nonzero(mask)),
+        "sums": {col: float(np.sum(df[col].to_numpy(), where=mask, dtype="float64")) for col in NUMERIC_COLUMNS},
+        "types": [[str(types.cat.categories[i]), int(counts[i])] for i in order if counts[i]],
+    }
+
+
+def merge_stats(stats, other):
+    """frame_stats of the rows behind `stats` followed by the rows behind `other`"""
+    types = Counter(dict(stats["types"]))
+    types.update(dict(other["types"]))
+    merged = {
+        "rows": stats["rows"] + other["rows"],
+        "sums": {col: math.fsum((stats["sums"][col], other["sums"][col])) for col in NUMERIC_COLUMNS},
+        # Ties keep first appearance, as value_counts over the combined rows would
+        "types": [[key, count] for key, count in types.most_common()],
+    }
+    if "time" in stats and "time" in other:
+        bounds = [pd.Timestamp(value) for value in stats["time"] + other["time"]]
+        merged["time"] = [min(bounds).isoformat(), max(bounds).isoformat()]
+    return merged
+
+
+def summary_from_stats(stats):
+    """The analyze_csv payload for stored frame_stats; averages are None when no row matched a filter"""
+    rows = stats["rows"]
+    return {
+        "total_equipment": rows,
+        "average_flowrate": round(stats["sums"]["Flowrate"] / rows, 2) if rows else None,
+        "average_pressure": round(stats["sums"]["Pressure"] / rows, 2) if rows else None,
+        "average_temperature": round(stats["sums"]["Temperature"] / rows, 2) if rows else None,
+        "equipment_type_distribution": dict(stats["types"]),
+    }
+
+
+def use_parallel_ingest(size):
+    """Whether a CSV of size bytes is parsed by the byte-range workers (see parallel_csv)"""
+    return settings.INGEST_PROCESSES > 1 and size >= settings.PARALLEL_INGEST_MIN_BYTES
+
+
+def parallel_summary(file_path):
+    """Merged byte-range partials of a CSV with every required column, or None to parse serially"""
+    try:
+        columns = list(pd.read_csv(file_path, nrows=0).columns)
+    except Exception:
+        return None
+    if any(col not in columns for col in REQUIRED_COLUMNS):
+        return None
+
+    with stage('parse'):
+        return summarize_parallel(
+            file_path, columns, REQUIRED_COLUMNS, NUMERIC_COLUMNS, max(settings.INGEST_PROCESSES, 2)
+        )
+
+
+def merged_stats(merged, times=None):
+    """frame_stats of the rows behind merged byte-range partials"""
+    # Most frequent first, ties in category (sorted) order, as value_counts orders the parsed Type column
+    types = sorted(merged["types"].items(), key=lambda item: (-item[1], item[0]))
+    stats = {
+        "rows": merged["rows"],
+        "sums": dict(merged["sums"]),
+        "types": [[str(key), int(count)] for key, count in types],
     }
+    if times is not None:
+        stats["time"] = [times.min().isoformat(), times.max().isoformat()]
+    return stats
+
+
+def parallel_stats(file_path, time_column=""):
+    """frame_stats of a CSV from the byte-range workers, or None to parse serially.
+
+    Raises the ValueError validate_csv raises for an empty file or a value
+    that is not a number. Only the timestamp column is read in this process.
+    """
+    merged = parallel_summary(file_path)
+    if merged is None:
+        return None
+    if merged["rows"] == 0:
+        raise ValueError("Empty file.")
+    for col in NUMERIC_COLUMNS:
+        if merged["invalid_counts"][col]:
+            rows_text = _format_invalid_rows([position + 2 for position in merged["invalid"][col]])
+            raise ValueError(f"Invalid value in column '{col}' at row(s): {rows_text}.")
+
+    times = None
+    if time_column:
+        with stage('parse'):
+            times = parse_timestamps(pd.read_csv(file_path, usecols=[time_column])[time_column])
+    return merged_stats(merged, times)
+
+
+def analyze_csv(file_path, parallel=None):
+    """Validate and summarize a CSV.
+
+    Files of at least PARALLEL_INGEST_MIN_BYTES are parsed by INGEST_PROCESSES
+    worker processes (see parallel_csv); parallel=True/False forces the mode.
+    """
+    if parallel is None:
+        parallel = use_parallel_ingest(os.path.getsize(file_path))
+    if parallel:
+        stats = parallel_stats(file_path)
+        if stats is not None:
+            return summary_from_stats(stats)
+
+    df = validate_csv(file_path)
+
+    with stage('aggregate'):
+        summary = {
+            "total_equipment": len(df),
+            "average_flowrate": round(column_mean(df["Flowrate"]), 2),
+            "average_pressure": round(column_mean(df["Pressure"]), 2),
+            "average_temperature": round(column_mean(df["Temperature"]), 2),
+            "equipment_type_distribution": df["Type"].value_counts().to_dict()
+        }
 
     return summary
 
 
+@stage('pdf')
 def generate_pdf_report(summary, dataset_id):
     """Generate a PDF report from dataset summary"""
     buffer = BytesIO()
@@ -0,0 +1,193 @@
+"""Rule-based validation of an upload that collects every problem in one pass.
+
+validate_csv stops at the first bad column. find_issues instead evaluates
+every rule as a column mask over the whole frame:
+
+- missing required columns;
+- empty (NaN) and non-numeric values in the numeric columns;
+- values outside settings.VALIDATION_RANGES;
+- Types not in settings.VALIDATION_ALLOWED_TYPES;
+- values of the optional timestamp column that are not timestamps.
+
+The issues of a rejected upload are stored as a CSV ValidationReport, which
+the API pages through and offers for download.
+"""
+import pandas as pd
+from django.conf import settings
+from django.core.files.base import ContentFile
+from pandas.api.types import is_numeric_dtype
+
+from .models import ValidationReport
+from .retention import delete_validation_reports
+from .utils import NUMERIC_COLUMNS, REQUIRED_COLUMNS, _format_invalid_rows, find_timestamp_column, parse_timestamps
+
+ISSUE_COLUMNS = ["row", "column", "rule", "value", "message"]
+
+RULE_MISSING_COLUMN = "missing_column"
+RULE_MISSING_VALUE = "missing_value"
+RULE_NON_NUMERIC = "non_numeric"
+RULE_OUT_OF_RANGE = "out_of_range"
+RULE_UNKNOWN_TYPE = "unknown_type"
+RULE_INVALID_TIMESTAMP = "invalid_timestamp"
+
+
+class ValidationFailed(ValueError):
+    """An upload broke one or more rules; issues holds every violation"""
+
+    def __init__(self, message, issues):
+        super().__init__(message)
+        self.issues = issues
+
+
+def _issues(mask, column, rule, values, message):
+    """Issue rows for the positions where mask is set; row numbers count the header as row 1"""
+    positions = mask.to_numpy().nonzero()[0]
+    return pd.DataFrame({
+        "row": positions + 2,
+        "column": column,
+        "rule": rule,
+        "value": values.iloc[positions].astype("string").fillna("").to_numpy(),
+        "message": message,
+    })
+
+
+def _range_text(low, high):
+    if low is None:
+        return f"at most {high}"
+    if high is None:
+        return f"at least {low}"
+    return f"between {low} and {high}"
+
+
+def find_issues(df, ranges=None, allowed_types=None, times=None):
+    """Every rule violation in df as a frame of ISSUE_COLUMNS, ordered by row then column.
+
+    times is the timestamp column already parsed with parse_timestamps, if the caller has it.
+    """
+    ranges = settings.VALIDATION_RANGES if ranges is None else ranges
+    allowed_types = settings.VALIDATION_ALLOWED_TYPES if allowed_types is None else allowed_types
+
+    structural = [
+        {"row": None, "column": col, "rule": RULE_MISSING_COLUMN, "value": "", "message": "Missing required column."}
+        for col in REQUIRED_COLUMNS if col not in df.columns
+    ]
+    parts = []
+    for col in NUMERIC_COLUMNS:
+        if col not in df.columns:
+            continue
+        raw = df[col]
+        missing = raw.isna()
+        numbers = raw if is_numeric_dtype(raw) else pd.to_numeric(raw, errors="coerce")
+        parts.append(_issues(missing, col, RULE_MISSING_VALUE, raw, "Missing value."))
+        parts.append(_issues(numbers.isna() & ~missing, col, RULE_NON_NUMERIC, raw, "Not a number."))
+
+        low, high = ranges.get(col, (None, None))
+        if low is not None or high is not None:
+            outside = (numbers < low if low is not None else False) | (numbers > high if high is not None else False)
+            parts.append(_issues(outside, col, RULE_OUT_OF_RANGE, raw, f"Must be {_range_text(low, high)}."))
+
+    if allowed_types is not None and "Type" in df.columns:
+        unknown = ~df["Type"].isin(list(allowed_types))
+        parts.append(_issues(unknown, "Type", RULE_UNKNOWN_TYPE, df["Type"], "Unknown equipment type."))
+
+    time_column = find_timestamp_column(df.columns)
+    if time_column:
+        times = parse_timestamps(df[time_column]) if times is None else times
+        parts.append(_issues(times.isna(), time_column, RULE_INVALID_TIMESTAMP, df[time_column], "Not a timestamp."))
+
+    rows = pd.concat([part for part in parts if len(part)] or [pd.DataFrame(columns=ISSUE_COLUMNS)])
+    rank = {col: position for position, col in enumerate(df.columns)}
+    rows = rows.assign(_rank=rows["column"].map(rank)).sort_values(["row", "_rank"], kind="stable")
+    rows = rows.drop(columns="_rank").astype({"row": "Int64"})
+    structural = pd.DataFrame(structural, columns=ISSUE_COLUMNS).astype({"row": "Int64"})
+    return pd.concat([structural, rows], ignore_index=True)
+
+
+def summary_within_rules(merged, ranges=None, allowed_types=None):
+    """Whether merged byte-range partials (see parallel_csv) rule out every issue find_issues reports.
+
+    The timestamp rule is left to the caller, which parses that column itself.
+    """
+    ranges = settings.VALIDATION_RANGES if ranges is None else ranges
+    allowed_types = settings.VALIDATION_ALLOWED_TYPES if allowed_types is None else allowed_types
+    if any(merged["invalid_counts"].values()):
+        return False
+    for col, (low, high) in ranges.items():
+        if col not in NUMERIC_COLUMNS:
+            continue
+        if (low is not None and merged["mins"][col] < low) or (high is not None and merged["maxs"][col] > high):
+            return False
+    if allowed_types is None:
+        return True
+    # Type counts leave out empty cells, which find_issues reports as unknown types
+    types = merged["types"]
+    return sum(types.values()) == merged["rows"] and set(types) <= set(allowed_types)
+
+
+def issue_message(issues):
+    """Headline for the error response, worded as validate_csv words the same failure"""
+    missing_columns = issues.loc[issues["rule"] == RULE_MISSING_COLUMN, "column"].tolist()
+    if missing_columns:
+        return f"Missing required column(s): {', '.join(missing_columns)}."
+    columns = list(dict.fromkeys(NUMERIC_COLUMNS + ["Type"] + issues["column"].unique().tolist()))
+    for rules, template in [
+        ((RULE_MISSING_VALUE, RULE_NON_NUMERIC), "Invalid value in column '{column}' at row(s): {rows}."),
+        ((RULE_OUT_OF_RANGE,), "Value out of range in column '{column}' at row(s): {rows}."),
+        ((RULE_UNKNOWN_TYPE,), "Unknown equipment type in column '{column}' at row(s): {rows}."),
+        ((RULE_INVALID_TIMESTAMP,), "Invalid timestamp in column '{column}' at row(s): {rows}."),
+    ]:
+        for column in columns:
+            rows = issues.loc[issues["rule"].isin(rules) & (issues["column"] == column), "row"]
+            if len(rows):
+                return template.format(column=column, rows=_format_invalid_rows(sorted(rows.tolist())))
+    return "Invalid CSV file."
+
+
+def check_frame(df, times=None):
+    """Raise ValidationFailed with every issue in df, if there is any"""
+    issues = find_issues(df, times=times)
+    if len(issues):
+        raise ValidationFailed(issue_message(issues), issues)
+
+
+def save_report(user, file_name, error):
+    """Store a ValidationFailed as the user's newest ValidationReport and prune older ones"""
+    issues = error.issues
+    report = ValidationReport(
+        user=user,
+        file_name=file_name[:255],
+        message=str(error),
+        error_count=len(issues),
+        counts={rule: int(count) for rule, count in issues["rule"].value_counts().items()},
+    )
+    report.report.save("validation_report.csv", ContentFile(issues.to_csv(index=False).encode("utf-8")), save=False)
+    report.save()
+
+    ids = ValidationReport.objects.filter(user=user).values_list("id", flat=True)
+    stale = list(ids[settings.VALIDATION_REPORT_RETENTION:])
+    delete_validation_reports(ValidationReport.objects.filter(id__in=stale))
+    return report
+
+
+class ReportIssues:
+    """Lazy, sliceable view of a report's issue rows, so DRF pagination reads one page of the CSV"""
+
+    def __init__(self, report):
+        self.report = report
+
+    def __len__(self):
+        return self.report.error_count
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(len(self))
+        if stop <= start:
+            return []
+        with self.report.report.open("rb") as source:
+            page = pd.read_csv(
+                source, skiprows=range(1, start + 1), nrows=stop - start,
+                dtype=str, keep_default_na=False,
+            )
+        return [
+            {**record, "row": int(record["row"]) if record["row"] else None}
+            for record in page.to_dict("records")
+        ]
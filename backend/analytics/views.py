@@ -1,17 +1,508 @@
+import hashlib
+import io
+import json
+import operator
 import os
+import pstats
+import threading
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 from django.shortcuts import render
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action, api_view
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.response import Response
-from rest_framework.authentication import BasicAuthentication
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import authenticate
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .authentication import CachedBasicAuthentication
+from .background import map_files
+from .downsample import lttb, min_max
+from .filters import compile_filter, filter_columns, frame_schema, parse_filter
+from .ingest import append_upload, file_stats, ingest_upload
+from .metrics import record_cache, stage
+from .models import Dataset, PurgeJob, RequestProfile, ValidationReport
+from .pagination import DatasetCursorPagination, ValidationIssuePagination
+from .purge import start_user_purge
+from .retention import delete_datasets, delete_validation_reports, enforce_retention
+from .serializers import (
+    AppendRowsSerializer, BulkDatasetActionSerializer, DatasetSerializer, PurgeJobSerializer,
+    RequestProfileSerializer, UserSerializer, ValidationReportSerializer,
+)
+from .sorting import file_identity, order_positions, parse_limit, parse_sort
+from .utils import (
+    NUMERIC_COLUMNS, REQUIRED_COLUMNS, analyze_csv, display_float, display_floats, find_name_column,
+    generate_pdf_report, masked_stats, read_time_series, summary_from_stats, validate_csv,
+)
+from .validation import ReportIssues, ValidationFailed, save_report
+
+
+DOWNSAMPLERS = {'lttb': lttb, 'minmax': min_max}
+EXPORT_CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+# Rows parsed, filtered and written per chunk of a streamed export
+EXPORT_CHUNK_ROWS = 50_000
+DEFAULT_TIMESERIES_POINTS = 1000
+
+# Bump when the shape of summary/records/list payloads changes to invalidate client caches
+ETAG_VERSION = 1
+
+
+def _make_etag(*parts):
+    """Strong ETag from the given identity parts"""
+    digest = hashlib.sha256(repr((ETAG_VERSION,) + parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _query_identity(query_params):
+    """Order-independent representation of a request's query parameters"""
+    return sorted((key, value) for key in query_params for value in query_params.getlist(key))
+
+
+def _set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _not_modified(request, etag, last_modified=None):
+    """Return a 304/412 response if the request's preconditions allow it, else None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META:
+        record_cache('conditional_get', response is not None)
+    if response is not None:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def visible_datasets(user):
+    """Datasets the user may see: their own, or every dataset for admins"""
+    queryset = Dataset.objects.select_related('user').order_by('-uploaded_at')
+    if user.is_staff or user.is_superuser:
+        return queryset
+    return queryset.filter(user=user)
+
+
+def dataset_validators(dataset, variant, query_params):
+    """ETag and Last-Modified for a dataset view; a dataset only changes when rows are appended"""
+    content = dataset.content_hash or dataset.file.name
+    changed_at = dataset.updated_at or dataset.uploaded_at
+    etag = _make_etag(variant, dataset.id, content, str(dataset.updated_at), _query_identity(query_params))
+    return etag, int(changed_at.timestamp())
+
+
+def _rejected_upload(user, upload, exc):
+    """400 response for an upload that failed validation, with its stored report"""
+    payload = {'error': str(exc)}
+    if isinstance(exc, ValidationFailed):
+        payload['validation_report'] = ValidationReportSerializer(save_report(user, upload.name, exc)).data
+    return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+
+
+def records_payload(file_path, query_params):
+    """Filtered records plus filter metadata; raises ValueError for bad files or parameters.
+
+    sort orders the records (see sorting.py) and limit returns only the
+    first ones; total still counts every match.
+    """
+    expression = query_params.get('filter', '').strip()
+    sort = query_params.get('sort', '').strip()
+    limit = parse_limit(query_params.get('limit'))
+    extra_columns = set()
+    if expression or sort:
+        # Columns only the filter expression or the sort uses are read too
+        columns = _read_header(file_path).columns
+        if expression:
+            extra_columns |= filter_columns(expression, columns)
+        if sort:
+            extra_columns |= {column for column, _ in parse_sort(sort, columns)}
+    df = validate_csv(file_path, extra_columns=extra_columns)
+
+    name_column = find_name_column(df.columns)
+
+    with stage('filter'):
+        mask = _filter_mask(df, name_column, query_params)
+        positions = np.flatnonzero(mask) if mask is not None else np.arange(len(df))
+
+    with stage('sort'):
+        keys = parse_sort(sort, df.columns) if sort else []
+        if keys or limit is not None:
+            filtered = df.iloc[order_positions(df, positions, keys, limit, file_identity(file_path))]
+        else:
+            filtered = df.iloc[positions] if mask is not None else df
+
+    with stage('serialize'):
+        float32_columns = [col for col in NUMERIC_COLUMNS if filtered[col].dtype == "float32"]
+        if float32_columns:
+            filtered = filtered.assign(**{col: display_floats(filtered[col]) for col in float32_columns})
+        records = []
+        for _, row in filtered.iterrows():
+            record = {
+                "type": row["Type"],
+                "flowrate": row["Flowrate"],
+                "pressure": row["Pressure"],
+                "temperature": row["Temperature"],
+            }
+            if name_column:
+                record["name"] = row[name_column]
+            records.append(record)
+
+    return {
+        "records": records,
+        "total": len(positions),
+        "available_types": sorted(df["Type"].dropna().astype(str).unique().tolist()),
+        "pressure_range": {
+            "min": display_float(df["Pressure"].min()),
+            "max": display_float(df["Pressure"].max()),
+        },
+        "temperature_range": {
+            "min": display_float(df["Temperature"].min()),
+            "max": display_float(df["Temperature"].max()),
+        },
+        "name_supported": name_column is not None,
+    }
+
+
+# (query parameter, column, comparison) of the numeric range filters
+RANGE_FILTERS = [
+    (f'{column.lower()}_{bound}', column, operator.ge if bound == 'min' else operator.le)
+    for column in NUMERIC_COLUMNS for bound in ('min', 'max')
+]
+
+
+def _filter_mask(df, name_column, query_params, schema=None):
+    """Boolean array of the df rows matching the records query parameters, or None when nothing is filtered.
+
+    Every parameter, including a `filter` expression, adds one boolean array
+    to a single mask. schema (from frame_schema) fixes the column kinds when
+    df is one chunk of a file. Raises ValueError for bad parameters.
+    """
+    equipment_type = query_params.get('type')
+    name_query = query_params.get('name')
+    expression = query_params.get('filter', '').strip()
+
+    masks = []
+    if equipment_type:
+        masks.append(df["Type"] == equipment_type)
+
+    if name_query:
+        if not name_column:
+            raise ValueError("Missing equipment name column (expected 'Equipment', 'Equipment Name', or 'Name').")
+        masks.append(df[name_column].astype(str).str.contains(name_query, case=False, na=False))
+
+    for param, column, keep in RANGE_FILTERS:
+        raw = query_params.get(param)
+        if raw:
+            try:
+                bound = float(raw)
+            except ValueError:
+                raise ValueError(f"Invalid {param} value.")
+            masks.append(keep(df[column], bound))
 
-from .models import Dataset
-from .serializers import DatasetSerializer, UserSerializer
-from .utils import analyze_csv, generate_pdf_report, validate_csv
+    if expression:
+        masks.append(compile_filter(expression, schema or frame_schema(df)).evaluate(df))
+
+    if not masks:
+        return None
+    return np.logical_and.reduce([np.asarray(mask, dtype=bool) for mask in masks])
+
+
+def _filter_records(df, name_column, query_params, schema=None):
+    """Apply the records query parameters to df, indexing it once; raises ValueError for bad parameters"""
+    mask = _filter_mask(df, name_column, query_params, schema)
+    return df if mask is None else df[mask]
+
+
+def _read_header(file_path):
+    try:
+        return pd.read_csv(file_path, nrows=0)
+    except Exception:
+        raise ValueError("Invalid CSV file.")
+
+
+# Parameters of the records filters, which the summary also accepts
+RECORD_FILTER_PARAMS = ['type', 'name', *(param for param, _, _ in RANGE_FILTERS), 'filter']
+# Filtered summaries kept per dataset file and normalized filter set
+FILTERED_SUMMARY_CACHE_SIZE = 128
+
+_filtered_summary_lock = threading.Lock()
+_filtered_summaries = OrderedDict()
+
+
+def _summary_filters(query_params):
+    """(cache key, parameters) of the records filters in query_params; the key is empty without filters.
+
+    Values are stripped, range bounds compared as numbers and expressions
+    by their syntax tree, so "pressure_min=3" and "pressure_min=3.0" share
+    one cached summary.
+    """
+    key, params = [], {}
+    for param in RECORD_FILTER_PARAMS:
+        value = query_params.get(param, '').strip()
+        if not value:
+            continue
+        params[param] = value
+        if param == 'filter':
+            key.append((param, parse_filter(value)))
+            continue
+        if param not in ('type', 'name'):
+            try:
+                params[param] = value = repr(float(value))
+            except ValueError:
+                raise ValueError(f"Invalid {param} value.")
+        key.append((param, value))
+    return tuple(key), params
+
+
+def summary_payload(dataset, query_params=None):
+    """Summary from the stats stored at ingest, or a fresh analysis for older uploads.
+
+    With records filter parameters, the summary covers the matching rows.
+    It is reduced from the filter mask without selecting the rows, and
+    cached per file and normalized filter set.
+    """
+    key, params = _summary_filters(query_params or {})
+    if not key:
+        if dataset.stats is not None:
+            return summary_from_stats(dataset.stats)
+        return analyze_csv(dataset.file.path)
+
+    file_path = dataset.file.path
+    cache_key = (dataset.id, file_identity(file_path), key)
+    with _filtered_summary_lock:
+        summary = _filtered_summaries.get(cache_key)
+        if summary is not None:
+            _filtered_summaries.move_to_end(cache_key)
+    record_cache('filtered_summary', summary is not None)
+    if summary is not None:
+        return summary
+
+    expression = params.get('filter')
+    extra_columns = filter_columns(expression, _read_header(file_path).columns) if expression else ()
+    df = validate_csv(file_path, extra_columns=extra_columns)
+    with stage('filter'):
+        mask = _filter_mask(df, find_name_column(df.columns), params)
+    with stage('aggregate'):
+        summary = summary_from_stats(masked_stats(df, mask))
+
+    with _filtered_summary_lock:
+        _filtered_summaries[cache_key] = summary
+        while len(_filtered_summaries) > FILTERED_SUMMARY_CACHE_SIZE:
+            _filtered_summaries.popitem(last=False)
+    return summary
+
+
+def export_chunks(file_path, query_params, export_format):
+    """Encoded chunks of the filtered records as CSV or NDJSON; raises ValueError for bad parameters.
+
+    The filters are checked against the header before anything is returned,
+    so errors still become a 400. The rows are then read, filtered and
+    serialized EXPORT_CHUNK_ROWS at a time, so memory does not grow with the
+    size of the result.
+    """
+    header = _read_header(file_path)
+    name_column = find_name_column(header.columns)
+    used = set(REQUIRED_COLUMNS + ([name_column] if name_column else []))
+    columns = [col for col in header.columns if col in used]
+
+    expression = query_params.get('filter', '').strip()
+    schema = None
+    read_columns = columns
+    if expression:
+        referenced = filter_columns(expression, header.columns)
+        read_columns = [col for col in header.columns if col in used or col in referenced]
+        # Column kinds come from the first chunk, so every chunk is filtered the same way
+        try:
+            sample = pd.read_csv(file_path, usecols=read_columns, nrows=EXPORT_CHUNK_ROWS)
+        except Exception:
+            raise ValueError("Invalid CSV file.")
+        schema = frame_schema(sample)
+        _filter_records(sample, name_column, query_params, schema)
+    else:
+        _filter_records(header, name_column, query_params)
+    # Same keys, in the same order, as the records endpoint
+    record_keys = {"Type": "type", "Flowrate": "flowrate", "Pressure": "pressure", "Temperature": "temperature"}
+    if name_column:
+        record_keys[name_column] = "name"
+
+    def generate():
+        if export_format == 'csv':
+            yield header[columns].to_csv(index=False).encode('utf-8')
+        chunks = pd.read_csv(file_path, usecols=read_columns, dtype={"Type": "category"}, chunksize=EXPORT_CHUNK_ROWS)
+        for chunk in chunks:
+            filtered = _filter_records(chunk, name_column, query_params, schema)
+            if filtered.empty:
+                continue
+            if export_format == 'csv':
+                yield filtered[columns].to_csv(index=False, header=False).encode('utf-8')
+            else:
+                records = filtered[list(record_keys)].rename(columns=record_keys)
+                yield records.to_json(orient='records', lines=True, double_precision=15).encode('utf-8')
+
+    return generate()
+
+
+class IgnoreFormatNegotiation(DefaultContentNegotiation):
+    """Always render with the first renderer, leaving ?format= to the view"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def _time_bound(raw, times, param):
+    """Query timestamp as a bound comparable with times"""
+    try:
+        bound = pd.Timestamp(raw)
+    except ValueError:
+        raise ValueError(f"Invalid {param} value.")
+    if times.dt.tz is not None and bound.tzinfo is None:
+        return bound.tz_localize(times.dt.tz)
+    if times.dt.tz is None and bound.tzinfo is not None:
+        return bound.tz_convert(None)
+    return bound
+
+
+def timeseries_payload(dataset, query_params):
+    """One column in a time window, downsampled to at most `points` points; raises ValueError for bad parameters"""
+    parameter = query_params.get('parameter')
+    if not parameter:
+        raise ValueError("parameter query parameter required.")
+    method = query_params.get('method', 'lttb')
+    if method not in DOWNSAMPLERS:
+        raise ValueError("Invalid method value.")
+    try:
+        points = int(query_params.get('points', DEFAULT_TIMESERIES_POINTS))
+    except ValueError:
+        raise ValueError("Invalid points value.")
+    if not 3 <= points <= settings.TIMESERIES_MAX_POINTS:
+        raise ValueError(f"points must be between 3 and {settings.TIMESERIES_MAX_POINTS}.")
+
+    times, values = read_time_series(dataset.file.path, parameter, dataset.time_column or None)
+
+    # Times are sorted, so the window is two binary searches
+    start, end = 0, len(times)
+    if query_params.get('start'):
+        start = times.searchsorted(_time_bound(query_params['start'], times, 'start'), side='left')
+    if query_params.get('end'):
+        end = times.searchsorted(_time_bound(query_params['end'], times, 'end'), side='right')
+    window_times, window_values = times.iloc[start:end], values[start:end]
+
+    with stage('downsample'):
+        offsets = window_times.array.asi8
+        x = (offsets - offsets[0]).astype('float64') if len(offsets) else offsets.astype('float64')
+        selected = DOWNSAMPLERS[method](x, window_values, points)
+
+    return {
+        'parameter': parameter,
+        'method': method,
+        'total': len(window_times),
+        'timestamps': [timestamp.isoformat() for timestamp in window_times.iloc[selected]],
+        'values': window_values[selected].tolist(),
+    }
+
+
+def pdf_report(dataset):
+    """Render the dataset's PDF report; raises ValueError for bad files"""
+    return generate_pdf_report(summary_payload(dataset), dataset.id)
+
+
+def _reanalyze_file(item):
+    """frame_stats of one (file path, time column) for the bulk re-analyze action (runs on the file pool)"""
+    file_path, time_column = item
+    if not os.path.exists(file_path):
+        return {'status': 'error', 'error': 'File not found.'}
+    try:
+        return {'status': 'ok', 'stats': file_stats(file_path, time_column)}
+    except ValueError as exc:
+        return {'status': 'error', 'error': str(exc)}
+
+
+def _reanalyze_datasets(datasets):
+    """Recompute and store the datasets' stats; returns per-id results with the new summaries.
+
+    The files are read on the file pool; the new stats are then written in
+    one bulk update.
+    """
+    outcomes = map_files(_reanalyze_file, [(dataset.file.path, dataset.time_column) for dataset in datasets])
+    results = {}
+    with transaction.atomic():
+        current = dict(
+            Dataset.objects.filter(id__in=[dataset.id for dataset in datasets]).values_list('id', 'updated_at')
+        )
+        updated = []
+        for dataset, outcome in zip(datasets, outcomes):
+            stats = outcome.pop('stats', None)
+            if stats is not None:
+                outcome['summary'] = summary_from_stats(stats)
+                # Rows appended since the file was read are already folded into newer stats
+                if dataset.id in current and current[dataset.id] == dataset.updated_at:
+                    dataset.stats = stats
+                    updated.append(dataset)
+            results[dataset.id] = outcome
+        Dataset.objects.bulk_update(updated, ['stats'])
+    return results
+
+
+def _bulk_payload(bulk_action, ids, results):
+    """Response body of the bulk action: a result per requested id, in request order"""
+    return {
+        'action': bulk_action,
+        'results': [{'id': dataset_id, **results.get(dataset_id, {'status': 'not_found'})} for dataset_id in ids],
+    }
+
+
+class _ZipStream:
+    """Write-only, unseekable target for zipfile; drain() hands over what was written"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _export_archive_chunks(datasets, ids):
+    """Zip of the datasets' CSV files, produced while it is sent.
+
+    Files are copied in 1 MiB pieces; results.json at the end holds the
+    per-id results the other bulk actions return as JSON.
+    """
+    stream = _ZipStream()
+    results = {}
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for dataset in datasets:
+            arcname = f"dataset_{dataset.id}.csv"
+            try:
+                source = dataset.file.open('rb')
+            except (FileNotFoundError, ValueError):
+                results[dataset.id] = {'status': 'error', 'error': 'File not found.'}
+                continue
+            with source, archive.open(arcname, 'w') as target:
+                while chunk := source.read(1024 * 1024):
+                    target.write(chunk)
+                    yield stream.drain()
+            results[dataset.id] = {'status': 'exported', 'name': arcname}
+        archive.writestr('results.json', json.dumps(_bulk_payload('export', ids, results)))
+    yield stream.drain()
 
 
 @api_view(['POST'])
@@ -73,64 +564,137 @@ def register_view(request):
 
 class DatasetViewSet(viewsets.ModelViewSet):
     serializer_class = DatasetSerializer
-    authentication_classes = [BasicAuthentication]
+    authentication_classes = [CachedBasicAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = DatasetCursorPagination
     
     def get_queryset(self):
         """Return datasets for the current user, or all datasets for admins"""
-        base_queryset = Dataset.objects.all().order_by('-uploaded_at')
-        if self.request.user.is_staff or self.request.user.is_superuser:
-            return base_queryset
-        return base_queryset.filter(user=self.request.user)
+        return visible_datasets(self.request.user)
+
+    def perform_authentication(self, request):
+        with stage('auth'):
+            super().perform_authentication(request)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Ids only grow, so count + newest id/upload identify the visible set,
+        # including deletions, in one aggregate query; owners take one more
+        visible_set = queryset.order_by().aggregate(
+            count=Count('id'), max_id=Max('id'), newest=Max('uploaded_at'), appended=Max('updated_at')
+        )
+        is_admin = request.user.is_staff or request.user.is_superuser
+        # Rows show their owner's username and email, so a renamed owner must change the ETag too
+        if is_admin:
+            owners = list(
+                User.objects.filter(pk__in=queryset.order_by().values('user_id'))
+                .order_by('pk').values_list('pk', 'username', 'email')
+            )
+        else:
+            owners = [(request.user.pk, request.user.username, request.user.email)]
+        etag = _make_etag(
+            'list', request.user.pk, is_admin,
+            visible_set['count'], visible_set['max_id'], str(visible_set['newest']), str(visible_set['appended']),
+            owners, _query_identity(request.query_params)
+        )
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return _set_validators(super().list(request, *args, **kwargs), etag)
     
-    def perform_create(self, serializer):
-        """Associate the created dataset with the current user and keep only last 5"""
-        serializer.save(user=self.request.user)
-        
-        # Keep only the last 5 datasets for this user
-        user_datasets = Dataset.objects.filter(user=self.request.user).order_by('-uploaded_at')
-        if user_datasets.count() > 5:
-            # Delete the oldest datasets (those beyond the 5 most recent)
-            datasets_to_delete = user_datasets[5:]
-            for dataset in datasets_to_delete:
-                # Delete the file if it exists
-                if dataset.file:
-                    dataset.file.delete()
-                dataset.delete()
-
     def create(self, request, *args, **kwargs):
+        """Validate, summarize and store an upload; invalid files are never written"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        instance = serializer.instance
 
+        upload = serializer.validated_data['file']
         try:
-            analyze_csv(instance.file.path)
+            dataset, summary = ingest_upload(request.user, upload)
         except ValueError as exc:
-            if instance.file:
-                instance.file.delete()
-            instance.delete()
-            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            return _rejected_upload(request.user, upload, exc)
+
+        # Only a valid upload may push older datasets out
+        enforce_retention(request.user)
 
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        data = {**self.get_serializer(dataset).data, 'summary': summary}
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=True, methods=['post'])
+    def append(self, request, pk=None):
+        """Append the rows of an uploaded CSV; the stored summary is updated from the new rows only"""
+        dataset = self.get_object()
+        serializer = AppendRowsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not os.path.exists(dataset.file.path):
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        upload = serializer.validated_data['file']
+        try:
+            dataset, summary = append_upload(dataset, upload)
+        except ValueError as exc:
+            return _rejected_upload(request.user, upload, exc)
+        return Response({**self.get_serializer(dataset).data, 'summary': summary})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Apply one action to many datasets and report a result per requested id.
+
+        Only datasets visible through get_queryset are touched; other ids are
+        reported as not found. delete and reanalyze answer with JSON, and
+        reanalyze stores the recomputed stats. export streams a zip of the
+        files with the results in its results.json.
+        """
+        serializer = BulkDatasetActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bulk_action = serializer.validated_data['action']
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        with transaction.atomic():
+            datasets = list(self.get_queryset().filter(id__in=ids))
+            if bulk_action == 'delete':
+                delete_datasets(Dataset.objects.filter(id__in=[dataset.id for dataset in datasets]))
+
+        if bulk_action == 'export':
+            response = StreamingHttpResponse(_export_archive_chunks(datasets, ids), content_type='application/zip')
+            response['Content-Disposition'] = 'attachment; filename="datasets.zip"'
+            return response
+        if bulk_action == 'reanalyze':
+            results = _reanalyze_datasets(datasets)
+        else:
+            results = {dataset.id: {'status': 'deleted'} for dataset in datasets}
+        return Response(_bulk_payload(bulk_action, ids, results))
+
+    @action(detail=False, methods=['get'])
+    def exists(self, request):
+        """Report whether the current user already uploaded a file with this SHA-256"""
+        content_hash = (request.query_params.get('sha256') or '').lower()
+        if len(content_hash) != 64:
+            return Response({'error': 'sha256 query parameter required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dataset = Dataset.objects.filter(user=request.user, content_hash=content_hash).first()
+        if dataset is None:
+            return Response({'exists': False})
+        return Response({'exists': True, 'dataset': self.get_serializer(dataset).data})
 
     def perform_destroy(self, instance):
-        if instance.file:
-            instance.file.delete()
-        instance.delete()
+        delete_datasets(Dataset.objects.filter(pk=instance.pk))
 
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
         dataset = self.get_object()
+        etag, last_modified = dataset_validators(dataset, 'summary', request.query_params)
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
         file_path = dataset.file.path
 
         if not os.path.exists(file_path):
             return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            analysis = analyze_csv(file_path)
-            return Response(analysis)
+            analysis = summary_payload(dataset, request.query_params)
+            return _set_validators(Response(analysis), etag, last_modified)
         except ValueError as exc:
             return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -144,124 +708,166 @@ class DatasetViewSet(viewsets.ModelViewSet):
             return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            analysis = analyze_csv(file_path)
+            pdf_buffer = pdf_report(dataset)
         except ValueError as exc:
             return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        pdf_buffer = generate_pdf_report(analysis, dataset.id)
-        
+
         response = FileResponse(pdf_buffer, content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="dataset_{dataset.id}_report.pdf"'
         return response
 
-    @action(detail=True, methods=['get'])
-    def records(self, request, pk=None):
+    @action(detail=True, methods=['get'], content_negotiation_class=IgnoreFormatNegotiation)
+    def export(self, request, pk=None):
+        """Stream the records matching the records filters as ?format=csv (default) or ndjson"""
+        export_format = request.query_params.get('format', 'csv')
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response({'error': 'Invalid format value.'}, status=status.HTTP_400_BAD_REQUEST)
+
         dataset = self.get_object()
-        file_path = dataset.file.path
+        etag, last_modified = dataset_validators(dataset, 'export', request.query_params)
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
 
-        if not os.path.exists(file_path):
+        if not os.path.exists(dataset.file.path):
             return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            df = validate_csv(file_path)
+            chunks = export_chunks(dataset.file.path, request.query_params, export_format)
         except ValueError as exc:
             return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        name_column = None
-        for candidate in ["Equipment", "Equipment Name", "Name"]:
-            if candidate in df.columns:
-                name_column = candidate
-                break
-
-        equipment_type = request.query_params.get('type')
-        name_query = request.query_params.get('name')
-        pressure_min = request.query_params.get('pressure_min')
-        pressure_max = request.query_params.get('pressure_max')
-        temperature_min = request.query_params.get('temperature_min')
-        temperature_max = request.query_params.get('temperature_max')
-
-        filtered = df.copy()
-
-        if equipment_type:
-            filtered = filtered[filtered["Type"] == equipment_type]
-
-        if name_query:
-            if not name_column:
-                return Response(
-                    {'error': "Missing equipment name column (expected 'Equipment', 'Equipment Name', or 'Name')."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            filtered = filtered[filtered[name_column].astype(str).str.contains(name_query, case=False, na=False)]
-
-        if pressure_min:
-            try:
-                filtered = filtered[filtered["Pressure"] >= float(pressure_min)]
-            except ValueError:
-                return Response({'error': "Invalid pressure_min value."}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="dataset_{dataset.id}.{export_format}"'
+        return _set_validators(response, etag, last_modified)
 
-        if pressure_max:
-            try:
-                filtered = filtered[filtered["Pressure"] <= float(pressure_max)]
-            except ValueError:
-                return Response({'error': "Invalid pressure_max value."}, status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=True, methods=['get'])
+    def timeseries(self, request, pk=None):
+        """Downsampled series: parameter, start, end, points and method (lttb or minmax)"""
+        dataset = self.get_object()
+        etag, last_modified = dataset_validators(dataset, 'timeseries', request.query_params)
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
 
-        if temperature_min:
-            try:
-                filtered = filtered[filtered["Temperature"] >= float(temperature_min)]
-            except ValueError:
-                return Response({'error': "Invalid temperature_min value."}, status=status.HTTP_400_BAD_REQUEST)
+        if not os.path.exists(dataset.file.path):
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if temperature_max:
-            try:
-                filtered = filtered[filtered["Temperature"] <= float(temperature_max)]
-            except ValueError:
-                return Response({'error': "Invalid temperature_max value."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            payload = timeseries_payload(dataset, request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return _set_validators(Response(payload), etag, last_modified)
 
-        records = []
-        for _, row in filtered.iterrows():
-            record = {
-                "type": row["Type"],
-                "flowrate": row["Flowrate"],
-                "pressure": row["Pressure"],
-                "temperature": row["Temperature"],
-            }
-            if name_column:
-                record["name"] = row[name_column]
-            records.append(record)
+    @action(detail=True, methods=['get'])
+    def records(self, request, pk=None):
+        dataset = self.get_object()
+        etag, last_modified = dataset_validators(dataset, 'records', request.query_params)
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        file_path = dataset.file.path
 
-        response_payload = {
-            "records": records,
-            "total": len(filtered),
-            "available_types": sorted(df["Type"].dropna().astype(str).unique().tolist()),
-            "pressure_range": {
-                "min": float(df["Pressure"].min()),
-                "max": float(df["Pressure"].max()),
-            },
-            "temperature_range": {
-                "min": float(df["Temperature"].min()),
-                "max": float(df["Temperature"].max()),
-            },
-            "name_supported": name_column is not None,
-        }
+        if not os.path.exists(file_path):
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(response_payload)
+        try:
+            response_payload = records_payload(file_path, request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return _set_validators(Response(response_payload), etag, last_modified)
 
 
 class AdminUserViewSet(mixins.ListModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
     serializer_class = UserSerializer
-    authentication_classes = [BasicAuthentication]
+    authentication_classes = [CachedBasicAuthentication]
     permission_classes = [IsAuthenticated, IsAdminUser]
-    queryset = User.objects.all().order_by('username')
+    # Users being purged are already gone as far as admins are concerned
+    queryset = User.objects.exclude(purge_jobs__status__in=PurgeJob.ACTIVE_STATUSES).order_by('username')
 
     def destroy(self, request, *args, **kwargs):
+        """Deactivate the user and purge their data in the background"""
         user = self.get_object()
         if user == request.user:
             return Response(
                 {'error': 'Admins cannot delete their own account.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        user_datasets = Dataset.objects.filter(user=user)
-        for dataset in user_datasets:
-            if dataset.file:
-                dataset.file.delete()
-            dataset.delete()
-        return super().destroy(request, *args, **kwargs)
+        job = start_user_purge(user, request.user)
+        return Response(PurgeJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class PurgeJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = PurgeJobSerializer
+    authentication_classes = [CachedBasicAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    queryset = PurgeJob.objects.all()
+
+
+class ValidationReportViewSet(mixins.DestroyModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Reports of rejected uploads: the user's own, or every report for admins"""
+    serializer_class = ValidationReportSerializer
+    authentication_classes = [CachedBasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = ValidationReport.objects.all()
+        if self.request.user.is_staff or self.request.user.is_superuser:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        delete_validation_reports(ValidationReport.objects.filter(pk=instance.pk))
+
+    @action(detail=True, methods=['get'])
+    def issues(self, request, pk=None):
+        """Issue rows (row, column, rule, value, message), paginated with page/page_size"""
+        report = self.get_object()
+        if not report.report or not report.report.storage.exists(report.report.name):
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
+        paginator = ValidationIssuePagination()
+        page = paginator.paginate_queryset(ReportIssues(report), request, view=self)
+        return paginator.get_paginated_response(page)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Every issue of the report as CSV"""
+        report = self.get_object()
+        if not report.report or not report.report.storage.exists(report.report.name):
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            report.report.open('rb'), as_attachment=True, filename=f"validation_report_{report.id}.csv",
+            content_type='text/csv',
+        )
+
+
+class RequestProfileViewSet(mixins.DestroyModelMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = RequestProfileSerializer
+    authentication_classes = [CachedBasicAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    queryset = RequestProfile.objects.select_related('requested_by')
+
+    def perform_destroy(self, instance):
+        instance.artifact.delete(save=False)
+        instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Raw artifact: marshalled pstats data (.prof) or pyinstrument HTML"""
+        profile = self.get_object()
+        if not profile.artifact or not profile.artifact.storage.exists(profile.artifact.name):
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(profile.artifact.open('rb'), as_attachment=True, filename=profile.artifact.name)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Top functions of a cProfile artifact by cumulative time, as plain text"""
+        profile = self.get_object()
+        if profile.profiler != RequestProfile.PROFILER_CPROFILE:
+            return Response({'error': 'Only cProfile artifacts have text stats.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not profile.artifact or not profile.artifact.storage.exists(profile.artifact.name):
+            return Response({'error': 'File not found.'}, status=status.HTTP_404_NOT_FOUND)
+        output = io.StringIO()
+        pstats.Stats(profile.artifact.path, stream=output).sort_stats('cumulative').print_stats(40)
+        return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Under ASGI the heavy read endpoints run as async views with an offload pool
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
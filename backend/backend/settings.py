@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,10 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'analytics.metrics.RequestMetricsMiddleware',
+    'analytics.profiling.RequestProfilingMiddleware',
+    'analytics.middleware.ResponseCompressionMiddleware',
+    'analytics.middleware.RequestDecompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,12 +84,53 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Configured from the environment. SQLite (the default) runs in WAL mode with a
+# busy timeout and IMMEDIATE transactions, so concurrent writers wait for the
+# lock instead of failing with "database is locked". Set DB_ENGINE=postgresql
+# (and install psycopg) for multi-process deployments.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'chemviz'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL') == '1':
+        # psycopg 3 connection pool; Django requires CONN_MAX_AGE=0 with pooling
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = True
+else:
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '20'))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': SQLITE_BUSY_TIMEOUT,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT * 1000};'
+                ),
+            },
+            # File-backed so tests exercise real locking instead of an in-memory DB
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
     }
-}
 
 
 # Password validation
@@ -124,7 +170,67 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+
+# Dataset retention used when no RetentionPolicy row applies (None = no limit)
+DATASET_RETENTION = {
+    'max_datasets': 5,
+    'max_total_bytes': None,
+    'max_age_days': None,
+}
+
+# Threads in the shared pool for deferred work such as file sweeping
+BACKGROUND_WORKERS = 2
+
+# Threads for CSV/file work fanned out from a request (bulk re-analyze)
+FILE_WORKERS = 4
+
+# Store CSV float columns as float32 (half the memory, ~7 significant digits)
+CSV_FLOAT32 = os.environ.get('CSV_FLOAT32') == '1'
+
+# Worker processes for parsing one large CSV in byte ranges, and the file size
+# from which analyze_csv uses them
+INGEST_PROCESSES = int(os.environ.get('INGEST_PROCESSES', min(4, os.cpu_count() or 1)))
+PARALLEL_INGEST_MIN_BYTES = int(os.environ.get('PARALLEL_INGEST_MIN_BYTES', 64 * 1024 * 1024))
+
+# Threads for pandas/ReportLab work offloaded by the async (ASGI) read views
+ASYNC_CSV_WORKERS = int(os.environ.get('ASYNC_CSV_WORKERS', '4'))
+
+# Serve summary/records/download_pdf from the async views; asgi.py turns this on
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+
+# Largest request body accepted once a Content-Encoding: gzip upload is inflated
+GZIP_REQUEST_MAX_BYTES = int(os.environ.get('GZIP_REQUEST_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Clients allowed to scrape /api/metrics/ (Prometheus text format). Behind a reverse
+# proxy every request comes from the proxy, so scrapes must also authenticate:
+# with Authorization: Bearer METRICS_TOKEN, or as a staff user with Basic auth
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# The JSON renderer reports its time in the Server-Timing header
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'analytics.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Upload validation rules beyond required columns and numeric values.
+# Inclusive (min, max) per numeric column, with None for an open end, e.g.
+# {'Pressure': (0, 400), 'Temperature': (-273.15, None)}
+VALIDATION_RANGES = {}
+# Equipment types an upload may contain; None accepts any
+VALIDATION_ALLOWED_TYPES = None
+# Validation reports of rejected uploads kept per user
+VALIDATION_REPORT_RETENTION = 20
+
+# Upper bound for the points= parameter of the downsampled time-series endpoint
+TIMESERIES_MAX_POINTS = 10000
+
+# Stored request profiles (X-Profile header, staff only); kept outside MEDIA_ROOT
+PROFILE_ROOT = os.environ.get('PROFILE_ROOT', BASE_DIR / 'profiles')
+PROFILE_RETENTION = 50
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -0,0 +1,196 @@
+"""Microbenchmarks for the analytics hot paths with a stored baseline.
+
+Times validate_csv, analyze_csv, the records filtering + JSON serialization and
+generate_pdf_report on generated CSVs, and reports peak traced memory per
+stage. Run from the backend directory:
+
+    python -m benchmarks.bench_analytics --rows 1000 100000
+    python -m benchmarks.bench_analytics --rows 1000000 --types 40 --invalid-fraction 0.001
+    python -m benchmarks.bench_analytics --save-baseline      # after an intended change
+    python -m benchmarks.bench_analytics --check              # exit 1 on a regression
+
+Timings depend on the machine; refresh the baseline on the machine you compare on.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import QueryDict  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from analytics.utils import analyze_csv, generate_pdf_report, validate_csv  # noqa: E402
+from analytics.views import records_payload  # noqa: E402
+
+from .generate_csv import equipment_types, generate_equipment_csv  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Slowdowns smaller than this are timer and scheduler noise, whatever the ratio
+NOISE_FLOOR_SECONDS = 0.005
+STAGES = ["validate_csv", "analyze_csv", "records", "records_filtered", "pdf_report"]
+
+
+def _records(path, query=""):
+    return JSONRenderer().render(records_payload(path, QueryDict(query)))
+
+
+def stage_functions(path, types):
+    """Stage name -> zero-argument callable; stages needing a valid CSV are built lazily"""
+    filtered_query = f"type={equipment_types(types)[0]}&pressure_min=8&temperature_max=150"
+    summary = {}
+
+    def pdf_report():
+        if not summary:
+            summary.update(analyze_csv(path))
+        return generate_pdf_report(summary, 1)
+
+    return {
+        "validate_csv": lambda: validate_csv(path),
+        "analyze_csv": lambda: analyze_csv(path),
+        "records": lambda: _records(path),
+        "records_filtered": lambda: _records(path, filtered_query),
+        "pdf_report": pdf_report,
+    }
+
+
+def _call(func):
+    """Run func and return its ValueError message, if any"""
+    try:
+        func()
+    except ValueError as exc:
+        return str(exc)
+    return None
+
+
+def measure(func, repeat):
+    """Median/min wall time over `repeat` runs plus peak traced memory of one extra run.
+
+    A ValueError (e.g. an invalid CSV) is timed like a normal result and recorded.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        error = _call(func)
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows allocation-heavy code, so memory is measured separately
+    tracemalloc.start()
+    try:
+        _call(func)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = {
+        "seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "peak_mb": peak / (1024 * 1024),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def case_key(rows, types, name_column, invalid_fraction):
+    return f"rows={rows},types={types},name={name_column or 'none'},invalid={invalid_fraction:g}"
+
+
+def run_case(data_dir, rows, types, name_column, invalid_fraction, repeat, stages):
+    key = case_key(rows, types, name_column, invalid_fraction)
+    path = os.path.join(data_dir, key.replace(",", "_").replace("=", "-").replace(" ", "") + ".csv")
+    if not os.path.exists(path):
+        generate_equipment_csv(path, rows, types, name_column, invalid_fraction)
+
+    functions = stage_functions(path, types)
+    results = {}
+    for stage in stages:
+        results[stage] = measure(functions[stage], repeat)
+        if "error" in results[stage] and stage.startswith("validate"):
+            # Invalid files stop at validation; later stages would only time the same failure
+            break
+    return key, results
+
+
+def compare(results, baseline, tolerance):
+    """Print a table against the baseline and return the list of regressions"""
+    regressions = []
+    print(f"{'case / stage':58s} {'median s':>10s} {'peak MB':>9s} {'vs base':>9s}")
+    for key, stages in results.items():
+        print(key)
+        for stage, result in stages.items():
+            base = baseline.get(key, {}).get(stage)
+            ratio_text = ""
+            if base and "min_seconds" in base:
+                # The fastest run is the least noisy estimate for short stages
+                ratio = result["min_seconds"] / base["min_seconds"]
+                ratio_text = f"{ratio:8.2f}x"
+                slower_by = result["min_seconds"] - base["min_seconds"]
+                if ratio > 1 + tolerance and slower_by > NOISE_FLOOR_SECONDS:
+                    ratio_text += " !"
+                    regressions.append((key, stage, ratio))
+            print(f"  {stage:56s} {result['seconds']:10.4f} {result['peak_mb']:9.1f} {ratio_text:>9s}")
+            if "error" in result:
+                print(f"    -> {result['error']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="row counts (1k to 10M)")
+    parser.add_argument("--types", type=int, default=6, help="Type column cardinality")
+    parser.add_argument("--name-column", default="Equipment Name", help="'none' to omit the name column")
+    parser.add_argument("--invalid-fraction", type=float, default=0.0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "chemviz-bench"),
+                        help="where generated CSVs are cached")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="merge these results into the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if any stage regressed")
+    parser.add_argument("--json", help="write raw results to this file")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    name_column = None if args.name_column.lower() == "none" else args.name_column
+
+    results = {}
+    for rows in args.rows:
+        key, stages = run_case(
+            args.data_dir, rows, args.types, name_column, args.invalid_fraction, args.repeat, args.stages
+        )
+        results[key] = stages
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        for key, stages in results.items():
+            baseline.setdefault(key, {}).update(stages)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Deterministic generator for synthetic equipment CSVs.
+
+The same arguments always produce the same bytes, so benchmark inputs can be
+recreated instead of committed:
+
+    python -m benchmarks.generate_csv /tmp/equipment_1m.csv --rows 1000000 --types 12
+    python -m benchmarks.generate_csv /tmp/broken.csv --rows 10000 --invalid-fraction 0.01
+"""
+import argparse
+import csv
+
+import numpy as np
+
+NAME_COLUMNS = ("Equipment Name", "Equipment", "Name")
+BASE_TYPES = ["Pump", "Valve", "Compressor", "Heat Exchanger", "Reactor", "Condenser", "Mixer", "Separator"]
+# Rows are generated and written in blocks so 10M-row files need little memory
+BLOCK_ROWS = 100_000
+
+
+def equipment_types(count):
+    """The first `count` type names; beyond the built-in list they are numbered"""
+    return [BASE_TYPES[i] if i < len(BASE_TYPES) else f"Type {i}" for i in range(count)]
+
+
+def generate_equipment_csv(path, rows, types=6, name_column="Equipment Name", invalid_fraction=0.0, seed=0):
+    """Write a synthetic equipment CSV and return the number of rows with an invalid value.
+
+    name_column may be one of NAME_COLUMNS or None to omit names. A fraction of
+    rows gets a non-numeric Flowrate, Pressure or Temperature.
+    """
+    if name_column is not None and name_column not in NAME_COLUMNS:
+        raise ValueError(f"name_column must be one of {', '.join(NAME_COLUMNS)} or None.")
+    rng = np.random.default_rng(seed)
+    type_names = np.array(equipment_types(types), dtype=object)
+    header = ([name_column] if name_column else []) + ["Type", "Flowrate", "Pressure", "Temperature"]
+    invalid_rows = 0
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for start in range(0, rows, BLOCK_ROWS):
+            count = min(BLOCK_ROWS, rows - start)
+            columns = [
+                type_names[rng.integers(0, types, count)],
+                np.round(rng.gamma(4.0, 30.0, count), 2).astype(object),
+                np.round(rng.normal(12.0, 4.0, count).clip(0.5), 2).astype(object),
+                np.round(rng.normal(110.0, 35.0, count).clip(-20), 1).astype(object),
+            ]
+            if invalid_fraction:
+                broken = np.flatnonzero(rng.random(count) < invalid_fraction)
+                targets = rng.integers(1, 4, broken.size)
+                for row, column in zip(broken, targets):
+                    columns[column][row] = "n/a"
+                invalid_rows += broken.size
+            if name_column:
+                columns.insert(0, [f"Unit-{start + i:08d}" for i in range(count)])
+            writer.writerows(zip(*columns))
+    return invalid_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="output CSV path")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--types", type=int, default=6, help="number of distinct equipment types")
+    parser.add_argument("--name-column", default="Equipment Name", help="'none' to omit the name column")
+    parser.add_argument("--invalid-fraction", type=float, default=0.0, help="share of rows with a bad number")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    name_column = None if args.name_column.lower() == "none" else args.name_column
+    invalid = generate_equipment_csv(
+        args.path, args.rows, args.types, name_column, args.invalid_fraction, args.seed
+    )
+    print(f"wrote {args.rows} rows ({invalid} invalid) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
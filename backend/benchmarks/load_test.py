@@ -0,0 +1,291 @@
+"""End-to-end load test for the REST API.
+
+Simulated dashboard users each log in and then replay a weighted mix of
+login, dataset list, summary, filtered records, PDF download and upload
+requests, with a think time between requests. The report lists throughput and
+p50/p95/p99 latency per endpoint. Run from the backend directory:
+
+    python -m benchmarks.load_test --start-server --users 20 --duration 60
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000/api --users 50 --json run.json
+    python -m benchmarks.load_test --start-server --users 50 --compare run.json
+
+--start-server runs `manage.py runserver` on a throwaway SQLite database and
+media directory; otherwise the target server must already be running.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from .generate_csv import equipment_types, generate_equipment_csv
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "login=1,list=4,summary=3,records=3,pdf=1,upload=1"
+ENDPOINTS = ["login", "list", "summary", "records", "pdf", "upload"]
+PASSWORD = "load-test-pass"
+UPLOAD_VARIANTS = 4
+
+
+def parse_mix(text):
+    """'list=4,summary=3' -> {'list': 4.0, 'summary': 3.0}"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Recorder:
+    """Thread-safe collection of (endpoint, latency, status) samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {endpoint: [] for endpoint in ENDPOINTS}
+
+    def add(self, endpoint, latency, status_code):
+        with self._lock:
+            self.samples[endpoint].append((latency, status_code))
+
+    def report(self, elapsed):
+        report = {}
+        for endpoint, samples in self.samples.items():
+            if not samples:
+                continue
+            latencies = sorted(latency * 1000 for latency, _ in samples)
+            statuses = {}
+            for _, status_code in samples:
+                statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+            errors = sum(count for code, count in statuses.items() if not code.startswith(("2", "3")))
+            report[endpoint] = {
+                "requests": len(samples),
+                "errors": errors,
+                "throughput_rps": len(samples) / elapsed,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": latencies[-1],
+                "statuses": statuses,
+            }
+        return report
+
+
+class VirtualUser:
+    """One dashboard user with its own session and known dataset ids"""
+
+    def __init__(self, base_url, username, csv_paths, types, recorder, rng):
+        self.base_url = base_url
+        self.username = username
+        self.csv_paths = csv_paths
+        self.types = types
+        self.recorder = recorder
+        self.rng = rng
+        self.session = requests.Session()
+        self.session.auth = (username, PASSWORD)
+        self.dataset_ids = []
+
+    def _request(self, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}/{path}", timeout=120, **kwargs)
+            status_code = response.status_code
+        except requests.exceptions.RequestException:
+            response, status_code = None, "connection_error"
+        self.recorder.add(endpoint, time.perf_counter() - start, status_code)
+        return response
+
+    def login(self):
+        self._request("login", "POST", "auth/login/", json={"username": self.username, "password": PASSWORD})
+
+    def list(self):
+        response = self._request("list", "GET", "datasets/")
+        if response is not None and response.status_code == 200:
+            self.dataset_ids = [item["id"] for item in response.json()["results"]]
+
+    def summary(self):
+        self._request("summary", "GET", f"datasets/{self._dataset_id()}/summary/")
+
+    def records(self):
+        params = {
+            "type": self.rng.choice(equipment_types(self.types)),
+            "pressure_min": self.rng.choice(["", "8", "12"]),
+            "temperature_max": self.rng.choice(["", "120", "150"]),
+        }
+        self._request("records", "GET", f"datasets/{self._dataset_id()}/records/", params=params)
+
+    def pdf(self):
+        self._request("pdf", "GET", f"datasets/{self._dataset_id()}/download_pdf/")
+
+    def upload(self):
+        path = self.rng.choice(self.csv_paths)
+        with open(path, "rb") as f:
+            response = self._request("upload", "POST", "datasets/", files={"file": (os.path.basename(path), f)})
+        if response is not None and response.status_code == 201:
+            # Retention may have removed older datasets; the next list refreshes the ids
+            self.dataset_ids.insert(0, response.json()["id"])
+
+    def _dataset_id(self):
+        return self.rng.choice(self.dataset_ids[:5])
+
+    def run(self, mix, deadline, think_time):
+        names, weights = list(mix), list(mix.values())
+        self.login()
+        self.list()
+        while time.monotonic() < deadline:
+            action = self.rng.choices(names, weights)[0]
+            if action in ("summary", "records", "pdf") and not self.dataset_ids:
+                action = "upload"
+            getattr(self, action)()
+            if think_time:
+                time.sleep(self.rng.uniform(0.5, 1.5) * think_time)
+
+
+def prepare_users(base_url, count, run_id, seed_csv):
+    """Register (or reuse) the load-test accounts and give each one dataset"""
+    usernames = []
+    for i in range(count):
+        username = f"loadtest-{run_id}-{i}"
+        requests.post(f"{base_url}/auth/register/", json={"username": username, "password": PASSWORD}, timeout=30)
+        auth = (username, PASSWORD)
+        listing = requests.get(f"{base_url}/datasets/", auth=auth, timeout=30)
+        listing.raise_for_status()
+        if not listing.json()["results"]:
+            with open(seed_csv, "rb") as f:
+                requests.post(f"{base_url}/datasets/", auth=auth, files={"file": f}, timeout=120).raise_for_status()
+        usernames.append(username)
+    return usernames
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(workdir):
+    """Start runserver on a fresh database in workdir; returns (process, base_url)"""
+    env = {
+        **os.environ,
+        "SQLITE_PATH": os.path.join(workdir, "loadtest.sqlite3"),
+        "MEDIA_ROOT": os.path.join(workdir, "media"),
+    }
+    manage = [sys.executable, os.path.join(BACKEND_DIR, "manage.py")]
+    subprocess.run(manage + ["migrate", "-v0"], cwd=BACKEND_DIR, env=env, check=True)
+
+    port = _free_port()
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        manage + ["runserver", f"127.0.0.1:{port}", "--noreload"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}/api"
+    for _ in range(100):
+        try:
+            requests.get(f"{base_url}/", timeout=1)
+            return process, base_url
+        except requests.exceptions.ConnectionError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not start; see {log.name}")
+
+
+def print_report(report, elapsed, previous=None):
+    print(f"{'endpoint':10s} {'reqs':>7s} {'errors':>7s} {'rps':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for endpoint, stats in report.items():
+        line = (
+            f"{endpoint:10s} {stats['requests']:7d} {stats['errors']:7d} {stats['throughput_rps']:8.1f} "
+            f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f}"
+        )
+        before = (previous or {}).get(endpoint)
+        if before:
+            line += f"   p95 {stats['p95_ms'] / before['p95_ms']:5.2f}x  rps {stats['throughput_rps'] / before['throughput_rps']:5.2f}x"
+        print(line)
+    total = sum(stats["requests"] for stats in report.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--start-server", action="store_true", help="start a throwaway local runserver")
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load after setup")
+    parser.add_argument("--think-time", type=float, default=0.2, help="mean pause between a user's requests (s)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"weights, default {DEFAULT_MIX}")
+    parser.add_argument("--rows", type=int, default=5_000, help="rows per uploaded CSV")
+    parser.add_argument("--types", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write config and results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="chemviz-load-") as workdir:
+        csv_paths = []
+        for variant in range(UPLOAD_VARIANTS):
+            path = os.path.join(workdir, f"equipment_{variant}.csv")
+            generate_equipment_csv(path, args.rows, args.types, seed=args.seed + variant)
+            csv_paths.append(path)
+
+        process = None
+        base_url = args.base_url.rstrip("/")
+        if args.start_server:
+            process, base_url = start_local_server(workdir)
+        try:
+            run_id = f"{int(time.time())}"
+            usernames = prepare_users(base_url, args.users, run_id, csv_paths[0])
+            recorder = Recorder()
+            users = [
+                VirtualUser(base_url, username, csv_paths, args.types, recorder, random.Random(args.seed + i))
+                for i, username in enumerate(usernames)
+            ]
+            start = time.monotonic()
+            deadline = start + args.duration
+            threads = [
+                threading.Thread(target=user.run, args=(args.mix, deadline, args.think_time), daemon=True)
+                for user in users
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - start
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    report = recorder.report(elapsed)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["endpoints"]
+    print_report(report, elapsed, previous)
+
+    if args.json:
+        config = {key: value for key, value in vars(args).items() if key not in ("json", "compare")}
+        with open(args.json, "w") as f:
+            json.dump({"config": config, "elapsed_s": elapsed, "endpoints": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import uuid
+
 import requests
 from requests.auth import HTTPBasicAuth
 
 API_BASE = "http://127.0.0.1:8000/api"
+UPLOAD_CHUNK_SIZE = 256 * 1024
 
 # Store credentials and user info globally
 _credentials = None
@@ -58,22 +67,144 @@ def register(username, password, email=''):
     except:
         return None
 
-def get_datasets():
-    """Fetch all datasets"""
+def get_datasets(page_url=None):
+    """Fetch one page of datasets, newest first: (datasets, next_page_url or None).
+
+    The list is cursor-paginated ({"next", "previous", "results"}); pass the
+    returned next_page_url to load the following, older page.
+    """
     auth = get_auth()
     if not auth:
-        return []
-    response = requests.get(f"{API_BASE}/datasets/", auth=auth)
-    return response.json() if response.status_code == 200 else []
+        return [], None
+    response = requests.get(page_url or f"{API_BASE}/datasets/", auth=auth)
+    if response.status_code != 200:
+        return [], None
+    payload = response.json()
+    if not isinstance(payload, dict):
+        return payload, None
+    return payload.get("results", []), payload.get("next")
+
+def _sha256_file(file_path):
+    """Hash a file on disk without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class _MultipartFileBody:
+    """Readable multipart/form-data body that streams a single file field from disk"""
+    def __init__(self, file_path, field_name='file'):
+        boundary = uuid.uuid4().hex
+        filename = os.path.basename(file_path).replace('"', '')
+        head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            'Content-Type: text/csv\r\n\r\n'
+        ).encode('utf-8')
+        tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        self.length = len(head) + os.path.getsize(file_path) + len(tail)
+        self._parts = [io.BytesIO(head), open(file_path, 'rb'), io.BytesIO(tail)]
+
+    def read(self, size=-1):
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0).close()
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b''.join(chunks)
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+class _ProgressReader:
+    """Wraps a readable body and reports bytes handed to the connection"""
+    def __init__(self, stream, length, progress_callback=None):
+        self._stream = stream
+        self._length = length
+        self._sent = 0
+        self._progress_callback = progress_callback
+
+    def __len__(self):
+        return self._length
 
-def upload_csv(file_path):
-    """Upload CSV file"""
+    def read(self, size=-1):
+        chunk = self._stream.read(size)
+        self._sent += len(chunk)
+        if self._progress_callback and chunk:
+            self._progress_callback(self._sent, self._length)
+        return chunk
+
+def _gzip_to_tempfile(stream):
+    """Compress a readable stream into a temporary file and return (file, size)"""
+    compressed = tempfile.TemporaryFile()
+    with gzip.GzipFile(fileobj=compressed, mode='wb', compresslevel=6) as gz:
+        shutil.copyfileobj(stream, gz, UPLOAD_CHUNK_SIZE)
+    size = compressed.tell()
+    compressed.seek(0)
+    return compressed, size
+
+def find_existing_upload(file_path):
+    """Ask the server whether this file's content was already uploaded.
+
+    Returns (dataset_or_None, server_accepts_gzip).
+    """
+    auth = get_auth()
+    try:
+        response = requests.get(
+            f"{API_BASE}/datasets/exists/",
+            params={'sha256': _sha256_file(file_path)},
+            auth=auth
+        )
+    except requests.exceptions.RequestException:
+        return None, False
+    accepts_gzip = 'gzip' in response.headers.get('Accept-Encoding', '').lower()
+    if response.status_code != 200:
+        return None, accepts_gzip
+    payload = response.json()
+    return (payload.get('dataset') if payload.get('exists') else None), accepts_gzip
+
+def upload_csv(file_path, progress_callback=None):
+    """Upload CSV file in chunks, skipping content the server already has.
+
+    progress_callback(bytes_sent, total_bytes) is called from the calling thread
+    as the body is written to the connection.
+    """
     auth = get_auth()
     if not auth:
         return {"error": "Not authenticated."}
-    with open(file_path, 'rb') as f:
-        files = {'file': f}
-        response = requests.post(f"{API_BASE}/datasets/", files=files, auth=auth)
+
+    existing, accepts_gzip = find_existing_upload(file_path)
+    if existing:
+        return {**existing, "duplicate": True}
+
+    body = _MultipartFileBody(file_path)
+    headers = {'Content-Type': body.content_type}
+    compressed = None
+    try:
+        if accepts_gzip:
+            compressed, length = _gzip_to_tempfile(body)
+            stream = compressed
+            headers['Content-Encoding'] = 'gzip'
+        else:
+            stream, length = body, body.length
+        response = requests.post(
+            f"{API_BASE}/datasets/",
+            data=_ProgressReader(stream, length, progress_callback),
+            headers=headers,
+            auth=auth
+        )
+    finally:
+        body.close()
+        if compressed:
+            compressed.close()
     try:
         payload = response.json()
     except Exception:
@@ -103,6 +234,24 @@ def delete_dataset(dataset_id):
     response = requests.delete(f"{API_BASE}/datasets/{dataset_id}/", auth=auth)
     return response.status_code
 
+def bulk_dataset_action(action, dataset_ids):
+    """Run 'delete' or 'reanalyze' on several datasets in one request; returns the per-id results"""
+    auth = get_auth()
+    if not auth:
+        return {"error": "Not authenticated."}
+    try:
+        response = requests.post(
+            f"{API_BASE}/datasets/bulk/",
+            json={'action': action, 'ids': list(dataset_ids)},
+            auth=auth
+        )
+        payload = response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return {"error": "Bulk request failed."}
+    if response.status_code == 200:
+        return payload
+    return {"error": payload.get("error") or payload.get("detail") or "Bulk request failed."}
+
 def download_pdf(dataset_id, save_path):
     """Download PDF report"""
     auth = get_auth()
@@ -0,0 +1,146 @@
+"""Measure desktop app startup: time to first paint of the main window and RSS.
+
+Each run starts a fresh interpreter so import costs are measured cold:
+
+    python bench_startup.py --runs 5
+    python bench_startup.py --runs 5 --admin --json startup.json
+
+No backend is needed; the app starts unauthenticated and shows empty lists.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Fallback start time for a --single run started by hand without psutil
+_MODULE_START = time.time()
+
+
+def _run_start():
+    """Wall-clock time this run began, so interpreter startup and imports count toward first paint.
+
+    That is the parent's spawn time when started by main_cli, else the
+    process creation time from psutil, else the import time of this module.
+    """
+    spawned = os.environ.get("BENCH_SPAWN_TIME")
+    if spawned:
+        return float(spawned)
+    try:
+        import psutil
+        return psutil.Process().create_time()
+    except ImportError:
+        return _MODULE_START
+
+
+def _rss_mb():
+    """Resident set size of this process in MB, or None if unavailable.
+
+    With psutil this is the current RSS; without it, the fallback is the
+    peak RSS so far (ru_maxrss), which never goes down.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+        # ru_maxrss is KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+def run_once(admin=False):
+    """Start the main window in this process and return its startup metrics"""
+    run_start = _run_start()
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    import_start = time.perf_counter()
+    import api_client
+    import main
+    import_ms = (time.perf_counter() - import_start) * 1000
+
+    if admin:
+        api_client._current_user = {"id": 0, "username": "bench", "is_admin": True}
+
+    metrics = {}
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "first_paint_ms" not in metrics:
+                metrics["first_paint_ms"] = (time.time() - run_start) * 1000
+                metrics["rss_at_first_paint_mb"] = _rss_mb()
+                # Let the deferred startup work run before reading the final RSS
+                QTimer.singleShot(200, app.quit)
+            return False
+
+    construct_start = time.perf_counter()
+    window = main.App()
+    metrics["construct_ms"] = (time.perf_counter() - construct_start) * 1000
+    paint_filter = FirstPaint()
+    window.installEventFilter(paint_filter)
+    window.show()
+    app.exec_()
+
+    metrics["import_ms"] = import_ms
+    metrics["rss_settled_mb"] = _rss_mb()
+    metrics["matplotlib_loaded"] = "matplotlib" in sys.modules
+    return metrics
+
+
+def _summarize(runs):
+    keys = ["import_ms", "construct_ms", "first_paint_ms", "rss_at_first_paint_mb", "rss_settled_mb"]
+    summary = {}
+    for key in keys:
+        values = [run[key] for run in runs if run.get(key) is not None]
+        if values:
+            summary[key] = {
+                "median": statistics.median(values),
+                "min": min(values),
+                "max": max(values),
+            }
+    return summary
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--admin", action="store_true", help="start the window as an admin user")
+    parser.add_argument("--json", help="write raw runs and summary to this file")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_once(admin=args.admin)))
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(args.runs):
+        command = [sys.executable, os.path.abspath(__file__), "--single"]
+        if args.admin:
+            command.append("--admin")
+        env = dict(os.environ, BENCH_SPAWN_TIME=repr(time.time()))
+        output = subprocess.run(command, cwd=here, env=env, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    summary = _summarize(runs)
+    for key, stats in summary.items():
+        print(f"{key:24s} median {stats['median']:9.1f}  min {stats['min']:9.1f}  max {stats['max']:9.1f}")
+    print(f"{'matplotlib_loaded':24s} {any(run['matplotlib_loaded'] for run in runs)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,24 +1,41 @@
 import sys
 import os
+import math
 import platform
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QPushButton, QLabel, QScrollArea, QLineEdit, QTabWidget,
     QVBoxLayout, QHBoxLayout, QFileDialog, QListWidget, QListWidgetItem,
     QFrame, QMessageBox, QGridLayout, QSpacerItem, QSizePolicy,
-    QComboBox, QTableWidget, QTableWidgetItem, QHeaderView
+    QComboBox, QTableWidget, QTableWidgetItem, QHeaderView, QProgressBar
 )
-from PyQt5.QtCore import Qt, QSize, QRect, QPropertyAnimation, QEasingCurve
+from PyQt5.QtCore import Qt, QSize, QRect, QPropertyAnimation, QEasingCurve, QTimer, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QIcon, QPixmap
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import mplcursors
 
 from api_client import (
-    get_datasets, upload_csv, get_summary, delete_dataset,
+    get_datasets, upload_csv, get_summary, delete_dataset, bulk_dataset_action,
     login, register, download_pdf, set_credentials,
     get_users, delete_user, get_current_user, get_records
 )
 
+CHART_COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
+CHART_MAX_CATEGORIES = len(CHART_COLORS)
+CHART_OTHER_LABEL = "Other"
+CHART_OTHER_COLOR = '#9ca3af'
+CHART_PIE_START_ANGLE = 140
+
+
+def _cap_categories(distribution, max_categories):
+    """Return (labels, values) capped at max_categories, summing the tail into an Other slot"""
+    labels = [str(label) for label in distribution.keys()]
+    values = list(distribution.values())
+    if len(labels) <= max_categories:
+        return labels, values
+    ranked = sorted(zip(values, labels), key=lambda pair: pair[0], reverse=True)
+    head = ranked[:max_categories - 1]
+    other = sum(value for value, _ in ranked[max_categories - 1:])
+    return [label for _, label in head] + [CHART_OTHER_LABEL], [value for value, _ in head] + [other]
+
+
 class StyledButton(QPushButton):
     """Custom styled button with enhanced minimalistic design"""
     def __init__(self, text, primary=False, danger=False, small=False):
@@ -312,6 +329,29 @@ class StatCard(QFrame):
         
         self.setLayout(layout)
 
+class UploadWorker(QThread):
+    """Runs upload_csv off the UI thread and reports progress as a percentage"""
+    progress = pyqtSignal(int)
+    completed = pyqtSignal(dict)
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        self._last_percent = -1
+
+    def _report(self, sent, total):
+        percent = int(sent * 100 / total) if total else 100
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.progress.emit(percent)
+
+    def run(self):
+        try:
+            result = upload_csv(self.file_path, progress_callback=self._report)
+        except Exception:
+            result = {"error": "Upload failed."}
+        self.completed.emit(result or {})
+
 class LoginDialog(QWidget):
     """Authentication dialog for login and registration"""
     def __init__(self, on_login_success):
@@ -686,9 +726,31 @@ class App(QWidget):
         self.file_label.setFont(QFont("Segoe UI", 10))
         self.file_label.setStyleSheet("color: #6b7280; background: transparent;")
         self.file_label.setWordWrap(True)
+
+        self.upload_progress = QProgressBar()
+        self.upload_progress.setRange(0, 100)
+        self.upload_progress.setTextVisible(True)
+        self.upload_progress.setVisible(False)
+        self.upload_progress.setStyleSheet("""
+            QProgressBar {
+                border: 1px solid #e5e7eb;
+                border-radius: 6px;
+                background: #f3f4f6;
+                height: 14px;
+                text-align: center;
+                font-size: 10px;
+                color: #374151;
+            }
+            QProgressBar::chunk {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #3b82f6, stop:1 #2563eb);
+                border-radius: 6px;
+            }
+        """)
+        self.upload_worker = None
         
         upload_layout.addLayout(upload_header)
         upload_layout.addWidget(self.file_label)
+        upload_layout.addWidget(self.upload_progress)
         upload_layout.addWidget(self.upload_btn)
         upload_layout.addStretch()
         upload_card.setLayout(upload_layout)
@@ -710,9 +772,19 @@ class App(QWidget):
         datasets_header.addWidget(datasets_icon)
         datasets_header.addWidget(self.datasets_title)
         datasets_header.addStretch()
+        # Ctrl/Shift-click rows to pick several datasets, removed in one bulk request
+        self.delete_selected_btn = StyledButton("🗑 Delete selected", danger=True, small=True)
+        self.delete_selected_btn.setMaximumWidth(150)
+        self.delete_selected_btn.setEnabled(False)
+        self.delete_selected_btn.clicked.connect(self.delete_selected_datasets)
+        datasets_header.addWidget(self.delete_selected_btn)
         
         self.dataset_list = QListWidget()
         self.dataset_list.setMaximumHeight(250)
+        self.dataset_list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.dataset_list.itemSelectionChanged.connect(
+            lambda: self.delete_selected_btn.setEnabled(bool(self._selected_dataset_ids()))
+        )
         self.dataset_list.setStyleSheet("""
             QListWidget {
                 border: none;
@@ -724,6 +796,10 @@ class App(QWidget):
                 margin: 6px 0px;
                 background: transparent;
             }
+            QListWidget::item:selected {
+                background: #dbeafe;
+                border-radius: 10px;
+            }
         """)
         
         datasets_card_layout.addLayout(datasets_header)
@@ -737,44 +813,100 @@ class App(QWidget):
 
         content_layout.addLayout(top_grid)
 
-        # Admin user management section
-        if self.is_admin:
-            users_card = StyledCard()
-            users_layout = QVBoxLayout()
-            users_layout.setContentsMargins(20, 20, 20, 20)
-            users_layout.setSpacing(16)
-
-            users_header = QHBoxLayout()
-            users_icon = QLabel("👥")
-            users_icon.setStyleSheet("font-size: 24px; background: transparent;")
-            users_title = QLabel("User Management")
-            users_title.setFont(QFont("Segoe UI", 14, QFont.Bold))
-            users_title.setStyleSheet("color: #111827; background: transparent;")
-            users_header.addWidget(users_icon)
-            users_header.addWidget(users_title)
-            users_header.addStretch()
-
-            self.users_list = QListWidget()
-            self.users_list.setMaximumHeight(260)
-            self.users_list.setStyleSheet("""
-                QListWidget {
-                    border: none;
-                    background-color: transparent;
-                    outline: none;
-                }
-                QListWidget::item {
-                    padding: 0px;
-                    margin: 6px 0px;
-                    background: transparent;
-                }
-            """)
+        # Admin user management and summary panels are built on first use
+        self.content_layout = content_layout
+        self.users_card = None
+        self.users_list = None
+        self.summary_card = None
+        self.figure = None
+        self.canvas = None
+        self.chart_bar_ax = None
+
+        content_layout.addStretch()
+        content_widget.setLayout(content_layout)
+        scroll_area.setWidget(content_widget)
+
+        main_layout.addWidget(header_widget)
+        main_layout.addWidget(scroll_area, 1)
+
+        self.setLayout(main_layout)
+        # Fetch datasets after the first paint so the window appears immediately
+        QTimer.singleShot(0, self.refresh_datasets)
+
+    def _set_window_icon(self):
+        """Set window icon from file with error handling and Windows taskbar support"""
+        try:
+            icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chem-visualizer-logo.ico")
+            if os.path.exists(icon_path):
+                icon = QIcon(icon_path)
+                if not icon.isNull():
+                    self.setWindowIcon(icon)
+                    
+                    # Windows-specific taskbar icon fix
+                    if platform.system() == "Windows":
+                        try:
+                            import ctypes
+                            # Get window handle and set app user model ID
+                            hwnd = self.winId()
+                            if hwnd:
+                                # This helps Windows taskbar recognize the custom icon
+                                myappid = 'ChemicalVisualizer.App'
+                                ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
+                        except Exception as e:
+                            print(f"Windows icon hint error (non-critical): {e}")
+                else:
+                    print(f"Warning: Icon at {icon_path} appears to be invalid")
+            else:
+                print(f"Warning: Icon file not found at: {icon_path}")
+        except Exception as e:
+            print(f"Error setting icon: {e}")
+
+    def _ensure_users_panel(self):
+        """Build the admin user management card on first use"""
+        if self.users_card is not None:
+            return
+        users_card = StyledCard()
+        users_layout = QVBoxLayout()
+        users_layout.setContentsMargins(20, 20, 20, 20)
+        users_layout.setSpacing(16)
+
+        users_header = QHBoxLayout()
+        users_icon = QLabel("👥")
+        users_icon.setStyleSheet("font-size: 24px; background: transparent;")
+        users_title = QLabel("User Management")
+        users_title.setFont(QFont("Segoe UI", 14, QFont.Bold))
+        users_title.setStyleSheet("color: #111827; background: transparent;")
+        users_header.addWidget(users_icon)
+        users_header.addWidget(users_title)
+        users_header.addStretch()
+
+        self.users_list = QListWidget()
+        self.users_list.setMaximumHeight(260)
+        self.users_list.setStyleSheet("""
+            QListWidget {
+                border: none;
+                background-color: transparent;
+                outline: none;
+            }
+            QListWidget::item {
+                padding: 0px;
+                margin: 6px 0px;
+                background: transparent;
+            }
+        """)
 
-            users_layout.addLayout(users_header)
-            users_layout.addWidget(self.users_list)
-            users_card.setLayout(users_layout)
-            content_layout.addWidget(users_card)
+        users_layout.addLayout(users_header)
+        users_layout.addWidget(self.users_list)
+        users_card.setLayout(users_layout)
+        self.content_layout.insertWidget(1, users_card)
+        users_card.show()
+        self.users_card = users_card
+
+    def _ensure_summary_card(self):
+        """Build the analysis summary card the first time a dataset is viewed"""
+        if self.summary_card is not None:
+            return
 
-        # Enhanced Summary section
         self.summary_card = StyledCard()
         self.summary_card.setVisible(False)
         self.summary_card.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
@@ -823,12 +955,8 @@ class App(QWidget):
         charts_title.setStyleSheet("color: #111827; background: transparent;")
         charts_layout.addWidget(charts_title)
         
-        self.figure = Figure(figsize=(10, 4), dpi=100)
-        self.figure.patch.set_facecolor('#fafbfc')
-        self.canvas = FigureCanvas(self.figure)
-        self.canvas.setMinimumHeight(320)
-        self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        charts_layout.addWidget(self.canvas)
+        # The matplotlib canvas is added by _create_chart_canvas on the first plot
+        self.charts_layout = charts_layout
         
         summary_layout.addWidget(charts_container, 1)
         
@@ -949,49 +1077,11 @@ class App(QWidget):
         summary_layout.addWidget(self.records_table)
         
         self.summary_card.setLayout(summary_layout)
-        content_layout.addWidget(self.summary_card, 1)
-
-        content_layout.addStretch()
-        content_widget.setLayout(content_layout)
-        scroll_area.setWidget(content_widget)
-
-        main_layout.addWidget(header_widget)
-        main_layout.addWidget(scroll_area, 1)
-
-        self.setLayout(main_layout)
-        self.refresh_datasets()
-
-    def _set_window_icon(self):
-        """Set window icon from file with error handling and Windows taskbar support"""
-        try:
-            icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chem-visualizer-logo.ico")
-            if os.path.exists(icon_path):
-                icon = QIcon(icon_path)
-                if not icon.isNull():
-                    self.setWindowIcon(icon)
-                    
-                    # Windows-specific taskbar icon fix
-                    if platform.system() == "Windows":
-                        try:
-                            import ctypes
-                            # Get window handle and set app user model ID
-                            hwnd = self.winId()
-                            if hwnd:
-                                # This helps Windows taskbar recognize the custom icon
-                                myappid = 'ChemicalVisualizer.App'
-                                ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
-                        except Exception as e:
-                            print(f"Windows icon hint error (non-critical): {e}")
-                else:
-                    print(f"Warning: Icon at {icon_path} appears to be invalid")
-            else:
-                print(f"Warning: Icon file not found at: {icon_path}")
-        except Exception as e:
-            print(f"Error setting icon: {e}")
+        self.content_layout.insertWidget(self.content_layout.count() - 1, self.summary_card, 1)
 
     def refresh_datasets(self):
         self.dataset_list.clear()
-        datasets = get_datasets()
+        datasets, next_page = get_datasets()
         if not datasets:
             empty_widget = QWidget()
             empty_layout = QVBoxLayout(empty_widget)
@@ -1017,12 +1107,20 @@ class App(QWidget):
                 self.refresh_users()
             return
             
+        self._add_dataset_items(datasets, next_page)
+
+        if self.is_admin:
+            self.refresh_users()
+
+    def _add_dataset_items(self, datasets, next_page):
+        """Append dataset rows, then a "Load more" row when older pages remain"""
         for d in datasets:
             owner_text = None
             if self.is_admin and d.get("owner"):
                 owner = d.get("owner", {})
                 owner_text = f"Owner: {owner.get('username', 'Unknown')} (#{owner.get('id', '')})"
             item = QListWidgetItem()
+            item.setData(Qt.UserRole, d["id"])
             widget = DatasetItem(
                 d["id"],
                 self.view_dataset,
@@ -1033,12 +1131,25 @@ class App(QWidget):
             self.dataset_list.addItem(item)
             self.dataset_list.setItemWidget(item, widget)
 
-        if self.is_admin:
-            self.refresh_users()
+        if next_page:
+            item = QListWidgetItem()
+            load_more_btn = StyledButton("Load more", small=True)
+            load_more_btn.clicked.connect(lambda: self._load_more_datasets(item, next_page))
+            item.setSizeHint(load_more_btn.sizeHint())
+            self.dataset_list.addItem(item)
+            self.dataset_list.setItemWidget(item, load_more_btn)
+
+    def _load_more_datasets(self, load_more_item, page_url):
+        """Replace the "Load more" row with the next (older) page of datasets"""
+        datasets, next_page = get_datasets(page_url)
+        self.dataset_list.takeItem(self.dataset_list.row(load_more_item))
+        self._add_dataset_items(datasets, next_page)
 
     def refresh_users(self):
         if not self.is_admin:
             return
+        # First called from refresh_datasets after the first paint, which builds the panel
+        self._ensure_users_panel()
         self.users_list.clear()
         users = get_users()
         if not users:
@@ -1079,39 +1190,68 @@ class App(QWidget):
     def upload_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select CSV File", "", "CSV Files (*.csv)")
         if file_path:
-            try:
-                file_name = file_path.split('/')[-1]
-                self.file_label.setText(f"📄 {file_name}")
-                result = upload_csv(file_path)
-                if result and result.get("error"):
-                    self.file_label.setText("❌ Upload failed")
-                    self.file_label.setStyleSheet("color: #ef4444; background: transparent;")
-                    QMessageBox.warning(self, "Upload Error", result.get("error"))
-                else:
-                    self.file_label.setText("✅ File uploaded successfully!")
-                    self.file_label.setStyleSheet("color: #10b981; background: transparent;")
-                    self.refresh_datasets()
-            except Exception as e:
-                self.file_label.setText(f"❌ Upload failed")
-                self.file_label.setStyleSheet("color: #ef4444; background: transparent;")
+            file_name = os.path.basename(file_path)
+            self.file_label.setText(f"📄 {file_name}")
+            self.file_label.setStyleSheet("color: #6b7280; background: transparent;")
+            self.upload_btn.setEnabled(False)
+            self.upload_progress.setValue(0)
+            self.upload_progress.setVisible(True)
+
+            self.upload_worker = UploadWorker(file_path)
+            self.upload_worker.progress.connect(self.upload_progress.setValue)
+            self.upload_worker.completed.connect(self._on_upload_finished)
+            # completed arrives while run() is still returning; keep the thread until it has stopped
+            self.upload_worker.finished.connect(self._on_upload_thread_finished)
+            self.upload_worker.start()
+
+    def _on_upload_thread_finished(self):
+        self.upload_worker.deleteLater()
+        self.upload_worker = None
+        self.upload_btn.setEnabled(True)
+
+    def _on_upload_finished(self, result):
+        self.upload_progress.setVisible(False)
+        if result.get("error"):
+            self.file_label.setText("❌ Upload failed")
+            self.file_label.setStyleSheet("color: #ef4444; background: transparent;")
+            QMessageBox.warning(self, "Upload Error", result.get("error"))
+        elif result.get("duplicate"):
+            self.file_label.setText(f"ℹ️ Already uploaded as Dataset #{result.get('id')}")
+            self.file_label.setStyleSheet("color: #2563eb; background: transparent;")
+        else:
+            self.file_label.setText("✅ File uploaded successfully!")
+            self.file_label.setStyleSheet("color: #10b981; background: transparent;")
+            self.refresh_datasets()
 
     def close_summary(self):
-        self.summary_card.setVisible(False)
+        if self.summary_card is not None:
+            self.summary_card.setVisible(False)
 
-    def plot_chart(self, distribution):
-        self.figure.clear()
+    def _create_chart_canvas(self):
+        """Import matplotlib and attach its canvas only once a chart is needed"""
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=(10, 4), dpi=100)
+        self.figure.patch.set_facecolor('#fafbfc')
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setMinimumHeight(320)
+        self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.charts_layout.addWidget(self.canvas)
+
+    def _init_chart(self):
+        """Build the persistent bar/pie axes and their artist pools once"""
+        import mplcursors
 
-        # Create 2 subplots with minimalistic styling
+        self._create_chart_canvas()
+        self.figure.patch.set_facecolor('white')
         ax1 = self.figure.add_subplot(121)
         ax2 = self.figure.add_subplot(122)
+        slots = list(range(CHART_MAX_CATEGORIES))
 
-        labels = list(distribution.keys())
-        values = list(distribution.values())
-
-        # Minimalistic Bar Chart
-        colors_bar = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
-        bars = ax1.bar(labels, values, color=colors_bar[:len(labels)], 
-                       edgecolor='white', linewidth=1.5, alpha=0.95)
+        # Minimalistic Bar Chart with one bar per category slot
+        self.chart_bars = ax1.bar(slots, [0] * CHART_MAX_CATEGORIES, color=CHART_COLORS,
+                                  edgecolor='white', linewidth=1.5, alpha=0.95)
         ax1.set_title("Equipment Type Count", fontsize=12, fontweight='600', 
                       pad=15, color='#111827', fontfamily='sans-serif')
         ax1.set_ylabel("Count", fontsize=10, fontweight='600', color='#6b7280')
@@ -1119,6 +1259,7 @@ class App(QWidget):
         ax1.grid(axis='y', alpha=0.15, linestyle='-', linewidth=0.5, color='#e5e7eb')
         ax1.tick_params(axis='x', rotation=35, labelsize=9, colors='#6b7280')
         ax1.tick_params(axis='y', labelsize=9, colors='#6b7280')
+        ax1.set_xticks(slots)
         
         # Remove all spines for cleaner look
         ax1.spines['top'].set_visible(False)
@@ -1129,17 +1270,16 @@ class App(QWidget):
         ax1.spines['bottom'].set_linewidth(0.8)
         
         # Add subtle animation effect via alpha gradient
-        for i, bar in enumerate(bars):
+        for i, bar in enumerate(self.chart_bars):
             bar.set_alpha(0.8 + (i % 2) * 0.15)
 
-        # Minimalistic Pie Chart
-        colors_pie = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899']
+        # Minimalistic Pie Chart; wedge angles are rewritten in _update_pie
         wedges, texts, autotexts = ax2.pie(
-            values, 
-            labels=labels, 
+            [1] * CHART_MAX_CATEGORIES,
+            labels=[''] * CHART_MAX_CATEGORIES,
             autopct='%1.1f%%',
-            startangle=140,
-            colors=colors_pie[:len(labels)],
+            startangle=CHART_PIE_START_ANGLE,
+            colors=CHART_COLORS,
             textprops={'fontsize': 9, 'weight': '600', 'fontfamily': 'sans-serif'},
             wedgeprops={'edgecolor': '#fafbfc', 'linewidth': 1.5},
             counterclock=False
@@ -1157,17 +1297,87 @@ class App(QWidget):
             text.set_fontsize(9)
             text.set_fontweight('600')
 
-        # Interactive cursor with subtle styling
-        cursor = mplcursors.cursor(bars, hover=True)
-        cursor.connect(
-            "add", lambda sel: sel.annotation.set_text(
-                f"{labels[sel.index]}: {values[sel.index]}"
-            )
-        )
+        self.chart_bar_ax = ax1
+        self.chart_wedges = wedges
+        self.chart_pie_texts = texts
+        self.chart_pie_autotexts = autotexts
+        self.chart_labels = []
+        self.chart_values = []
+
+        # Interactive cursor with subtle styling, bound once to the bar pool
+        self.chart_cursor = mplcursors.cursor(self.chart_bars, hover=True)
+        self.chart_cursor.connect("add", self._on_chart_hover)
+
+        # Fixed margins leave room for rotated tick labels without a per-update tight_layout
+        self.figure.subplots_adjust(left=0.07, right=0.97, bottom=0.24, top=0.88, wspace=0.3)
+
+    def _on_chart_hover(self, sel):
+        if sel.index < len(self.chart_labels):
+            sel.annotation.set_text(f"{self.chart_labels[sel.index]}: {self.chart_values[sel.index]}")
+
+    def _update_pie(self, labels, values, colors):
+        """Rewrite wedge angles and label positions in place, mirroring Axes.pie"""
+        total = float(sum(values)) or 1.0
+        theta1 = CHART_PIE_START_ANGLE / 360.0
+        for i, (wedge, text, autotext) in enumerate(
+            zip(self.chart_wedges, self.chart_pie_texts, self.chart_pie_autotexts)
+        ):
+            visible = i < len(values)
+            wedge.set_visible(visible)
+            text.set_visible(visible)
+            autotext.set_visible(visible)
+            if not visible:
+                continue
+
+            frac = values[i] / total
+            theta2 = theta1 - frac  # counterclock=False
+            wedge.set_theta1(360 * min(theta1, theta2))
+            wedge.set_theta2(360 * max(theta1, theta2))
+            wedge.set_facecolor(colors[i])
+
+            center_x, center_y = wedge.center
+            thetam = math.pi * (theta1 + theta2)
+            label_x = center_x + 1.1 * wedge.r * math.cos(thetam)
+            label_y = center_y + 1.1 * wedge.r * math.sin(thetam)
+            text.set_position((label_x, label_y))
+            text.set_horizontalalignment('left' if label_x > 0 else 'right')
+            text.set_text(labels[i])
+
+            autotext.set_position((center_x + 0.6 * wedge.r * math.cos(thetam),
+                                   center_y + 0.6 * wedge.r * math.sin(thetam)))
+            autotext.set_text(f"{100 * frac:.1f}%")
+            theta1 = theta2
 
-        self.figure.patch.set_facecolor('white')
-        self.figure.tight_layout(pad=2.0)
-        self.canvas.draw()
+    def plot_chart(self, distribution):
+        """Update the persistent chart artists in place for a new distribution"""
+        if self.chart_bar_ax is None:
+            self._init_chart()
+
+        labels, values = _cap_categories(distribution, CHART_MAX_CATEGORIES)
+        colors = [
+            CHART_OTHER_COLOR if label == CHART_OTHER_LABEL else CHART_COLORS[i]
+            for i, label in enumerate(labels)
+        ]
+        self.chart_labels = labels
+        self.chart_values = values
+
+        for i, bar in enumerate(self.chart_bars):
+            visible = i < len(values)
+            bar.set_visible(visible)
+            bar.set_height(values[i] if visible else 0)
+            if visible:
+                bar.set_facecolor(colors[i])
+        self.chart_bar_ax.set_xticklabels(labels + [''] * (CHART_MAX_CATEGORIES - len(labels)))
+        self.chart_bar_ax.set_xlim(-0.6, max(len(labels), 1) - 0.4)
+        self.chart_bar_ax.set_ylim(0, (max(values) if values else 1) * 1.1)
+
+        self._update_pie(labels, values, colors)
+        self.canvas.draw_idle()
+
+    def clear_chart(self):
+        """Hide the chart artists without tearing down the axes"""
+        if self.chart_bar_ax is not None:
+            self.plot_chart({})
 
     def update_stats_display(self, summary):
         """Update the stats grid with enhanced cards"""
@@ -1290,10 +1500,10 @@ class App(QWidget):
         self.selected_id = dataset_id
         summary = get_summary(dataset_id)
         if not summary or "equipment_type_distribution" not in summary:
-            self.figure.clear()
-            self.canvas.draw()
+            self.clear_chart()
             return
 
+        self._ensure_summary_card()
         self.summary_card.setVisible(True)
         self.update_stats_display(summary)
         self.plot_chart(summary['equipment_type_distribution'])
@@ -1302,9 +1512,31 @@ class App(QWidget):
     def delete_dataset_ui(self, dataset_id):
         delete_dataset(dataset_id)
         self.refresh_datasets()
-        self.summary_card.setVisible(False)
-        self.figure.clear()
-        self.canvas.draw()
+        self.close_summary()
+        self.clear_chart()
+
+    def _selected_dataset_ids(self):
+        return [item.data(Qt.UserRole) for item in self.dataset_list.selectedItems() if item.data(Qt.UserRole)]
+
+    def delete_selected_datasets(self):
+        dataset_ids = self._selected_dataset_ids()
+        if not dataset_ids:
+            return
+        reply = QMessageBox.question(
+            self,
+            "Delete Datasets",
+            f"Delete {len(dataset_ids)} selected dataset(s)?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        result = bulk_dataset_action('delete', dataset_ids)
+        if "error" in result:
+            QMessageBox.warning(self, "Error", result["error"])
+        self.refresh_datasets()
+        if self.selected_id in dataset_ids:
+            self.close_summary()
+            self.clear_chart()
 
     def delete_user_ui(self, user_id):
         if not user_id:
@@ -1318,7 +1550,8 @@ class App(QWidget):
         if reply != QMessageBox.Yes:
             return
         status = delete_user(user_id)
-        if status in [200, 204]:
+        # 202: the account is deactivated now and purged in the background
+        if status in [200, 202, 204]:
             self.refresh_users()
             self.refresh_datasets()
         else:
@@ -25,6 +25,7 @@ const API_BASE = "http://127.0.0.1:8000/api";
 
 function Dashboard({ onLogout }) {
   const [datasets, setDatasets] = useState([]);
+  const [nextDatasetsUrl, setNextDatasetsUrl] = useState(null);
   const [users, setUsers] = useState([]);
   const [selectedId, setSelectedId] = useState(null);
   const [summary, setSummary] = useState(null);
@@ -75,7 +76,9 @@ function Dashboard({ onLogout }) {
   const fetchDatasets = useCallback(async () => {
     try {
       const res = await axios.get(`${API_BASE}/datasets/`, getAuthHeaders());
-      setDatasets(res.data);
+      // The list is cursor-paginated; show the newest page, older ones load on demand
+      setDatasets(res.data.results ?? res.data);
+      setNextDatasetsUrl(res.data.next ?? null);
     } catch (error) {
       if (error.response?.status === 401) {
         onLogout();
@@ -83,6 +86,19 @@ function Dashboard({ onLogout }) {
     }
   }, [getAuthHeaders, onLogout]);
 
+  const loadMoreDatasets = async () => {
+    if (!nextDatasetsUrl) return;
+    try {
+      const res = await axios.get(nextDatasetsUrl, getAuthHeaders());
+      setDatasets((current) => [...current, ...res.data.results]);
+      setNextDatasetsUrl(res.data.next ?? null);
+    } catch (error) {
+      if (error.response?.status === 401) {
+        onLogout();
+      }
+    }
+  };
+
   const fetchUsers = useCallback(async () => {
     try {
       const res = await axios.get(`${API_BASE}/admin/users/`, getAuthHeaders());
@@ -392,6 +408,11 @@ function Dashboard({ onLogout }) {
                     </div>
                   </div>
                 ))}
+                {nextDatasetsUrl && (
+                  <button onClick={loadMoreDatasets} className="btn btn-secondary btn-wide">
+                    Load more
+                  </button>
+                )}
               </div>
             )}
           </section>